@@ -0,0 +1,5 @@
+"""
+基准测试
+
+无界面运行的性能测试脚本，结果以 JSON 输出以便跨提交跟踪回归
+"""
@@ -0,0 +1,176 @@
+"""
+推荐 API 服务器负载测试
+
+在本地端口启动 RecommendationAPIServer，推荐提供者的 get_next_song / get_playlist
+人为加入延迟 (模拟慢推荐)，若干线程持续请求 /api/recommend/next 和
+/api/recommend/playlist，同时用一个 keep-alive 连接轮询 /api/player/status，测量：
+
+- status_latency_ms: 状态接口延迟 (有/无并发推荐流量)
+- recommend_latency_ms: 推荐接口延迟
+- rejected: 因服务器繁忙返回 503 的请求数
+
+用法:
+    python benchmarks/api_bench.py --clients 16 --duration 10 -o result.json
+    python benchmarks/api_bench.py --workers 1 --provider-calls 1   # 近似旧的单线程服务器
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import http.client
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_headless, summarize, metadata, write_results, add_output_args
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def make_provider(delay: float):
+    from core.recommendation_api import DefaultRecommendationProvider
+
+    class SlowProvider(DefaultRecommendationProvider):
+        def get_next_song(self, current_song, history, context):
+            time.sleep(delay)
+            return super().get_next_song(current_song, history, context)
+
+        def get_playlist(self, seed_songs, count=10, context=None):
+            time.sleep(delay)
+            return super().get_playlist(seed_songs, count, context)
+
+    provider = SlowProvider()
+    provider.set_song_pool([{'path': f"/music/song_{i}.flac", 'title': f"song {i}"} for i in range(2000)])
+    return provider
+
+
+def request(conn: http.client.HTTPConnection, method: str, path: str, body: dict = None) -> int:
+    payload = json.dumps(body).encode('utf-8') if body is not None else None
+    headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    conn.request(method, path, body=payload, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    if response.getheader('Connection', '').lower() == 'close':
+        conn.close()
+    return response.status
+
+
+def poll_status(port: int, duration: float, interval: float) -> Dict[str, Any]:
+    """用一个 keep-alive 连接轮询状态接口"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    samples, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            status = request(conn, 'GET', '/api/player/status')
+            if status == 200:
+                samples.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+        time.sleep(interval)
+    conn.close()
+    return {'latency_ms': summarize(samples), 'errors': errors}
+
+
+def load_client(port: int, stop: threading.Event, latencies: List[float], counters: Dict[str, int],
+                lock: threading.Lock, index: int):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    while not stop.is_set():
+        if index % 2:
+            path, body = '/api/recommend/playlist', {'seed_songs': [], 'count': 20}
+        else:
+            path, body = '/api/recommend/next', {'current_song': None, 'history': []}
+        start = time.perf_counter()
+        try:
+            status = request(conn, 'POST', path, body)
+        except (OSError, http.client.HTTPException):
+            status = 0
+            conn.close()
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            if status == 200:
+                latencies.append(elapsed)
+            elif status == 503:
+                counters['rejected'] += 1
+                time.sleep(0.05)
+            else:
+                counters['errors'] += 1
+    conn.close()
+
+
+def run(args) -> Dict[str, Any]:
+    setup_headless()
+
+    from core.recommendation_api import RecommendationAPIServer
+
+    port = free_port()
+    server = RecommendationAPIServer(port, max_workers=args.workers, max_pending=args.pending,
+                                    max_provider_calls=args.provider_calls)
+    server.set_provider(make_provider(args.delay))
+    server.set_player_callback(lambda action, *a: {'playing': True, 'position': 1.0} if action == 'get_status' else None)
+    server.start()
+    time.sleep(0.2)
+
+    try:
+        results = metadata(
+            'api',
+            workers=args.workers,
+            pending=args.pending,
+            provider_calls=args.provider_calls,
+            clients=args.clients,
+            delay_s=args.delay,
+            duration_s=args.duration,
+        )
+        results['status_idle'] = poll_status(port, min(args.duration, 3.0), args.interval)
+
+        stop = threading.Event()
+        latencies: List[float] = []
+        counters = {'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=load_client, args=(port, stop, latencies, counters, lock, i), daemon=True)
+                   for i in range(args.clients)]
+        for t in threads:
+            t.start()
+        results['status_under_load'] = poll_status(port, args.duration, args.interval)
+        stop.set()
+        for t in threads:
+            t.join(timeout=10)
+
+        results['recommend_latency_ms'] = summarize(latencies)
+        results['recommend_throughput'] = len(latencies) / args.duration
+        results['rejected'] = counters['rejected']
+        results['errors'] = counters['errors']
+        return results
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推荐 API 服务器负载测试")
+    parser.add_argument('--clients', type=int, default=16, help="并发推荐请求的客户端数")
+    parser.add_argument('--delay', type=float, default=0.2, help="推荐提供者的人为延迟 (秒)")
+    parser.add_argument('--duration', type=float, default=10.0, help="负载持续时间 (秒)")
+    parser.add_argument('--interval', type=float, default=0.05, help="状态轮询间隔 (秒)")
+    parser.add_argument('--workers', type=int, default=32, help="服务器线程数")
+    parser.add_argument('--pending', type=int, default=64, help="服务器排队连接数上限")
+    parser.add_argument('--provider-calls', type=int, default=4, help="同时运行的推荐调用数上限")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    write_results(run(args), args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+音频引擎基准测试 (无界面)
+
+用合成的 WAV/FLAC/MP3 音频驱动 PygameMixerEngine、AudioPreloader/AudioCache
+和 SyncedTrackManager，默认走 null 输出后端，测量：
+
+- latency: 输出设备的缓冲延迟和实测延迟
+- time_to_first_audio: 从加载到通道开始播放的耗时 (冷/热缓存)
+- seek_latency: set_position 耗时
+- preload_throughput: 预加载吞吐量 (文件/秒, MB/秒)
+- memory_per_track: 每条音轨的内存占用
+- stem_start_skew: 多音轨同步启动时各通道开始播放的时间差
+- stem_parallel_load: StemLoader 后台并行加载全部音轨的耗时
+
+用法:
+    python benchmarks/audio_engine_bench.py --seconds 30 --stems 6 -o result.json
+    python benchmarks/audio_engine_bench.py --backend pygame   # SDL dummy 驱动
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    setup_headless, make_fixtures, summarize, rss_bytes, metadata,
+    write_results, add_output_args
+)
+
+
+class RecordingChannel:
+    """包装通道，记录 play() 被调用的时间"""
+
+    def __init__(self, channel):
+        self._channel = channel
+        self.played_at = None
+
+    def play(self, sound):
+        self.played_at = time.perf_counter()
+        self._channel.play(sound)
+
+    def __getattr__(self, name):
+        return getattr(self._channel, name)
+
+
+def wait_until(predicate, timeout: float = 5.0, interval: float = 0.0005) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if predicate():
+            return True
+        time.sleep(interval)
+    return False
+
+
+def bench_time_to_first_audio(engine, cache, songs: Dict[str, str], repeat: int) -> Dict[str, Any]:
+    results = {}
+    for fmt, path in songs.items():
+        cold, warm = [], []
+        for i in range(repeat):
+            for samples, clear_cache in ((cold, True), (warm, False)):
+                engine.clear_all()
+                if clear_cache:
+                    cache.clear()
+                start = time.perf_counter()
+                if not engine.load_track(0, path):
+                    break
+                engine.play_all()
+                if wait_until(engine.is_busy):
+                    samples.append((time.perf_counter() - start) * 1000)
+        engine.clear_all()
+        results[fmt] = {'cold_ms': summarize(cold), 'warm_ms': summarize(warm)}
+    return results
+
+
+def bench_seek(engine, path: str, seconds: float, repeat: int) -> Dict[str, Any]:
+    engine.clear_all()
+    engine.load_track(0, path)
+    engine.play_all()
+    samples = []
+    span_ms = int(seconds * 1000)
+    for i in range(repeat):
+        position = (i * 7919) % max(span_ms - 1000, 1)
+        start = time.perf_counter()
+        engine.set_position(position)
+        samples.append((time.perf_counter() - start) * 1000)
+    engine.clear_all()
+    return summarize(samples)
+
+
+def bench_preload(preloader_cls, cache_cls, paths: List[str], workers: int) -> Dict[str, Any]:
+    cache = cache_cls(max_size=len(paths) + 1, max_memory_mb=4096)
+    preloader = preloader_cls(cache=cache, max_workers=workers)
+    total_bytes = sum(os.path.getsize(p) for p in paths)
+
+    start = time.perf_counter()
+    preloader.preload_batch(paths)
+    for path in paths:
+        preloader.wait_for_load(path, timeout=120.0)
+    elapsed = time.perf_counter() - start
+    preloader.shutdown()
+
+    loaded = sum(1 for p in paths if cache.contains(p))
+    return {
+        'files': loaded,
+        'workers': workers,
+        'elapsed_s': elapsed,
+        'files_per_s': loaded / elapsed if elapsed else 0.0,
+        'mb_per_s': total_bytes / 1024 / 1024 / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_memory(engine, cache, stems: List[str]) -> Dict[str, Any]:
+    engine.clear_all()
+    cache.clear()
+    before = rss_bytes()
+    for track_id, path in enumerate(stems):
+        engine.load_track(track_id, path)
+    after = rss_bytes()
+    sound_bytes = [getattr(s, 'size_bytes', 0) for s in engine.sounds.values()]
+    engine.clear_all()
+    cache.clear()
+    count = max(len(stems), 1)
+    return {
+        'tracks': len(stems),
+        'rss_delta_mb': (after - before) / 1024 / 1024,
+        'rss_per_track_mb': (after - before) / 1024 / 1024 / count,
+        'sound_bytes_per_track_mb': sum(sound_bytes) / 1024 / 1024 / count if any(sound_bytes) else None,
+    }
+
+
+def bench_stems(app, stems: List[str], repeat: int) -> Dict[str, Any]:
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from ui.track_control import TrackControl, SyncedTrackManager, get_mixer_engine
+    from core.audio_preloader import get_audio_cache
+
+    engine = get_mixer_engine()
+    manager = SyncedTrackManager()
+    skews, load_times = [], []
+
+    for _ in range(repeat):
+        manager.clear()
+        get_audio_cache().clear()
+        for path in stems:
+            manager.add_track(TrackControl(path))
+
+        loop = QEventLoop()
+        start = time.perf_counter()
+        manager.load_all_async(on_finished=lambda ok, total: loop.quit())
+        QTimer.singleShot(120000, loop.quit)
+        loop.exec()
+        load_times.append((time.perf_counter() - start) * 1000)
+
+        for track_id in list(engine.channels.keys()):
+            engine.channels[track_id] = RecordingChannel(engine.channels[track_id])
+        manager.play_all_synced()
+        played = [c.played_at for c in engine.channels.values() if c.played_at is not None]
+        if len(played) > 1:
+            skews.append((max(played) - min(played)) * 1000)
+        manager.pause_all()
+
+    manager.shutdown()
+    engine.clear_all()
+    return {
+        'stems': len(stems),
+        'parallel_load_ms': summarize(load_times),
+        'start_skew_ms': summarize(skews),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    setup_headless(args.backend)
+
+    from PyQt6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(sys.argv[:1])
+
+    from core.audio_output import get_output_backend, set_output_backend
+    from core.audio_preloader import AudioPreloader, AudioCache, get_audio_cache
+    from ui.track_control import get_mixer_engine
+
+    set_output_backend(args.backend)
+    backend = get_output_backend()
+    backend.open()
+    # 打开后台的测量可能还没结束，这里同步测一次，保证结果中有实测延迟
+    backend.measure_latency()
+
+    engine = get_mixer_engine()
+    cache = get_audio_cache()
+
+    work_dir = tempfile.mkdtemp(prefix="mtp_bench_")
+    try:
+        fixtures = make_fixtures(work_dir, args.seconds, args.formats.split(','), stems=args.stems)
+        songs = fixtures['songs']
+        stems = fixtures['stems']
+
+        results = metadata(
+            'audio_engine',
+            backend=backend.name,
+            seconds=args.seconds,
+            repeat=args.repeat,
+            latency=backend.get_latency(),
+        )
+        results['time_to_first_audio'] = bench_time_to_first_audio(engine, cache, songs, args.repeat)
+        results['seek_latency_ms'] = bench_seek(engine, songs['wav'], args.seconds, args.repeat * 5)
+        results['preload_throughput'] = bench_preload(AudioPreloader, AudioCache, stems or [songs['wav']],
+                                                      args.workers)
+        results['memory_per_track'] = bench_memory(engine, cache, stems)
+        if stems:
+            results['stem_sync'] = bench_stems(app, stems, args.repeat)
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频引擎无界面基准测试")
+    parser.add_argument('--backend', default="null", help="音频输出后端 (null/pygame)")
+    parser.add_argument('--seconds', type=float, default=20.0, help="测试音频时长 (秒)")
+    parser.add_argument('--formats', default="wav,flac,mp3", help="测试的音频格式")
+    parser.add_argument('--stems', type=int, default=6, help="多音轨测试的音轨数")
+    parser.add_argument('--repeat', type=int, default=5, help="每项测试重复次数")
+    parser.add_argument('--workers', type=int, default=2, help="预加载线程数")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    write_results(run(args), args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+音轨编码格式基准测试
+
+把一条合成的 WAV 音轨用 AudioCompressor 压缩为各候选格式，对每种格式测量：
+
+- size_ratio: 相对 WAV 的文件大小
+- decode_ms: decode_audio_file 冷解码耗时 (得到可播放的 Sound 和用于 seek 的 AudioSegment)
+- native: 输出后端是否能直接解码 (否则需要经 pydub/FFmpeg)
+
+用于选择分离音轨的默认压缩格式 (compress_format = 'auto')
+
+用法:
+    python benchmarks/codec_bench.py --seconds 180 --backend pygame -o result.json
+    python benchmarks/codec_bench.py --formats ogg,m4a,opus --bitrate 96k
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Any
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    setup_headless, make_wav, encode, find_ffmpeg, summarize, metadata,
+    write_results, add_output_args
+)
+
+
+def bench_decode(path: str, repeat: int) -> Dict[str, Any]:
+    from core.audio_output import decode_audio_file
+
+    samples, failures = [], 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            sound, audio_seg, duration = decode_audio_file(path)
+        except Exception as e:
+            failures += 1
+            print(f"[bench] 解码失败 {os.path.basename(path)}: {e}")
+            continue
+        samples.append((time.perf_counter() - start) * 1000)
+        del sound, audio_seg
+    return {'decode_ms': summarize(samples), 'failures': failures}
+
+
+def run(args) -> Dict[str, Any]:
+    if not find_ffmpeg():
+        raise SystemExit("未找到 FFmpeg，无法运行编码格式基准测试")
+    setup_headless(args.backend)
+
+    from core.audio_output import get_output_backend, set_output_backend
+    from core.msst import AudioCompressor
+
+    set_output_backend(args.backend)
+    backend = get_output_backend()
+    backend.open()
+
+    work_dir = tempfile.mkdtemp(prefix="mtp_codec_bench_")
+    try:
+        wav_path = make_wav(os.path.join(work_dir, "stem.wav"), args.seconds)
+        wav_size = os.path.getsize(wav_path)
+
+        results = metadata(
+            'codec',
+            backend=backend.name,
+            seconds=args.seconds,
+            bitrate=args.bitrate,
+            repeat=args.repeat,
+            auto_format=AudioCompressor.resolve_format('auto'),
+        )
+        formats = {}
+        for fmt in args.formats.split(','):
+            fmt = fmt.strip()
+            if not fmt:
+                continue
+            if fmt == 'wav':
+                path = wav_path
+            elif fmt == 'flac':
+                path = encode(wav_path, 'flac')
+            else:
+                # compress_audio 成功后会删除输入文件，每种格式用一份副本
+                source = shutil.copyfile(wav_path, os.path.join(work_dir, f"source_{fmt}.wav"))
+                success, msg, path = AudioCompressor.compress_audio(
+                    source, os.path.join(work_dir, f"stem_{fmt}.{fmt}"), args.bitrate
+                )
+                if not success:
+                    path = None
+            if not path:
+                print(f"[bench] 跳过 {fmt}: 编码失败")
+                continue
+            entry = bench_decode(path, args.repeat)
+            entry['size_bytes'] = os.path.getsize(path)
+            entry['size_ratio'] = entry['size_bytes'] / wav_size
+            entry['native'] = '.' + fmt in backend.native_formats
+            formats[fmt] = entry
+        results['formats'] = formats
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音轨编码格式基准测试")
+    parser.add_argument('--backend', default="pygame", help="音频输出后端 (null/pygame)")
+    parser.add_argument('--seconds', type=float, default=120.0, help="测试音轨时长 (秒)")
+    parser.add_argument('--formats', default="wav,flac,ogg,mp3,m4a,opus", help="测试的格式")
+    parser.add_argument('--bitrate', default="64k", help="有损格式的目标比特率")
+    parser.add_argument('--repeat', type=int, default=3, help="每种格式解码次数")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    write_results(run(args), args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+基准测试公共工具
+
+- 合成测试音频 (WAV，可选经 FFmpeg 转为 FLAC/MP3 等格式)
+- 统计/百分位计算
+- 结果元数据与 JSON 输出
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import wave
+import struct
+import random
+import shutil
+import platform
+import subprocess
+from typing import List, Dict, Any, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def setup_headless(audio_backend: str = "null"):
+    """在导入 Qt / pygame 之前调用，使用无界面和无声的驱动"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("MTP_AUDIO_BACKEND", audio_backend)
+
+
+def make_wav(path: str, seconds: float, sample_rate: int = 44100,
+             channels: int = 2, freq: float = 440.0, seed: int = 0) -> str:
+    """生成正弦波 + 少量噪声的 16bit WAV 文件"""
+    rng = random.Random(seed)
+    frames = int(seconds * sample_rate)
+    step = 2 * math.pi * freq / sample_rate
+    chunk = 4096
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        for start in range(0, frames, chunk):
+            samples = []
+            for i in range(start, min(start + chunk, frames)):
+                value = int(12000 * math.sin(step * i) + rng.randint(-800, 800))
+                samples.extend([value] * channels)
+            wf.writeframes(struct.pack(f"<{len(samples)}h", *samples))
+    return path
+
+
+def find_ffmpeg() -> str:
+    return shutil.which("ffmpeg") or ""
+
+
+def encode(wav_path: str, fmt: str, bitrate: str = "128k") -> Optional[str]:
+    """用 FFmpeg 把 WAV 转为其他格式，FFmpeg 不可用或失败时返回 None"""
+    ffmpeg = find_ffmpeg()
+    if not ffmpeg:
+        return None
+    codecs = {
+        'flac': ['-c:a', 'flac'],
+        'mp3': ['-c:a', 'libmp3lame', '-b:a', bitrate],
+        'ogg': ['-c:a', 'libvorbis', '-b:a', bitrate],
+        'opus': ['-c:a', 'libopus', '-b:a', bitrate],
+        'm4a': ['-c:a', 'aac', '-b:a', bitrate],
+    }
+    out_path = os.path.splitext(wav_path)[0] + "." + fmt
+    cmd = [ffmpeg, '-y', '-loglevel', 'error', '-i', wav_path] + codecs.get(fmt, []) + [out_path]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0 or not os.path.exists(out_path):
+        return None
+    return out_path
+
+
+def make_fixtures(directory: str, seconds: float, formats: List[str],
+                  stems: int = 0, sample_rate: int = 44100) -> Dict[str, Any]:
+    """
+    生成测试音频
+
+    Returns:
+        {'songs': {格式: 路径}, 'stems': [WAV 路径...]}
+    """
+    os.makedirs(directory, exist_ok=True)
+    base = make_wav(os.path.join(directory, "song.wav"), seconds, sample_rate)
+    songs = {'wav': base}
+    for fmt in formats:
+        if fmt == 'wav':
+            continue
+        encoded = encode(base, fmt)
+        if encoded:
+            songs[fmt] = encoded
+        else:
+            print(f"[bench] 跳过 {fmt}: FFmpeg 不可用或编码失败")
+
+    stem_paths = []
+    for i in range(stems):
+        stem_path = os.path.join(directory, f"stem_{i}.wav")
+        stem_paths.append(make_wav(stem_path, seconds, sample_rate, freq=220.0 * (i + 1), seed=i))
+    return {'songs': songs, 'stems': stem_paths}
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """计算 min / 中位数 / p95 / max / 平均值"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pct(p: float) -> float:
+        k = (len(ordered) - 1) * p
+        lo = int(math.floor(k))
+        hi = min(lo + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    return {
+        'n': len(ordered),
+        'min': ordered[0],
+        'p50': pct(0.5),
+        'p95': pct(0.95),
+        'max': ordered[-1],
+        'mean': sum(ordered) / len(ordered),
+    }
+
+
+def rss_bytes() -> int:
+    """当前进程常驻内存 (字节)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        return result.stdout.strip()
+    except OSError:
+        return ""
+
+
+def metadata(name: str, **extra) -> Dict[str, Any]:
+    info = {
+        'benchmark': name,
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    info.update(extra)
+    return info
+
+
+def write_results(results: Dict[str, Any], output: str = "", append: str = ""):
+    """
+    输出结果
+
+    Args:
+        output: 写入完整 JSON 的文件路径，为空时打印到标准输出
+        append: 追加一行 JSON 的历史文件 (JSONL)，用于跨提交对比
+    """
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"[bench] 结果已写入: {output}")
+    else:
+        print(text)
+    if append:
+        with open(append, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(results, ensure_ascii=False) + "\n")
+        print(f"[bench] 结果已追加到: {append}")
+
+
+def add_output_args(parser):
+    parser.add_argument('--output', '-o', default="", help="结果 JSON 文件")
+    parser.add_argument('--append', default="", help="追加结果到 JSONL 历史文件")
@@ -0,0 +1,124 @@
+"""
+音轨压缩基准测试
+
+生成若干条 WAV 音轨，用 AudioCompressor.compress_directory 按不同并行数
+(以及单个 FFmpeg 进程多路输出) 压缩，测量总耗时和吞吐量 (音频秒数/秒)。
+
+每种模式都在新的副本目录上运行，原始 WAV 只生成一次。
+
+用法:
+    python benchmarks/compress_bench.py --seconds 240 --stems 6 -o result.json
+    python benchmarks/compress_bench.py --workers 1,2,4,8 --format ogg
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import make_wav, find_ffmpeg, summarize, metadata, write_results, add_output_args
+
+
+def make_stems(directory: str, count: int, seconds: float) -> List[str]:
+    os.makedirs(directory, exist_ok=True)
+    return [
+        make_wav(os.path.join(directory, f"stem{i}.wav"), seconds, freq=220.0 * (i + 1), seed=i)
+        for i in range(count)
+    ]
+
+
+def bench_mode(source_dir: str, work_dir: str, repeat: int, audio_seconds: float,
+               bitrate: str, fmt: str, workers: int, single_pass: bool) -> Dict[str, Any]:
+    from core.msst import AudioCompressor
+
+    samples, failures = [], 0
+    for i in range(repeat):
+        target = os.path.join(work_dir, f"run_{workers}_{int(single_pass)}_{i}")
+        shutil.copytree(source_dir, target)
+        start = time.perf_counter()
+        success, msg, files = AudioCompressor.compress_directory(
+            target, target_bitrate=bitrate, output_format=fmt,
+            max_workers=workers, single_pass=single_pass
+        )
+        elapsed = time.perf_counter() - start
+        if success:
+            samples.append(elapsed)
+        else:
+            failures += 1
+            print(f"[Bench] 压缩失败: {msg}")
+        shutil.rmtree(target, ignore_errors=True)
+
+    stats = summarize(samples)
+    mean = stats.get('mean') or 0.0
+    return {
+        'workers': workers,
+        'single_pass': single_pass,
+        'failures': failures,
+        'elapsed_s': stats,
+        'audio_seconds_per_s': audio_seconds / mean if mean else 0.0,
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    if not find_ffmpeg():
+        raise SystemExit("未找到 FFmpeg，无法运行压缩基准测试")
+
+    from core.msst import AudioCompressor
+
+    worker_counts = [int(w) for w in args.workers.split(',') if w.strip()]
+    if not worker_counts:
+        worker_counts = sorted({1, 2, AudioCompressor.default_workers()})
+
+    work_dir = tempfile.mkdtemp(prefix="mtp_compress_bench_")
+    try:
+        source_dir = os.path.join(work_dir, "source")
+        make_stems(source_dir, args.stems, args.seconds)
+        audio_seconds = args.stems * args.seconds
+
+        results = metadata(
+            'compress',
+            stems=args.stems,
+            seconds=args.seconds,
+            format=args.format,
+            bitrate=args.bitrate,
+            repeat=args.repeat,
+            cpu_count=os.cpu_count(),
+        )
+        modes = []
+        for workers in worker_counts:
+            modes.append(bench_mode(source_dir, work_dir, args.repeat, audio_seconds,
+                                    args.bitrate, args.format, workers, False))
+        modes.append(bench_mode(source_dir, work_dir, args.repeat, audio_seconds,
+                                args.bitrate, args.format, 1, True))
+        results['modes'] = modes
+
+        baseline = next((m for m in modes if m['workers'] == 1 and not m['single_pass']), None)
+        if baseline and baseline['audio_seconds_per_s']:
+            for mode in modes:
+                mode['speedup'] = mode['audio_seconds_per_s'] / baseline['audio_seconds_per_s']
+        return results
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音轨压缩基准测试")
+    parser.add_argument('--seconds', type=float, default=60.0, help="每条音轨时长 (秒)")
+    parser.add_argument('--stems', type=int, default=6, help="音轨数")
+    parser.add_argument('--workers', default="", help="测试的并行数，逗号分隔 (默认 1,2,CPU核心数)")
+    parser.add_argument('--format', default="m4a", help="压缩格式 (m4a/ogg/opus/mp3)")
+    parser.add_argument('--bitrate', default="64k", help="目标比特率")
+    parser.add_argument('--repeat', type=int, default=3, help="每种模式重复次数")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    write_results(run(args), args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+MSST 分离基准测试
+
+对比逐首启动推理脚本 (每首都重新加载模型) 与常驻分离进程的单曲耗时。
+需要真实的 MSST 环境；不压缩输出，只测量分离本身。
+
+用法:
+    python benchmarks/msst_bench.py --msst-path D:/MSST --python D:/MSST/venv/Scripts/python.exe \\
+        --config-path configs/xxx.yaml --model-path pretrain/xxx.ckpt --songs a.flac b.flac c.flac
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import setup_headless, summarize, metadata, write_results, add_output_args
+
+
+def run_mode(args, songs: List[str], persistent: bool, work_dir: str) -> Dict[str, Any]:
+    from core.msst import MSSTSeparatorThread, shutdown_persistent_worker
+
+    times, failures = [], 0
+    for i, song in enumerate(songs):
+        output_dir = os.path.join(work_dir, "persistent" if persistent else "subprocess", str(i))
+        thread = MSSTSeparatorThread(
+            args.msst_path, song, output_dir, args.model_type,
+            args.config_path, args.model_path, args.output_format, args.python,
+            compress_output=False, use_persistent_worker=persistent
+        )
+        result = {}
+        thread.finished.connect(lambda ok, message, path: result.update(ok=ok, message=message))
+        start = time.perf_counter()
+        thread.run()  # 在当前线程同步执行
+        elapsed = time.perf_counter() - start
+        if result.get('ok'):
+            times.append(elapsed)
+        else:
+            failures += 1
+            print(f"[bench] 分离失败: {os.path.basename(song)}: {result.get('message', '')[:200]}")
+    if persistent:
+        shutdown_persistent_worker()
+
+    return {
+        'songs': len(songs),
+        'failures': failures,
+        'first_song_s': times[0] if times else None,
+        'per_song_s': summarize(times),
+        # 第一首包含模型加载，常驻模式下之后的歌曲才体现收益
+        'steady_state_s': summarize(times[1:]),
+        'total_s': sum(times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MSST 分离基准测试")
+    parser.add_argument('--msst-path', required=True)
+    parser.add_argument('--python', default="", help="MSST 环境的 Python 解释器")
+    parser.add_argument('--model-type', default="bs_roformer")
+    parser.add_argument('--config-path', required=True)
+    parser.add_argument('--model-path', required=True)
+    parser.add_argument('--output-format', default="wav")
+    parser.add_argument('--songs', nargs='+', required=True, help="测试用的歌曲文件")
+    parser.add_argument('--modes', default="subprocess,persistent")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    setup_headless()
+    from PyQt6.QtCore import QCoreApplication
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+    results = metadata('msst_separation', model_type=args.model_type, songs=len(args.songs))
+    work_dir = tempfile.mkdtemp(prefix="mtp_msst_bench_")
+    try:
+        for mode in args.modes.split(','):
+            results[mode] = run_mode(args, args.songs, mode == 'persistent', work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if 'subprocess' in results and 'persistent' in results:
+        base = results['subprocess']['total_s']
+        fast = results['persistent']['total_s']
+        results['speedup'] = base / fast if fast else None
+
+    write_results(results, args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
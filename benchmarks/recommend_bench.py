@@ -0,0 +1,148 @@
+"""
+默认推荐提供者基准测试
+
+用 N 首合成歌曲 (默认 100k) 比较 DefaultRecommendationProvider 与旧实现
+(每次筛选整个歌曲池) 的 get_next_song / get_playlist 耗时，并在小歌曲池上
+检查两者的抽样分布是否一致 (各歌曲被选中频率的最大相对偏差和卡方值)。
+
+用法:
+    python benchmarks/recommend_bench.py --songs 100000 -o result.json
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from collections import Counter
+from typing import Dict, Any, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize, metadata, write_results, add_output_args
+
+
+class LegacyProvider:
+    """旧实现：每次调用都筛选整个歌曲池"""
+
+    def __init__(self):
+        self.song_pool: List[Dict] = []
+
+    def set_song_pool(self, songs: List[Dict]):
+        self.song_pool = songs
+
+    def get_next_song(self, current_song, history, context):
+        recent_paths = {h.get('path') for h in history[-10:]} if history else set()
+        if current_song:
+            recent_paths.add(current_song.get('path'))
+        available = [s for s in self.song_pool if s.get('path') not in recent_paths]
+        if not available:
+            available = self.song_pool
+        return random.choice(available)
+
+    def get_playlist(self, seed_songs, count=10, context=None):
+        seed_paths = {s.get('path') for s in seed_songs}
+        available = [s for s in self.song_pool if s.get('path') not in seed_paths]
+        return random.sample(available, min(count, len(available)))
+
+
+def make_pool(count: int) -> List[Dict]:
+    return [{'path': f"/music/artist_{i % 500}/song_{i}.flac", 'title': f"song {i}",
+             'artist': f"artist {i % 500}", 'duration': 180.0} for i in range(count)]
+
+
+def time_calls(fn, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return summarize(samples)
+
+
+def bench_speed(provider, pool: List[Dict], repeat: int, playlist_count: int) -> Dict[str, Any]:
+    from core.recommendation_api import PlayContext
+
+    history = random.sample(pool, 50)
+    current = pool[0]
+    seeds = random.sample(pool, 5)
+    context = PlayContext()
+    return {
+        'next_us': time_calls(lambda: provider.get_next_song(current, history, context), repeat),
+        'playlist_us': time_calls(lambda: provider.get_playlist(seeds, playlist_count, context), repeat),
+    }
+
+
+def distribution(provider, pool: List[Dict], draws: int) -> Counter:
+    from core.recommendation_api import PlayContext
+
+    history = pool[:10]
+    current = pool[10]
+    counts: Counter = Counter()
+    for _ in range(draws):
+        result = provider.get_next_song(current, history, PlayContext())
+        song = getattr(result, 'song_info', result)
+        counts[song['path']] += 1
+    return counts
+
+
+def compare_distribution(pool_size: int, draws: int) -> Dict[str, Any]:
+    from core.recommendation_api import DefaultRecommendationProvider
+
+    pool = make_pool(pool_size)
+    results = {}
+    for name, provider in (('legacy', LegacyProvider()), ('indexed', DefaultRecommendationProvider())):
+        provider.set_song_pool(pool)
+        counts = distribution(provider, pool, draws)
+        available = [s['path'] for s in pool[11:]]
+        expected = draws / len(available)
+        excluded_hits = sum(counts[s['path']] for s in pool[:11])
+        chi2 = sum((counts[p] - expected) ** 2 / expected for p in available)
+        results[name] = {
+            'excluded_hits': excluded_hits,
+            'max_relative_deviation': max(abs(counts[p] - expected) / expected for p in available),
+            'chi_square': chi2,
+            'degrees_of_freedom': len(available) - 1,
+        }
+    return results
+
+
+def run(args) -> Dict[str, Any]:
+    from core.recommendation_api import DefaultRecommendationProvider
+
+    pool = make_pool(args.songs)
+    results = metadata('recommend', songs=args.songs, repeat=args.repeat, playlist_count=args.count)
+
+    legacy = LegacyProvider()
+    legacy.set_song_pool(pool)
+    indexed = DefaultRecommendationProvider()
+    start = time.perf_counter()
+    indexed.set_song_pool(pool)
+    results['index_build_ms'] = (time.perf_counter() - start) * 1000
+
+    results['legacy'] = bench_speed(legacy, pool, args.repeat, args.count)
+    results['indexed'] = bench_speed(indexed, pool, args.repeat, args.count)
+    for key in ('next_us', 'playlist_us'):
+        legacy_mean = results['legacy'][key].get('mean') or 0.0
+        indexed_mean = results['indexed'][key].get('mean') or 0.0
+        results[key.replace('_us', '_speedup')] = legacy_mean / indexed_mean if indexed_mean else 0.0
+
+    results['distribution'] = compare_distribution(args.dist_pool, args.draws)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="默认推荐提供者基准测试")
+    parser.add_argument('--songs', type=int, default=100000, help="歌曲池大小")
+    parser.add_argument('--repeat', type=int, default=200, help="每项测试调用次数")
+    parser.add_argument('--count', type=int, default=20, help="get_playlist 的歌曲数")
+    parser.add_argument('--dist-pool', type=int, default=50, help="分布检查的歌曲池大小")
+    parser.add_argument('--draws', type=int, default=100000, help="分布检查的抽样次数")
+    add_output_args(parser)
+    args = parser.parse_args()
+
+    write_results(run(args), args.output, args.append)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+"""
+音频输出后端
+
+把音频设备的打开/关闭、Sound/Channel 的创建从播放引擎中抽离出来：
+1. 采样率可跟随音源 (避免 48kHz 音轨被重采样到 44.1kHz)
+2. 缓冲区大小可配置，并报告缓冲延迟和实测输出延迟
+3. 后端可插拔 - 默认 pygame mixer，另有无声的 null 后端用于无界面基准测试
+4. 每个后端声明可直接解码的格式，其余格式经 pydub 转为 WAV 后再创建 Sound
+"""
+
+import io
+import os
+import time
+import wave
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from typing import Optional, Dict, Any, Callable, Union, BinaryIO, Tuple
+
+# 尝试导入 pygame
+try:
+    import pygame
+    import pygame.mixer
+    PYGAME_AVAILABLE = True
+except ImportError:
+    PYGAME_AVAILABLE = False
+
+# 尝试导入 pydub
+try:
+    from pydub import AudioSegment
+    PYDUB_AVAILABLE = True
+except ImportError:
+    PYDUB_AVAILABLE = False
+
+try:
+    from mutagen import File as MutagenFile
+    HAS_MUTAGEN = True
+except ImportError:
+    HAS_MUTAGEN = False
+
+DEFAULT_SAMPLE_RATE = 44100
+DEFAULT_BUFFER_SIZE = 2048
+
+
+@dataclass(frozen=True)
+class AudioOutputConfig:
+    """音频输出配置"""
+    sample_rate: int = 0  # 0 表示跟随音源采样率
+    bit_size: int = -16
+    channels: int = 2
+    buffer_size: int = DEFAULT_BUFFER_SIZE  # 每次回调的采样帧数
+    num_channels: int = 32  # 混音通道数
+
+    def resolve(self, source_rate: int = 0) -> 'AudioOutputConfig':
+        """确定实际打开设备时使用的采样率"""
+        rate = self.sample_rate or source_rate or DEFAULT_SAMPLE_RATE
+        return replace(self, sample_rate=rate)
+
+    @property
+    def buffer_latency_ms(self) -> float:
+        """缓冲区带来的理论延迟"""
+        rate = self.sample_rate or DEFAULT_SAMPLE_RATE
+        return self.buffer_size / rate * 1000
+
+
+def probe_sample_rate(file_path: str) -> int:
+    """读取音频文件的采样率，失败返回 0"""
+    try:
+        if file_path.lower().endswith('.wav'):
+            with wave.open(file_path, 'rb') as wf:
+                return wf.getframerate()
+        if HAS_MUTAGEN:
+            audio = MutagenFile(file_path)
+            if audio and hasattr(audio.info, 'sample_rate'):
+                return int(audio.info.sample_rate)
+    except Exception:
+        pass
+    return 0
+
+
+class AudioOutputBackend(ABC):
+    """
+    音频输出后端抽象基类
+
+    实现这个类来接入其他输出方式 (例如基于回调的 PCM 输出)，
+    然后通过 register_output_backend 注册
+    """
+
+    name = ""
+    # create_sound 可以直接解码的文件格式
+    native_formats: Tuple[str, ...] = ('.wav',)
+    # 分离音轨压缩格式为 auto 时使用的格式 (体积小且能直接解码)
+    preferred_stem_format = "ogg"
+
+    def __init__(self, config: Optional[AudioOutputConfig] = None):
+        self.config = config or AudioOutputConfig()
+        self._opened: Optional[AudioOutputConfig] = None
+        self._measured_latency_ms: Optional[float] = None
+        self._lock = threading.RLock()
+        self._probe_lock = threading.Lock()  # 同一时间只进行一次延迟测量
+
+    def configure(self, config: AudioOutputConfig):
+        """更新期望的输出配置 (下次打开设备时生效)"""
+        self.config = config
+
+    def is_open(self) -> bool:
+        return self._opened is not None
+
+    def get_opened_config(self) -> Optional[AudioOutputConfig]:
+        """获取设备实际打开时使用的配置"""
+        return self._opened
+
+    def needs_reopen(self, source_rate: int = 0) -> bool:
+        """按当前配置和音源采样率，设备是否需要重新打开"""
+        return self._opened != self.config.resolve(source_rate or self._current_rate())
+
+    def _current_rate(self) -> int:
+        # 跟随音源模式下，没有新的音源信息时保持当前采样率
+        return self._opened.sample_rate if self._opened else 0
+
+    def open(self, source_rate: int = 0) -> bool:
+        """
+        打开输出设备
+
+        Args:
+            source_rate: 音源采样率，配置为跟随音源时使用
+
+        Returns:
+            是否成功
+        """
+        with self._lock:
+            target = self.config.resolve(source_rate or self._current_rate())
+            if self._opened == target:
+                return True
+            if self._opened is not None:
+                self.close()
+            if not self._open_device(target):
+                return False
+            self._opened = target
+            self._measured_latency_ms = None
+            print(f"[AudioOutput] {self.name} 已打开: {target.sample_rate}Hz, "
+                  f"缓冲 {target.buffer_size} 帧 ({target.buffer_latency_ms:.1f}ms)")
+        # 实测延迟需要播放一段静音，放到后台线程，不拖慢开始播放
+        threading.Thread(target=self.measure_latency, name="latency-probe", daemon=True).start()
+        return True
+
+    def ensure_open(self) -> bool:
+        """
+        确保设备已打开：已打开时即使配置变化也保持不动
+
+        供后台线程和播放中的路径使用，只有 open() 会按新配置重新打开设备
+        (重新打开会停止正在播放的声音，并使已创建的 Sound 失效)
+        """
+        with self._lock:
+            if self._opened is not None:
+                return True
+            return self.open()
+
+    def close(self):
+        """关闭输出设备"""
+        with self._lock:
+            if self._opened is not None:
+                self._close_device()
+                self._opened = None
+
+    @abstractmethod
+    def _open_device(self, config: AudioOutputConfig) -> bool:
+        pass
+
+    @abstractmethod
+    def _close_device(self):
+        pass
+
+    @abstractmethod
+    def create_sound(self, source: Union[str, BinaryIO]):
+        """从文件路径或 WAV 数据创建 Sound 对象"""
+        pass
+
+    @abstractmethod
+    def get_channel(self, index: int):
+        """获取混音通道"""
+        pass
+
+    def measure_latency(self) -> Optional[float]:
+        """实测输出延迟 (毫秒)，不支持时返回 None (设备打开后自动在后台测量一次)"""
+        return None
+
+    def get_latency(self) -> Dict[str, Any]:
+        """获取延迟信息"""
+        config = self._opened or self.config.resolve()
+        return {
+            'backend': self.name,
+            'sample_rate': config.sample_rate,
+            'buffer_size': config.buffer_size,
+            'buffer_ms': config.buffer_latency_ms,
+            'measured_ms': self._measured_latency_ms,
+        }
+
+
+class PygameOutputBackend(AudioOutputBackend):
+    """pygame mixer 输出后端"""
+
+    name = "pygame"
+    # SDL_mixer 直接解码 (Vorbis 解码很快，不需要经过 pydub/FFmpeg)
+    native_formats = ('.wav', '.ogg', '.mp3')
+    preferred_stem_format = "ogg"
+
+    # 测量延迟时使用的保留通道
+    LATENCY_PROBE_CHANNEL = 31
+
+    def _open_device(self, config: AudioOutputConfig) -> bool:
+        if not PYGAME_AVAILABLE:
+            return False
+        try:
+            if not pygame.get_init():
+                pygame.init()
+            if pygame.mixer.get_init():
+                pygame.mixer.quit()
+            pygame.mixer.pre_init(config.sample_rate, config.bit_size, config.channels, config.buffer_size)
+            pygame.mixer.init()
+            pygame.mixer.set_num_channels(config.num_channels)
+            return True
+        except Exception as e:
+            print(f"[AudioOutput] pygame mixer 初始化失败: {e}")
+            return False
+
+    def _close_device(self):
+        try:
+            pygame.mixer.quit()
+        except Exception:
+            pass
+
+    def create_sound(self, source):
+        return pygame.mixer.Sound(source)
+
+    def get_channel(self, index: int):
+        return pygame.mixer.Channel(index)
+
+    def measure_latency(self) -> Optional[float]:
+        """
+        播放一段短静音，测量从提交到混音器释放通道的额外耗时
+
+        结果 = 额外耗时 + 缓冲区延迟，是输出延迟的近似值
+        """
+        if not self.is_open():
+            return None
+        try:
+            with self._probe_lock:
+                return self._probe_latency()
+        except Exception as e:
+            print(f"[AudioOutput] 延迟测量失败: {e}")
+            return None
+
+    def _probe_latency(self) -> Optional[float]:
+        config = self._opened
+        if config is None:
+            return None
+        length_ms = 100
+        frames = config.sample_rate * length_ms // 1000
+        silence = bytes(frames * config.channels * abs(config.bit_size) // 8)
+        sound = pygame.mixer.Sound(buffer=silence)
+        channel = pygame.mixer.Channel(min(self.LATENCY_PROBE_CHANNEL, config.num_channels - 1))
+
+        start = time.perf_counter()
+        channel.play(sound)
+        while channel.get_busy():
+            if time.perf_counter() - start > 2.0:
+                channel.stop()
+                return None
+            time.sleep(0.001)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        latency_ms = max(0.0, elapsed_ms - length_ms) + config.buffer_latency_ms
+        if self._opened is config:
+            # 测量期间设备被重新打开时，结果属于旧配置，不记录
+            self._measured_latency_ms = latency_ms
+        return latency_ms
+
+
+class NullSound:
+    """null 后端的 Sound - 只记录时长和数据大小，不发声"""
+
+    def __init__(self, source):
+        self._length = 0.0
+        self.size_bytes = 0
+
+        if isinstance(source, str) and not source.lower().endswith('.wav'):
+            # 非 WAV 文件，仍然完整解码以反映真实的解码开销
+            if PYDUB_AVAILABLE:
+                segment = AudioSegment.from_file(source)
+                self._length = len(segment) / 1000.0
+                self.size_bytes = len(segment.raw_data)
+            return
+
+        if isinstance(source, str):
+            with open(source, 'rb') as f:
+                data = f.read()
+        else:
+            data = source.read()
+        self.size_bytes = len(data)
+        with wave.open(io.BytesIO(data), 'rb') as wf:
+            if wf.getframerate():
+                self._length = wf.getnframes() / wf.getframerate()
+        self._data = data
+
+    def get_length(self) -> float:
+        return self._length
+
+
+class NullChannel:
+    """null 后端的 Channel - 按时长模拟播放状态"""
+
+    def __init__(self):
+        self._sound: Optional[NullSound] = None
+        self._started_at = 0.0
+        self._paused_at: Optional[float] = None
+        self.volume = 1.0
+
+    def play(self, sound: NullSound):
+        self._sound = sound
+        self._started_at = time.perf_counter()
+        self._paused_at = None
+
+    def stop(self):
+        self._sound = None
+        self._paused_at = None
+
+    def pause(self):
+        if self._sound and self._paused_at is None:
+            self._paused_at = time.perf_counter()
+
+    def unpause(self):
+        if self._paused_at is not None:
+            self._started_at += time.perf_counter() - self._paused_at
+            self._paused_at = None
+
+    def set_volume(self, volume: float):
+        self.volume = volume
+
+    def get_busy(self) -> bool:
+        if not self._sound:
+            return False
+        if self._paused_at is not None:
+            return True
+        return time.perf_counter() - self._started_at < self._sound.get_length()
+
+
+class NullOutputBackend(AudioOutputBackend):
+    """无声输出后端 - 用于无界面环境和基准测试"""
+
+    name = "null"
+
+    def __init__(self, config: Optional[AudioOutputConfig] = None):
+        super().__init__(config)
+        self._channels: Dict[int, NullChannel] = {}
+
+    def _open_device(self, config: AudioOutputConfig) -> bool:
+        self._channels.clear()
+        return True
+
+    def _close_device(self):
+        self._channels.clear()
+
+    def create_sound(self, source):
+        return NullSound(source)
+
+    def get_channel(self, index: int):
+        with self._lock:
+            if index not in self._channels:
+                self._channels[index] = NullChannel()
+            return self._channels[index]
+
+    def measure_latency(self) -> Optional[float]:
+        self._measured_latency_ms = 0.0
+        return 0.0
+
+
+# 已注册的后端
+_backend_registry: Dict[str, Callable[[Optional[AudioOutputConfig]], AudioOutputBackend]] = {
+    'pygame': PygameOutputBackend,
+    'null': NullOutputBackend,
+}
+
+_global_backend: Optional[AudioOutputBackend] = None
+_global_lock = threading.Lock()
+
+
+def register_output_backend(name: str, factory: Callable[[Optional[AudioOutputConfig]], AudioOutputBackend]):
+    """注册自定义输出后端"""
+    _backend_registry[name] = factory
+
+
+def available_output_backends() -> list:
+    return list(_backend_registry.keys())
+
+
+def get_output_backend() -> AudioOutputBackend:
+    """获取全局输出后端 (默认 pygame，可通过环境变量 MTP_AUDIO_BACKEND 指定)"""
+    global _global_backend
+    with _global_lock:
+        if _global_backend is None:
+            name = os.environ.get('MTP_AUDIO_BACKEND', 'pygame')
+            factory = _backend_registry.get(name, PygameOutputBackend)
+            _global_backend = factory(None)
+        return _global_backend
+
+
+def set_output_backend(name: str, config: Optional[AudioOutputConfig] = None) -> AudioOutputBackend:
+    """切换全局输出后端"""
+    global _global_backend
+    if name not in _backend_registry:
+        raise ValueError(f"未知的音频输出后端: {name}")
+    with _global_lock:
+        old = _global_backend
+        if old is not None and old.name == name:
+            if config is not None:
+                old.configure(config)
+            return old
+        if old is not None:
+            old.close()
+        _global_backend = _backend_registry[name](config or (old.config if old else None))
+        return _global_backend
+
+
+def configure_output(config: AudioOutputConfig):
+    """更新全局输出后端的配置"""
+    get_output_backend().configure(config)
+
+
+def segment_from_sound(sound) -> Optional['AudioSegment']:
+    """
+    用已解码 Sound 的 PCM 数据构造 AudioSegment (用于 seek 裁剪)
+
+    避免为了 seek 再用 FFmpeg 把同一个文件完整解码一遍
+    """
+    if not (PYGAME_AVAILABLE and PYDUB_AVAILABLE) or not hasattr(sound, 'get_raw'):
+        return None
+    try:
+        mixer_init = pygame.mixer.get_init()
+        if not mixer_init:
+            return None
+        frequency, size, channels = mixer_init
+        return AudioSegment(data=sound.get_raw(), sample_width=abs(size) // 8,
+                            frame_rate=frequency, channels=channels)
+    except Exception:
+        return None
+
+
+def decode_audio_file(file_path: str) -> Tuple[Any, Optional['AudioSegment'], int]:
+    """
+    解码音频文件为 (Sound, AudioSegment, 时长毫秒)
+
+    后端能直接解码的格式直接创建 Sound；其他格式 (FLAC/M4A/Opus 等) 先用 pydub 解码为 WAV
+    """
+    backend = get_output_backend()
+    file_ext = os.path.splitext(file_path)[1].lower()
+
+    if file_ext not in backend.native_formats and PYDUB_AVAILABLE:
+        try:
+            audio_seg = AudioSegment.from_file(file_path)
+            buffer = io.BytesIO()
+            audio_seg.export(buffer, format='wav')
+            buffer.seek(0)
+            sound = backend.create_sound(buffer)
+            return sound, audio_seg, len(audio_seg)  # pydub的长度是毫秒
+        except Exception as e:
+            print(f"[AudioOutput] pydub加载失败: {e}")
+            # 继续尝试直接加载
+
+    sound = backend.create_sound(file_path)
+    audio_seg = segment_from_sound(sound)
+    if audio_seg is None and PYDUB_AVAILABLE:
+        try:
+            audio_seg = AudioSegment.from_file(file_path)
+        except Exception:
+            pass
+    return sound, audio_seg, int(sound.get_length() * 1000)
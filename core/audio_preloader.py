@@ -27,6 +27,10 @@ try:
 except ImportError:
     PYGAME_AVAILABLE = False
 
+from .audio_output import get_output_backend, decode_audio_file
+from .transcode_cache import get_transcode_cache
+from .perf import get_tracer, log_debug
+
 # 尝试导入 pydub
 try:
     from pydub import AudioSegment
@@ -178,20 +182,11 @@ class AudioPreloader(QObject):
         self._init_mixer()
         
     def _init_mixer(self):
-        """初始化 pygame mixer"""
-        if not PYGAME_AVAILABLE:
-            return
-            
-        try:
-            if not pygame.get_init():
-                pygame.init()
-            if not pygame.mixer.get_init():
-                pygame.mixer.pre_init(44100, -16, 2, 2048)
-                pygame.mixer.init()
-            pygame.mixer.set_num_channels(32)
-            print("[AudioPreloader] pygame mixer 初始化成功")
-        except Exception as e:
-            print(f"[AudioPreloader] pygame mixer 初始化失败: {e}")
+        """初始化音频输出设备"""
+        if get_output_backend().ensure_open():
+            print("[AudioPreloader] 音频输出初始化成功")
+        else:
+            print("[AudioPreloader] 音频输出初始化失败")
     
     def preload(self, file_path: str, priority: int = 0) -> bool:
         """
@@ -213,7 +208,7 @@ class AudioPreloader(QObject):
             
         # 检查是否已缓存
         if self.cache.contains(file_path):
-            print(f"[AudioPreloader] 已缓存: {Path(file_path).name}")
+            log_debug("AudioPreloader", f"已缓存: {Path(file_path).name}")
             return True
             
         with self._lock:
@@ -227,7 +222,7 @@ class AudioPreloader(QObject):
             self._pending_tasks[file_path] = task
             
         self.preload_started.emit(file_path)
-        print(f"[AudioPreloader] 开始预加载: {Path(file_path).name}")
+        log_debug("AudioPreloader", f"开始预加载: {Path(file_path).name}")
         return True
         
     def preload_batch(self, file_paths: List[str], priorities: Optional[List[int]] = None):
@@ -243,24 +238,16 @@ class AudioPreloader(QObject):
         try:
             start_time = time.time()
             
-            if not PYGAME_AVAILABLE:
+            if not get_output_backend().ensure_open():
                 return None
                 
-            # 加载 pygame Sound
-            sound = pygame.mixer.Sound(file_path)
-            duration_ms = int(sound.get_length() * 1000)
+            # 加载 Sound 和用于 seek 的 AudioSegment (有转码缓存时读取缓存文件)
+            source_path = get_transcode_cache().resolve(file_path)
+            sound, audio_segment, duration_ms = decode_audio_file(source_path)
             
             # 获取文件大小
-            size_bytes = os.path.getsize(file_path)
+            size_bytes = os.path.getsize(source_path)
             
-            # 加载 pydub AudioSegment (用于 seek)
-            audio_segment = None
-            if PYDUB_AVAILABLE:
-                try:
-                    audio_segment = AudioSegment.from_file(file_path)
-                except Exception as e:
-                    print(f"[AudioPreloader] pydub 加载失败: {e}")
-                    
             # 创建缓存对象
             cached = CachedAudio(
                 file_path=file_path,
@@ -274,7 +261,8 @@ class AudioPreloader(QObject):
             self.cache.put(file_path, cached)
             
             load_time = time.time() - start_time
-            print(f"[AudioPreloader] 预加载完成: {Path(file_path).name} ({load_time:.2f}s, {size_bytes/1024/1024:.1f}MB)")
+            get_tracer().record("preload", load_time * 1000)
+            log_debug("AudioPreloader", f"预加载完成: {Path(file_path).name} ({load_time:.2f}s, {size_bytes/1024/1024:.1f}MB)")
             
             # 移除待处理任务
             with self._lock:
@@ -14,6 +14,8 @@ from pathlib import Path
 import urllib.request
 import urllib.parse
 
+from .perf import traced
+
 
 @dataclass
 class CustomSourceInfo:
@@ -322,6 +324,7 @@ class SourceAPIProxy:
         self.source_manager = source_manager
         self.timeout = 15
         
+    @traced("http.custom_source")
     def _request(self, url: str, headers: Dict[str, str] = None) -> Optional[str]:
         """发送HTTP请求"""
         try:
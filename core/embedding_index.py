@@ -0,0 +1,268 @@
+"""
+歌曲向量索引
+
+保存每首歌曲的归一化特征向量，供相似推荐使用：
+- vectors.<代>.f32: 所有向量按行连续存放 (float32)，读取时内存映射，不整体载入
+- rows.<代>.jsonl: 每行对应一个向量 [路径, 大小, 修改时间(ns)]，只追加
+- meta.json: 向量维度和当前的代
+
+歌曲变化后追加新向量，旧行作废 (同一路径以最后一行为准)；
+作废行超过一定比例时把有效行写入新一代文件，再原子替换 meta.json 切换过去，
+正在使用旧文件内存映射的查询不受影响。写入中断时两个文件按较短的一方对齐
+"""
+
+import os
+import json
+import threading
+from typing import Optional, Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+INDEX_VERSION = 1
+# 作废行占比超过该值时压缩
+COMPACT_RATIO = 0.25
+
+
+class EmbeddingIndex:
+    """
+    只追加的歌曲向量索引
+
+    查询方通过 view() 取得 (路径列表, 向量矩阵, 有效行掩码, 路径->行号) 的不可变视图，
+    追加新向量后视图整体替换，读取不需要加锁
+    """
+
+    def __init__(self, index_dir: str = ""):
+        if not index_dir:
+            index_dir = os.path.join(os.path.expanduser("~"), ".multi_track_player", "embeddings")
+        self.index_dir = index_dir
+        self.meta_file = os.path.join(index_dir, "meta.json")
+        self._lock = threading.Lock()
+        self.dim = 0
+        self.generation = 0
+        self._rows: List[list] = []  # [路径, 大小, 修改时间]
+        self._latest: Dict[str, int] = {}  # 路径 -> 最新行号
+        self._view: Optional[Tuple[List[Optional[str]], 'np.ndarray', 'np.ndarray', Dict[str, int]]] = None
+        self._load()
+
+    def _vectors_file(self, generation: int) -> str:
+        return os.path.join(self.index_dir, f"vectors.{generation}.f32")
+
+    def _rows_file(self, generation: int) -> str:
+        return os.path.join(self.index_dir, f"rows.{generation}.jsonl")
+
+    @property
+    def vectors_file(self) -> str:
+        return self._vectors_file(self.generation)
+
+    @property
+    def rows_file(self) -> str:
+        return self._rows_file(self.generation)
+
+    # ---------------- 读取 ----------------
+
+    def __len__(self) -> int:
+        return len(self._latest)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._latest
+
+    def is_current(self, path: str) -> bool:
+        """索引中有该文件且文件未变化"""
+        row = self._latest.get(path)
+        if row is None:
+            return False
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        _, size, mtime_ns = self._rows[row]
+        return size == st.st_size and mtime_ns == st.st_mtime_ns
+
+    def view(self):
+        """
+        获取当前索引视图
+
+        Returns:
+            (paths, matrix, valid, row_of): 行号 -> 路径 (作废行为 None)、内存映射的向量矩阵、
+            有效行掩码、路径 -> 行号；索引为空或 NumPy 不可用时返回 None
+        """
+        if self._view is None and self._rows and NUMPY_AVAILABLE:
+            with self._lock:
+                if self._view is None:
+                    self._view = self._build_view()
+        return self._view
+
+    def _build_view(self):
+        count = len(self._rows)
+        matrix = np.memmap(self.vectors_file, dtype=np.float32, mode='r', shape=(count, self.dim))
+        paths: List[Optional[str]] = [None] * count
+        valid = np.zeros(count, dtype=bool)
+        for path, row in self._latest.items():
+            paths[row] = path
+            valid[row] = True
+        return paths, matrix, valid, dict(self._latest)
+
+    # ---------------- 写入 ----------------
+
+    def add(self, path: str, vector, size: int = -1, mtime_ns: int = -1):
+        """追加 (或替换) 一首歌曲的向量"""
+        self.add_many([(path, vector, size, mtime_ns)])
+
+    def add_many(self, items: List[tuple]):
+        """
+        批量追加向量
+
+        Args:
+            items: [(路径, 向量, 文件大小, 修改时间ns), ...]；大小为 -1 时读取文件信息
+        """
+        if not items or not NUMPY_AVAILABLE:
+            return
+        rows = []
+        vectors = []
+        for path, vector, size, mtime_ns in items:
+            vector = np.asarray(vector, dtype=np.float32).ravel()
+            norm = float(np.linalg.norm(vector))
+            if norm <= 0 or not np.isfinite(norm):
+                continue
+            if size < 0:
+                try:
+                    st = os.stat(path)
+                    size, mtime_ns = st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+            rows.append([path, size, mtime_ns])
+            vectors.append(vector / norm)
+        if not rows:
+            return
+
+        with self._lock:
+            if not self.dim:
+                self.dim = len(vectors[0])
+                self._write_meta()
+            pairs = [(row, v) for row, v in zip(rows, vectors) if len(v) == self.dim]
+            if not pairs:
+                return
+            rows = [row for row, _ in pairs]
+            vectors = [v for _, v in pairs]
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(self.vectors_file, 'ab') as f:
+                f.write(np.stack(vectors).astype(np.float32).tobytes())
+            with open(self.rows_file, 'a', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            for row in rows:
+                self._latest[row[0]] = len(self._rows)
+                self._rows.append(row)
+            self._view = None
+            if len(self._rows) - len(self._latest) > COMPACT_RATIO * len(self._rows):
+                self._compact()
+
+    def remove_missing(self, keep_paths):
+        """删除不在曲库中的歌曲 (标记作废，必要时压缩)"""
+        keep = set(keep_paths)
+        with self._lock:
+            removed = [p for p in self._latest if p not in keep]
+            if not removed:
+                return
+            for path in removed:
+                del self._latest[path]
+            self._compact()
+
+    def _compact(self):
+        """把有效行写入新一代文件并切换过去 (调用方持有锁)"""
+        if not NUMPY_AVAILABLE:
+            return
+        order = sorted(self._latest.values())
+        count = len(self._rows)
+        if count:
+            matrix = np.fromfile(self.vectors_file, dtype=np.float32, count=count * self.dim).reshape(count, self.dim)
+            kept = matrix[order]
+        else:
+            kept = np.zeros((0, self.dim), dtype=np.float32)
+        rows = [self._rows[i] for i in order]
+
+        generation = self.generation + 1
+        kept.astype(np.float32).tofile(self._vectors_file(generation))
+        with open(self._rows_file(generation), 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        old_generation = self.generation
+        self.generation = generation
+        self._write_meta()
+        self._rows = rows
+        self._latest = {row[0]: i for i, row in enumerate(rows)}
+        self._view = None
+        self._remove_generation(old_generation)
+        print(f"[向量索引] 已压缩: {count} -> {len(rows)} 行")
+
+    def _remove_generation(self, generation: int):
+        """删除旧一代文件 (仍被内存映射时删除失败，下次加载时再清理)"""
+        for path in (self._vectors_file(generation), self._rows_file(generation)):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def _write_meta(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        temp_file = self.meta_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'dim': self.dim, 'generation': self.generation}, f)
+        os.replace(temp_file, self.meta_file)
+
+    def _load(self):
+        if not os.path.exists(self.meta_file):
+            return
+        try:
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('version') != INDEX_VERSION:
+                return
+            self.dim = int(meta.get('dim', 0))
+            self.generation = int(meta.get('generation', 0))
+            for name in os.listdir(self.index_dir):
+                parts = name.split('.')
+                if len(parts) == 3 and parts[0] in ('vectors', 'rows') and parts[1].isdigit() \
+                        and int(parts[1]) != self.generation:
+                    self._remove_generation(int(parts[1]))
+            rows = []
+            if os.path.exists(self.rows_file):
+                with open(self.rows_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            rows.append(json.loads(line))
+                        except ValueError:
+                            break  # 最后一行写入不完整
+            row_bytes = self.dim * 4
+            vector_rows = os.path.getsize(self.vectors_file) // row_bytes if (
+                row_bytes and os.path.exists(self.vectors_file)) else 0
+            count = min(len(rows), vector_rows)
+            if vector_rows > count:
+                # 丢弃没有对应行记录的向量
+                with open(self.vectors_file, 'r+b') as f:
+                    f.truncate(count * row_bytes)
+            self._rows = rows[:count]
+            self._latest = {row[0]: i for i, row in enumerate(self._rows)}
+        except Exception as e:
+            print(f"[向量索引] 加载失败: {e}")
+            self._rows = []
+            self._latest = {}
+
+
+_global_index: Optional[EmbeddingIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_embedding_index() -> EmbeddingIndex:
+    """获取全局歌曲向量索引"""
+    global _global_index
+    if _global_index is None:
+        with _index_lock:
+            if _global_index is None:
+                _global_index = EmbeddingIndex()
+    return _global_index
@@ -0,0 +1,266 @@
+"""
+后台增量建立歌曲向量
+
+扫描曲库 (或从缓存加载) 后把歌曲交给 EmbeddingIndexer：
+- 后台单线程逐首处理，只计算索引中没有或文件已变化的歌曲
+- FFmpeg 以低优先级解码为低采样率单声道，整首歌都参与计算 (不只是开头两分钟)
+- 播放中按占空比限速：每处理一首歌后休息其耗时的若干倍，不和播放抢 CPU
+- 结果每攒够若干首或隔一段时间追加写入 EmbeddingIndex，中途退出也不丢失已完成的部分
+- 解码失败的文件按 (路径, 大小, 修改时间) 记入 failed.json，文件未变化时不再重试
+
+向量由频谱特征构成 (对数频带能量的均值/标准差/变化量)，不依赖外部模型
+"""
+
+import os
+import json
+import time
+import queue
+import threading
+import subprocess
+from typing import Optional, Callable, List, Dict
+
+from .embedding_index import EmbeddingIndex, get_embedding_index, NUMPY_AVAILABLE
+from .perf import span, log_debug, log_info
+from .transcode_cache import popen_low_priority
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+SAMPLE_RATE = 11025
+FRAME_SIZE = 2048
+N_BANDS = 48
+MIN_FREQ = 60.0
+MAX_FREQ = 5000.0
+# 最多分析的时长 (秒)，避免超长文件占用过多内存
+MAX_SECONDS = 900
+# 每次做 FFT 的帧数 (约 48 秒)
+BLOCK_FRAMES = 256
+# 攒够多少首或多少秒写一次索引
+FLUSH_COUNT = 16
+FLUSH_INTERVAL = 30.0
+# 播放中每处理一首歌后休息其耗时的倍数 (约占用 1 / (1 + 倍数) 的 CPU)
+PLAYING_SLEEP_FACTOR = 3.0
+
+
+class AudioEmbedder:
+    """用 FFmpeg 解码并计算歌曲的频谱特征向量"""
+
+    def __init__(self, ffmpeg: str = ""):
+        self.ffmpeg = ffmpeg
+        self._band_edges = None
+
+    def _open_decoder(self, path: str) -> subprocess.Popen:
+        cmd = [self.ffmpeg, '-v', 'error', '-threads', '1', '-t', str(MAX_SECONDS), '-i', path,
+               '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-']
+        return popen_low_priority(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def _bands(self) -> 'np.ndarray':
+        if self._band_edges is None:
+            freqs = np.geomspace(MIN_FREQ, MAX_FREQ, N_BANDS + 1)
+            edges = [int(round(f / SAMPLE_RATE * FRAME_SIZE)) for f in freqs]
+            # 低频处相邻边界可能落在同一个 bin，保证每个频带至少一个 bin
+            for i in range(1, len(edges)):
+                edges[i] = max(edges[i], edges[i - 1] + 1)
+            self._band_edges = np.array(edges)
+        return self._band_edges
+
+    def compute(self, path: str) -> Optional['np.ndarray']:
+        """
+        计算歌曲的特征向量，失败时返回 None
+
+        边解码边按块 (BLOCK_FRAMES 帧) 做 FFT，只累加各频带的和、平方和与相邻帧差，
+        内存占用与歌曲长度无关
+        """
+        window = np.hanning(FRAME_SIZE).astype(np.float32)
+        edges = self._bands()
+        block_bytes = FRAME_SIZE * 2 * BLOCK_FRAMES
+        total = np.zeros(N_BANDS)
+        total_sq = np.zeros(N_BANDS)
+        flux_total = np.zeros(N_BANDS)
+        frames = 0
+        previous = None  # 上一块的最后一帧，块边界处的变化量也要计入
+
+        proc = self._open_decoder(path)
+        try:
+            while True:
+                data = proc.stdout.read(block_bytes)
+                count = len(data) // (FRAME_SIZE * 2)
+                if count == 0:
+                    break
+                audio = np.frombuffer(data[:count * FRAME_SIZE * 2], dtype=np.int16)
+                audio = audio.astype(np.float32).reshape(count, FRAME_SIZE) / 32768.0
+                power = np.abs(np.fft.rfft(audio * window, axis=1)) ** 2
+                energy = np.add.reduceat(power[:, :edges[-1]], edges[:-1], axis=1)
+                log_energy = np.log10(energy + 1e-10).astype(np.float64)
+
+                total += log_energy.sum(axis=0)
+                total_sq += (log_energy ** 2).sum(axis=0)
+                if previous is not None:
+                    log_energy = np.vstack([previous, log_energy])
+                flux_total += np.abs(np.diff(log_energy, axis=0)).sum(axis=0)
+                previous = log_energy[-1:]
+                frames += count
+                if len(data) < block_bytes:
+                    break
+        except BaseException:
+            proc.kill()
+            raise
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0 or frames < 4:
+            return None
+
+        mean = total / frames
+        std = np.sqrt(np.maximum(total_sq / frames - mean ** 2, 0.0))
+        flux = flux_total / (frames - 1)
+        mean -= mean.mean()  # 只保留频谱形状，与响度无关
+        return np.concatenate([mean, std, flux]).astype(np.float32)
+
+
+class EmbeddingIndexer:
+    """后台增量计算歌曲向量"""
+
+    def __init__(self, index: Optional[EmbeddingIndex] = None, ffmpeg: str = "",
+                 is_playing: Optional[Callable[[], bool]] = None):
+        self.index = index if index is not None else get_embedding_index()
+        if not ffmpeg:
+            from .msst import AudioCompressor
+            ffmpeg = AudioCompressor.find_ffmpeg()
+        self.embedder = AudioEmbedder(ffmpeg)
+        self.is_playing = is_playing or (lambda: False)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._queued: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: List[tuple] = []
+        self._last_flush = time.monotonic()
+        self.indexed_count = 0
+        self._failed_file = os.path.join(self.index.index_dir, "failed.json")
+        self._failed: Dict[str, list] = self._load_failed()  # 路径 -> [大小, 修改时间(ns)]
+        self._failed_dirty = False
+
+    @property
+    def available(self) -> bool:
+        return NUMPY_AVAILABLE and bool(self.embedder.ffmpeg)
+
+    def schedule(self, paths: List[str], prune: bool = False):
+        """
+        安排计算这些歌曲的向量 (已是最新的歌曲在后台线程中跳过)
+
+        Args:
+            prune: 这些路径是完整曲库，顺便从索引中删除已不存在的歌曲
+        """
+        if not self.available:
+            return
+        with self._lock:
+            new_paths = [p for p in paths if p not in self._queued]
+            self._queued.update(new_paths)
+        if prune:
+            self._queue.put(('prune', list(paths)))
+        for path in new_paths:
+            self._queue.put(('embed', path))
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="embedding-indexer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                kind, value = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                self._flush()
+                continue
+            if kind == 'prune':
+                self.index.remove_missing(value)
+                self._prune_failed(value)
+            elif kind == 'embed':
+                self._embed(value)
+            if self._queue.empty():
+                self._flush()
+        self._flush()
+
+    def _embed(self, path: str):
+        with self._lock:
+            self._queued.discard(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        if self.index.is_current(path):
+            return
+        key = [st.st_size, st.st_mtime_ns]
+        if self._failed.get(path) == key:
+            return
+        start = time.perf_counter()
+        try:
+            with span("embedding.compute"):
+                vector = self.embedder.compute(path)
+        except Exception as e:
+            print(f"[向量索引] 计算失败 {os.path.basename(path)}: {e}")
+            vector = None
+        elapsed = time.perf_counter() - start
+        if vector is not None:
+            self._pending.append((path, vector, st.st_size, st.st_mtime_ns))
+            log_debug("向量索引", f"{os.path.basename(path)} ({elapsed:.2f}s)")
+            if self._failed.pop(path, None) is not None:
+                self._failed_dirty = True
+        else:
+            self._failed[path] = key
+            self._failed_dirty = True
+        if len(self._pending) >= FLUSH_COUNT or time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+            self._flush()
+        if self.is_playing():
+            # 播放中限速
+            self._stop.wait(elapsed * PLAYING_SLEEP_FACTOR)
+
+    def _load_failed(self) -> Dict[str, list]:
+        try:
+            with open(self._failed_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _prune_failed(self, keep_paths: List[str]):
+        keep = set(keep_paths)
+        missing = [path for path in self._failed if path not in keep]
+        for path in missing:
+            del self._failed[path]
+        self._failed_dirty = self._failed_dirty or bool(missing)
+
+    def _save_failed(self):
+        self._failed_dirty = False
+        try:
+            temp_file = self._failed_file + ".tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._failed, f, ensure_ascii=False)
+            os.replace(temp_file, self._failed_file)
+        except OSError as e:
+            print(f"[向量索引] 写入失败记录失败: {e}")
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if self._failed_dirty:
+            self._save_failed()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        try:
+            self.index.add_many(pending)
+            self.indexed_count += len(pending)
+            log_info("向量索引", f"已写入 {len(pending)} 首，共 {len(self.index)} 首")
+        except Exception as e:
+            print(f"[向量索引] 写入失败: {e}")
+
+    def shutdown(self, timeout: float = 5.0):
+        """停止后台线程并写入已完成的结果"""
+        self._stop.set()
+        self._queue.put(('stop', None))  # 唤醒等待中的后台线程
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
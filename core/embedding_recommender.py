@@ -0,0 +1,247 @@
+"""
+基于歌曲向量的相似推荐
+
+EmbeddingRecommendationProvider 在进程内回答相似推荐：
+- 向量矩阵来自 EmbeddingIndex (内存映射)，一次矩阵乘法得到与查询歌曲的余弦相似度
+- argpartition 取前若干候选，再用 MMR (最大边际相关) 重排，兼顾相似度和多样性
+- 推荐下一首时取前几名候选，结合从当前歌曲切换过去的历史反馈 (TransitionStore)
+  和各候选的跳过率 (ListeningHistory 的汇总) 选出一首
+- 查询歌曲还没有向量时，调用外部推荐服务 (personal_music_recommender 的 /recommend)；
+  服务不可用时交给后备提供者 (默认随机推荐)
+
+MMR 参数与外部服务的 config.json 一致: lambda, prelim_k_min, prelim_k_multiplier
+"""
+
+import json
+import time
+import threading
+import urllib.request
+from typing import Optional, List, Dict, Any, Tuple
+
+from .recommendation_api import RecommendationProvider, SongRecommendation
+from .embedding_index import EmbeddingIndex, get_embedding_index, NUMPY_AVAILABLE
+from .perf import span, log_debug
+
+if NUMPY_AVAILABLE:
+    import numpy as np
+
+DEFAULT_SERVICE_URL = "http://127.0.0.1:8000"
+# 外部服务请求超时和失败后暂停使用的时间 (秒)
+SERVICE_TIMEOUT = 2.0
+SERVICE_RETRY_INTERVAL = 60.0
+# 排除最近播放的歌曲数 (与 DefaultRecommendationProvider 一致)
+HISTORY_EXCLUDE = 10
+# 推荐下一首时参与转换反馈重排的候选数，以及转换评分的权重 (与个人推荐系统的 transition_weight 一致)
+NEXT_CANDIDATES = 5
+TRANSITION_WEIGHT = 0.35
+# 跳过率的惩罚权重
+SKIP_WEIGHT = 0.2
+
+
+class EmbeddingRecommendationProvider(RecommendationProvider):
+    """向量相似度 + MMR 推荐，未建立向量的歌曲回退到外部服务"""
+
+    def __init__(self, index: Optional[EmbeddingIndex] = None,
+                 fallback: Optional[RecommendationProvider] = None,
+                 service_url: str = DEFAULT_SERVICE_URL,
+                 transitions=None, history=None,
+                 mmr_lambda: float = 0.7, prelim_k_min: int = 20, prelim_k_multiplier: int = 4):
+        self.index = index if index is not None else get_embedding_index()
+        self.fallback = fallback
+        self.service_url = service_url.rstrip('/') if service_url else ""
+        self.transitions = transitions  # TransitionStore，可为 None
+        self.history = history  # ListeningHistory，可为 None
+        self.mmr_lambda = mmr_lambda
+        self.prelim_k_min = prelim_k_min
+        self.prelim_k_multiplier = prelim_k_multiplier
+        self._songs: Dict[str, Dict] = {}  # 路径 -> 歌曲信息
+        self._service_failed_at = 0.0
+        self._service_lock = threading.Lock()
+        # (视图, 歌曲池) -> 可推荐行掩码，两者之一变化时重建
+        self._mask_cache: Optional[tuple] = None
+
+    def set_song_pool(self, songs: List[Dict]):
+        """设置歌曲池 (推荐结果只包含池中的歌曲)"""
+        self._songs = {s.get('path'): s for s in songs}
+        if self.fallback is not None and hasattr(self.fallback, 'set_song_pool'):
+            self.fallback.set_song_pool(songs)
+
+    # ---------------- 向量查询 ----------------
+
+    def similar(self, query_paths: List[str], top_k: int,
+                exclude: Optional[set] = None) -> Optional[List[Tuple[str, float]]]:
+        """
+        查找与给定歌曲 (取向量平均) 最相似的歌曲
+
+        Returns:
+            [(路径, 相似度), ...]；查询歌曲都没有向量时返回 None
+        """
+        view = self.index.view() if NUMPY_AVAILABLE else None
+        if view is None:
+            return None
+        paths, matrix, valid, row_of = view
+        rows = [row_of[p] for p in query_paths if p in row_of]
+        if not rows:
+            return None
+
+        with span("recommender.embedding"):
+            query = np.asarray(matrix[rows], dtype=np.float32).mean(axis=0)
+            norm = float(np.linalg.norm(query))
+            if norm <= 0:
+                return None
+            query /= norm
+            sims = np.asarray(matrix @ query, dtype=np.float32)
+
+            # 排除: 作废行、不在歌曲池中的歌曲、查询歌曲本身、指定路径
+            mask = self._candidate_mask(view).copy()
+            mask[rows] = False
+            for path in exclude or ():
+                row = row_of.get(path)
+                if row is not None:
+                    mask[row] = False
+            candidates = np.flatnonzero(mask)
+            if len(candidates) == 0:
+                return []
+
+            top_k = min(top_k, len(candidates))
+            prelim_k = min(len(candidates), max(self.prelim_k_min, top_k * self.prelim_k_multiplier))
+            cand_sims = sims[candidates]
+            if prelim_k < len(candidates):
+                part = np.argpartition(-cand_sims, prelim_k - 1)[:prelim_k]
+                candidates, cand_sims = candidates[part], cand_sims[part]
+            order = self._mmr(np.asarray(matrix[candidates], dtype=np.float32), cand_sims, top_k)
+        return [(paths[candidates[i]], float(cand_sims[i])) for i in order]
+
+    def _candidate_mask(self, view) -> 'np.ndarray':
+        """有效且在歌曲池中的行 (按视图和歌曲池缓存)"""
+        song_pool = self._songs
+        cached = self._mask_cache
+        if cached is not None and cached[0] is view and cached[1] is song_pool:
+            return cached[2]
+        paths, _, valid, _ = view
+        if song_pool:
+            mask = np.fromiter((p in song_pool for p in paths), dtype=bool, count=len(paths)) & valid
+        else:
+            mask = valid
+        self._mask_cache = (view, song_pool, mask)
+        return mask
+
+    def _mmr(self, vectors: 'np.ndarray', sims: 'np.ndarray', top_k: int) -> List[int]:
+        """MMR 重排: 每次选 lambda * 相似度 - (1 - lambda) * 与已选歌曲的最大相似度 最大者"""
+        lam = self.mmr_lambda
+        pairwise = vectors @ vectors.T
+        selected: List[int] = []
+        max_sim_to_selected = np.full(len(sims), -np.inf, dtype=np.float32)
+        available = np.ones(len(sims), dtype=bool)
+        for _ in range(top_k):
+            if selected:
+                scores = lam * sims - (1 - lam) * max_sim_to_selected
+            else:
+                scores = sims.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise[best])
+        return selected
+
+    # ---------------- 外部服务 ----------------
+
+    def _remote_recommend(self, path: str, top_k: int, history: List[str]) -> Optional[List[Tuple[str, float]]]:
+        """调用外部推荐服务 /recommend，失败后一段时间内不再尝试"""
+        if not self.service_url or not path:
+            return None
+        with self._service_lock:
+            if time.monotonic() - self._service_failed_at < SERVICE_RETRY_INTERVAL:
+                return None
+        body = json.dumps({'track_path': path, 'top_k': top_k, 'history': history}).encode('utf-8')
+        request = urllib.request.Request(self.service_url + "/recommend", data=body,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=SERVICE_TIMEOUT) as response:
+                data = json.loads(response.read().decode('utf-8'))
+            return [(r.get('path'), float(r.get('sim', 0.0))) for r in data.get('results', []) if r.get('path')]
+        except Exception as e:
+            with self._service_lock:
+                self._service_failed_at = time.monotonic()
+            log_debug("相似推荐", f"外部推荐服务不可用: {e}")
+            return None
+
+    def _recommend(self, seed_paths: List[str], top_k: int, exclude: set) -> Optional[List[Tuple[str, float]]]:
+        results = self.similar(seed_paths, top_k, exclude)
+        if results is None and seed_paths:
+            results = self._remote_recommend(seed_paths[-1], top_k, list(exclude))
+            if results is not None:
+                song_pool = self._songs
+                results = [(p, s) for p, s in results
+                           if p not in exclude and p not in seed_paths and (not song_pool or p in song_pool)][:top_k]
+        return results
+
+    def _pick_next(self, current_path: str, results: List[Tuple[str, float]]) -> Tuple[str, float]:
+        """
+        按 相似度 + 转换评分 - 跳过率 选出下一首
+
+        只读取当前歌曲作为来源的转换记录；跳过率按播放次数打折 (只播放过一次时影响减半)
+        """
+        if len(results) == 1:
+            return results[0]
+        scores: Dict[str, float] = {}
+        if self.transitions is not None:
+            try:
+                scores = self.transitions.scores_from(current_path)
+            except Exception as e:
+                log_debug("相似推荐", f"读取转换记录失败: {e}")
+
+        def score(result: Tuple[str, float]) -> float:
+            path, sim = result
+            value = sim + TRANSITION_WEIGHT * scores.get(path, 0.0)
+            stats = self.history.get(path) if self.history is not None else None
+            if stats is not None:
+                value -= SKIP_WEIGHT * stats.skip_penalty
+            return value
+
+        return max(results, key=score)
+
+    def _song_info(self, path: str) -> Dict[str, Any]:
+        return self._songs.get(path) or {'path': path}
+
+    # ---------------- RecommendationProvider ----------------
+
+    def get_next_song(self, current_song, history, context) -> Optional[SongRecommendation]:
+        current_path = current_song.get('path') if current_song else None
+        exclude = {h.get('path') for h in history[-HISTORY_EXCLUDE:]} if history else set()
+        results = self._recommend([current_path], NEXT_CANDIDATES, exclude) if current_path else None
+        if results:
+            path, sim = self._pick_next(current_path, results)
+            return SongRecommendation(song_info=self._song_info(path), reason=f"相似推荐 (相似度 {sim:.2f})",
+                                      confidence=max(0.0, min(1.0, sim)), source="embedding")
+        if self.fallback is not None:
+            return self.fallback.get_next_song(current_song, history, context)
+        return None
+
+    def get_playlist(self, seed_songs, count=10, context=None) -> List[SongRecommendation]:
+        seed_paths = [s.get('path') for s in seed_songs if s.get('path')]
+        results = self._recommend(seed_paths, count, set(seed_paths)) if seed_paths else None
+        if results:
+            return [SongRecommendation(song_info=self._song_info(p), reason=f"相似推荐 (相似度 {sim:.2f})",
+                                       confidence=max(0.0, min(1.0, sim)), source="embedding")
+                    for p, sim in results]
+        if self.fallback is not None:
+            return self.fallback.get_playlist(seed_songs, count, context)
+        return []
+
+    def handles_feedback(self, hook: str) -> bool:
+        # 反馈只转交给后备推荐提供者，后备不处理时视为未处理
+        return self.fallback is not None and self.fallback.handles_feedback(hook)
+
+    def on_song_played(self, song: Dict, duration: float, completed: bool):
+        if self.fallback is not None:
+            self.fallback.on_song_played(song, duration, completed)
+
+    def on_song_skipped(self, song: Dict, position: float):
+        if self.fallback is not None:
+            self.fallback.on_song_skipped(song, position)
+
+    def on_song_liked(self, song: Dict, liked: bool):
+        if self.fallback is not None:
+            self.fallback.on_song_liked(song, liked)
@@ -0,0 +1,248 @@
+"""
+只追加的播放历史与每首歌曲的汇总
+
+旧的 history.json 是所有播放事件的数组，每次播放结束都整体重写，并且无限增长。
+ListeningHistory 改为：
+- 播放事件逐行追加到 history.<代>.jsonl，一次播放只写一行
+- 内存中维护每首歌曲的汇总 (播放次数、听完次数、跳过次数、累计收听时长、最近播放时间)，
+  读取方直接查询汇总，不再回放原始事件
+- 日志累计到一定条数 (以及退出时) 压缩：汇总写入 history_stats.json (原子替换)，
+  其中记录新的代，再删除旧一代日志；中途退出时按汇总文件中的代只回放对应的日志，
+  不会重复计数
+
+首次使用时导入旧的 history.json (旧文件保留不动)
+"""
+
+import os
+import json
+import time
+import threading
+from dataclasses import dataclass
+from typing import Optional, Dict, List
+
+from .transition_store import default_data_dir
+
+STATS_VERSION = 1
+# 日志累计多少条事件后压缩进汇总
+COMPACT_EVENTS = 500
+
+# 视为听完 / 跳过的播放行为 (包括旧 history.json 中的行为名)
+COMPLETE_ACTIONS = {'complete', 'end'}
+SKIP_ACTIONS = {'skip', 'skip_early', 'skip_mid', 'skip_late', 'half'}
+
+
+@dataclass
+class SongStats:
+    """一首歌曲的播放汇总"""
+    play_count: int = 0
+    complete_count: int = 0
+    skip_count: int = 0
+    listen_time: float = 0.0  # 累计收听时长 (秒)
+    last_played: float = 0.0  # 最近播放时间 (时间戳)
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skip_count / self.play_count if self.play_count else 0.0
+
+    @property
+    def skip_penalty(self) -> float:
+        """按播放次数打折的跳过率 (只播放过一次时影响减半)"""
+        return self.skip_ratio * self.play_count / (self.play_count + 1)
+
+    def add(self, action: str, listen_time: float, timestamp: float):
+        self.play_count += 1
+        if action in COMPLETE_ACTIONS:
+            self.complete_count += 1
+        elif action in SKIP_ACTIONS:
+            self.skip_count += 1
+        self.listen_time += max(0.0, listen_time)
+        self.last_played = max(self.last_played, timestamp)
+
+    def to_row(self) -> list:
+        return [self.play_count, self.complete_count, self.skip_count, round(self.listen_time, 3), self.last_played]
+
+    @classmethod
+    def from_row(cls, row: list) -> 'SongStats':
+        return cls(int(row[0]), int(row[1]), int(row[2]), float(row[3]), float(row[4]))
+
+
+class ListeningHistory:
+    """
+    播放历史日志 + 每首歌曲的汇总
+
+    线程安全；record() 只追加一行，汇总在内存中增量更新
+    """
+
+    def __init__(self, data_dir: str = ""):
+        self.data_dir = data_dir or default_data_dir()
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.stats_file = os.path.join(self.data_dir, "history_stats.json")
+        self._lock = threading.Lock()
+        self._songs: Dict[str, SongStats] = {}
+        self.generation = 0
+        self.total_events = 0  # 包括已压缩的事件
+        self._log_events = 0  # 当前日志中的事件数
+        self._load()
+
+    def _log_file(self, generation: int) -> str:
+        return os.path.join(self.data_dir, f"history.{generation}.jsonl")
+
+    # ---------------- 写入 ----------------
+
+    def record(self, path: str, action: str, listen_time: float = 0.0, duration: float = 0.0,
+               prev_path: str = "", timestamp: Optional[float] = None):
+        """追加一条播放事件"""
+        if not path:
+            return
+        event = {'path': path, 'timestamp': time.time() if timestamp is None else timestamp,
+                 'duration': duration, 'listen_time': listen_time, 'action': action, 'prev_path': prev_path}
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self._log_file(self.generation), 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._apply(event)
+            self._log_events += 1
+            if self._log_events >= COMPACT_EVENTS:
+                self._compact()
+
+    def _apply(self, event: Dict):
+        stats = self._songs.get(event['path'])
+        if stats is None:
+            stats = self._songs[event['path']] = SongStats()
+        stats.add(event.get('action', ''), float(event.get('listen_time', 0.0)), float(event.get('timestamp', 0.0)))
+        self.total_events += 1
+
+    def compact(self):
+        """把日志压缩进汇总文件"""
+        with self._lock:
+            if self._log_events:
+                self._compact()
+
+    def _compact(self):
+        """写入汇总并切换到新一代日志 (调用方持有锁)"""
+        old_generation = self.generation
+        self._write_stats(old_generation + 1)
+        self.generation = old_generation + 1
+        self._log_events = 0
+        try:
+            os.remove(self._log_file(old_generation))
+        except OSError:
+            pass
+        print(f"[播放历史] 已压缩: {self.total_events} 条事件, {len(self._songs)} 首歌曲")
+
+    def _write_stats(self, generation: int):
+        """写入汇总，指向 generation 这一代日志 (写入成功后调用方才切换到这一代)"""
+        data = {
+            'version': STATS_VERSION,
+            'generation': generation,
+            'total_events': self.total_events,
+            'legacy_imported': True,
+            'songs': {path: stats.to_row() for path, stats in self._songs.items()},
+        }
+        temp_file = self.stats_file + ".tmp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_file, self.stats_file)
+
+    def reset(self):
+        """清除所有播放历史"""
+        with self._lock:
+            old_generation = self.generation
+            songs, total_events = self._songs, self.total_events
+            self._songs, self.total_events = {}, 0
+            try:
+                self._write_stats(old_generation + 1)
+            except OSError:
+                self._songs, self.total_events = songs, total_events
+                raise
+            self.generation = old_generation + 1
+            self._log_events = 0
+            try:
+                os.remove(self._log_file(old_generation))
+            except OSError:
+                pass
+
+    # ---------------- 读取 ----------------
+
+    def get(self, path: str) -> Optional[SongStats]:
+        return self._songs.get(path)
+
+    def all_stats(self) -> Dict[str, SongStats]:
+        """路径 -> 汇总 (副本)"""
+        with self._lock:
+            return dict(self._songs)
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    # ---------------- 加载 ----------------
+
+    def _load(self):
+        legacy_imported = False
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == STATS_VERSION:
+                    self.generation = int(data.get('generation', 0))
+                    self.total_events = int(data.get('total_events', 0))
+                    legacy_imported = bool(data.get('legacy_imported', False))
+                    self._songs = {path: SongStats.from_row(row) for path, row in data.get('songs', {}).items()}
+            except Exception as e:
+                print(f"[播放历史] 加载汇总失败: {e}")
+                self._songs = {}
+
+        # 清理已压缩的旧日志，回放当前日志
+        for name in os.listdir(self.data_dir):
+            parts = name.split('.')
+            if len(parts) == 3 and parts[0] == 'history' and parts[2] == 'jsonl' and parts[1].isdigit() \
+                    and int(parts[1]) < self.generation:
+                try:
+                    os.remove(os.path.join(self.data_dir, name))
+                except OSError:
+                    pass
+        log_file = self._log_file(self.generation)
+        if os.path.exists(log_file):
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        continue  # 写入不完整的行
+                    self._log_events += 1
+
+        if not legacy_imported:
+            self._import_legacy(os.path.join(self.data_dir, "history.json"))
+
+    def _import_legacy(self, json_file: str):
+        """导入旧的 history.json 并立即压缩"""
+        events: List[Dict] = []
+        if os.path.exists(json_file):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    for item in json.load(f):
+                        events.append({'path': item.get('song_path', ''), 'timestamp': item.get('timestamp', 0.0),
+                                       'listen_time': item.get('listen_time', 0.0), 'action': item.get('action', '')})
+            except Exception as e:
+                print(f"[播放历史] 读取旧数据失败: {e}")
+                return
+        for event in events:
+            if event['path']:
+                self._apply(event)
+        self._compact()
+        if events:
+            print(f"[播放历史] 已导入旧数据 {len(events)} 条")
+
+
+_global_history: Optional[ListeningHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_listening_history() -> ListeningHistory:
+    """获取全局播放历史"""
+    global _global_history
+    if _global_history is None:
+        with _history_lock:
+            if _global_history is None:
+                _global_history = ListeningHistory()
+    return _global_history
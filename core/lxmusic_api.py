@@ -23,6 +23,8 @@ from concurrent.futures import ThreadPoolExecutor
 import threading
 import re
 
+from .perf import traced
+
 
 # API配置
 DEFAULT_API_URL = "https://source.shiqianjiang.cn"
@@ -129,6 +131,7 @@ class OnlineMusicClient:
         if key:
             self.api_key = key
         
+    @traced("http.online_source")
     def _request(self, url: str, method: str = 'GET', 
                  data: Optional[Dict] = None, use_auth: bool = True) -> Optional[Dict]:
         try:
@@ -489,6 +492,7 @@ class LXMusicLocalClient:
         self.base_url = f"http://{host}:{port}"
         self.timeout = 5
         
+    @traced("http.lxmusic_local")
     def _request(self, endpoint: str) -> Optional[Dict]:
         url = f"{self.base_url}{endpoint}"
         try:
@@ -552,6 +556,7 @@ class NeteaseCloudMusicAPI:
         self.api_url = api_url or (self.PUBLIC_APIS[0] if self.PUBLIC_APIS else None)
         self.timeout = 15
         
+    @traced("http.netease")
     def _request(self, endpoint: str, params: dict = None) -> Optional[Dict]:
         try:
             url = f"{self.api_url}{endpoint}"
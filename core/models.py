@@ -13,6 +13,9 @@ from concurrent.futures import ThreadPoolExecutor
 
 from PyQt6.QtCore import QThread, pyqtSignal, QAbstractTableModel, QModelIndex, Qt
 
+from .perf import traced
+from .stems_store import get_stems_store, get_stems_folder_index
+
 try:
     from mutagen import File as MutagenFile
     HAS_MUTAGEN = True
@@ -115,10 +118,12 @@ class SongScanner(QThread):
         self.music_path = music_path
         self.stems_path = stems_path
         self._stop_flag = False
+        self._store = get_stems_store()
         
     def stop(self):
         self._stop_flag = True
         
+    @traced("scan")
     def run(self):
         songs = []
         if not self.music_path or not os.path.exists(self.music_path):
@@ -145,27 +150,25 @@ class SongScanner(QThread):
                 self.progress.emit(i + 1, total)
                 
         self.progress.emit(total, total)
+        if not self._stop_flag:
+            self._store.retain_files(all_files)
+        self._store.save()
         self.finished_scan.emit(songs)
         
     def _get_stems_dict(self) -> Dict[str, str]:
         """获取所有stems文件夹，返回 {规范化名称: 实际路径} 的字典"""
         stems_dict = {}
         if self.stems_path and os.path.exists(self.stems_path):
-            for item in os.listdir(self.stems_path):
+            # 文件夹索引只重新列出修改时间变化过的文件夹
+            index = get_stems_folder_index()
+            for item in index.folders(self.stems_path, SUPPORTED_FORMATS):
                 item_path = os.path.join(self.stems_path, item)
-                if os.path.isdir(item_path):
-                    # 检查文件夹中是否有音频文件
-                    has_audio = any(
-                        f.lower().endswith(tuple(SUPPORTED_FORMATS))
-                        for f in os.listdir(item_path)
-                        if os.path.isfile(os.path.join(item_path, f))
-                    )
-                    if has_audio:
-                        # 使用规范化的名称作为key，便于匹配
-                        normalized_name = self._normalize_song_name(item)
-                        stems_dict[normalized_name] = item_path
-                        # 同时保存原始名称
-                        stems_dict[item] = item_path
+                # 使用规范化的名称作为key，便于匹配
+                normalized_name = self._normalize_song_name(item)
+                stems_dict[normalized_name] = item_path
+                # 同时保存原始名称
+                stems_dict[item] = item_path
+            index.save()
         return stems_dict
     
     @staticmethod
@@ -193,16 +196,20 @@ class SongScanner(QThread):
             stem_name = Path(filename).stem
             
             # 尝试多种匹配方式
-            stems_path = None
+            # 1. 按内容指纹查找 (改名、移动、重复的歌曲共用分离结果)
+            stems_path = self._store.lookup(filepath)
             
-            # 1. 精确匹配文件名（不含扩展名）
-            if stem_name in stems_dict:
-                stems_path = stems_dict[stem_name]
-            else:
-                # 2. 规范化名称匹配
-                normalized = self._normalize_song_name(stem_name)
-                if normalized in stems_dict:
-                    stems_path = stems_dict[normalized]
+            if not stems_path:
+                # 2. 精确匹配文件名（不含扩展名）
+                if stem_name in stems_dict:
+                    stems_path = stems_dict[stem_name]
+                else:
+                    # 3. 规范化名称匹配
+                    normalized = self._normalize_song_name(stem_name)
+                    if normalized in stems_dict:
+                        stems_path = stems_dict[normalized]
+                if stems_path:
+                    self._store.register(filepath, stems_path)
                     
             if stems_path:
                 song.has_stems = True
@@ -473,6 +480,7 @@ class SongCache:
         self.cache_file = os.path.join(cache_dir, "song_cache.json")
         os.makedirs(cache_dir, exist_ok=True)
         
+    @traced("cache.save")
     def save_cache(self, songs: List[SongInfo], music_path: str, stems_path: str):
         """保存歌曲列表到缓存"""
         try:
@@ -507,6 +515,7 @@ class SongCache:
         except Exception as e:
             print(f"保存缓存失败: {e}")
             
+    @traced("cache.load")
     def load_cache(self, music_path: str, stems_path: str) -> Optional[List[SongInfo]]:
         """从缓存加载歌曲列表，如果缓存有效的话"""
         try:
@@ -583,29 +592,60 @@ class SongCache:
         except Exception:
             pass
             
-    def update_stems_status(self, songs: List[SongInfo], stems_path: str):
-        """更新歌曲的stems状态（用于分离完成后）"""
+    @staticmethod
+    def find_stems_status(songs: List[Tuple[str, str]], stems_path: str, should_stop=None) -> Dict[str, str]:
+        """
+        查找歌曲的stems文件夹（用于分离完成后、从缓存加载后）
+
+        Args:
+            songs: [(歌曲路径, 文件名), ...]，只包含尚未标记有stems的本地歌曲
+            should_stop: 可选，返回 True 时提前结束
+
+        Returns:
+            歌曲路径 -> stems文件夹
+        """
+        found_dirs: Dict[str, str] = {}
         if not stems_path or not os.path.exists(stems_path):
-            return
+            return found_dirs
             
-        stems_folders = set()
-        for item in os.listdir(stems_path):
-            item_path = os.path.join(stems_path, item)
-            if os.path.isdir(item_path):
-                # 检查是否有音频文件
-                has_audio = any(
-                    f.lower().endswith(tuple(SUPPORTED_FORMATS))
-                    for f in os.listdir(item_path)
-                    if os.path.isfile(os.path.join(item_path, f))
-                )
-                if has_audio:
-                    stems_folders.add(item)
-                    
-        for song in songs:
-            stem_name = Path(song.filename).stem
-            if stem_name in stems_folders and not song.has_stems:
-                song.has_stems = True
-                song.stems_path = os.path.join(stems_path, stem_name)
+        index = get_stems_folder_index()
+        stems_folders = set(index.folders(stems_path, SUPPORTED_FORMATS))
+        index.save()
+        
+        store = get_stems_store()
+        for path, filename in songs:
+            if should_stop and should_stop():
+                break
+            # 内容相同的歌曲已经分离过
+            found = store.lookup(path)
+            stem_name = Path(filename).stem
+            if not found and stem_name in stems_folders:
+                found = os.path.join(stems_path, stem_name)
+                store.register(path, found)
+            if found:
+                found_dirs[path] = found
+        store.save()
+        return found_dirs
+
+
+class StemsStatusUpdater(QThread):
+    """
+    后台更新歌曲的stems状态
+
+    内容指纹未缓存的歌曲需要读取文件，不能在界面线程中进行；
+    结果通过 stems_found 信号交回界面线程，由界面线程修改歌曲信息
+    """
+    stems_found = pyqtSignal(dict)  # 歌曲路径 -> stems文件夹
+    
+    def __init__(self, songs: List[SongInfo], stems_path: str):
+        super().__init__()
+        self.songs = [(s.path, s.filename) for s in songs if not s.has_stems and not s.is_online]
+        self.stems_path = stems_path
+        
+    def run(self):
+        found = SongCache.find_stems_status(self.songs, self.stems_path, self.isInterruptionRequested)
+        if found and not self.isInterruptionRequested():
+            self.stems_found.emit(found)
 
 
 # 需要导入json
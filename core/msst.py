@@ -9,12 +9,24 @@ MSST音轨分离模块 - 修复版 v4.1
 
 import os
 import sys
+import time
+import uuid
+import queue
 import shutil
+import threading
 import subprocess
+import tempfile
+import re
 import json
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Optional, Callable, Tuple, List, Dict, Any
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from .perf import span, log_debug
+
 
 class AudioCompressor:
     """
@@ -52,6 +64,72 @@ class AudioCompressor:
         
         return ""
     
+    @staticmethod
+    def default_workers() -> int:
+        """默认并行压缩数 (CPU核心数)"""
+        return max(1, os.cpu_count() or 1)
+    
+    @staticmethod
+    def _codec_args(output_ext: str, target_bitrate: str) -> list:
+        """输出格式对应的FFmpeg编码参数"""
+        # 使用高质量设置，保持尽可能好的音质
+        if output_ext in ['.m4a', '.aac']:
+            # AAC编码 - 使用VBR模式获得更好音质
+            return [
+                '-c:a', 'aac',
+                '-b:a', target_bitrate,
+                '-vbr', '4',  # VBR质量级别 (1-5, 4是高质量)
+                '-movflags', '+faststart',  # 优化网络播放
+            ]
+        elif output_ext == '.ogg':
+            # OGG Vorbis编码
+            return [
+                '-c:a', 'libvorbis',
+                '-b:a', target_bitrate,
+                '-q:a', '4',  # 质量级别
+            ]
+        elif output_ext == '.opus':
+            # Opus编码 - 最高效的编码器
+            return [
+                '-c:a', 'libopus',
+                '-b:a', target_bitrate,
+                '-vbr', 'on',
+                '-compression_level', '10',
+            ]
+        # MP3编码
+        return [
+            '-c:a', 'libmp3lame',
+            '-b:a', target_bitrate,
+            '-q:a', '2',  # VBR质量
+        ]
+    
+    @staticmethod
+    def _temp_output_path(output_path: str) -> str:
+        return output_path + ".temp" + os.path.splitext(output_path)[1].lower()
+    
+    @staticmethod
+    def _finalize_output(input_path: str, temp_output: str, output_path: str) -> tuple:
+        """把临时输出移动到最终位置并删除原文件"""
+        # 检查输出文件
+        if not os.path.exists(temp_output):
+            return False, "压缩后的文件未生成", ""
+        
+        # 获取文件大小信息
+        original_size = os.path.getsize(input_path)
+        compressed_size = os.path.getsize(temp_output)
+        ratio = original_size / compressed_size if compressed_size > 0 else 0
+        
+        # 移动临时文件到最终位置
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        shutil.move(temp_output, output_path)
+        
+        # 删除原始WAV文件（如果输出路径不同）
+        if input_path != output_path and os.path.exists(input_path):
+            os.remove(input_path)
+        
+        return True, f"压缩完成 (比例 1:{ratio:.1f})", output_path
+    
     @staticmethod
     def compress_audio(input_path: str, output_path: str = None, 
                        target_bitrate: str = "64k",
@@ -84,49 +162,13 @@ class AudioCompressor:
         output_ext = os.path.splitext(output_path)[1].lower()
         
         # 临时输出文件
-        temp_output = output_path + ".temp" + output_ext
+        temp_output = AudioCompressor._temp_output_path(output_path)
         
         try:
             # 构建FFmpeg命令
-            # 使用高质量设置，保持尽可能好的音质
-            if output_ext in ['.m4a', '.aac']:
-                # AAC编码 - 使用VBR模式获得更好音质
-                cmd = [
-                    ffmpeg, '-y', '-i', input_path,
-                    '-c:a', 'aac',
-                    '-b:a', target_bitrate,
-                    '-vbr', '4',  # VBR质量级别 (1-5, 4是高质量)
-                    '-movflags', '+faststart',  # 优化网络播放
-                    temp_output
-                ]
-            elif output_ext == '.ogg':
-                # OGG Vorbis编码
-                cmd = [
-                    ffmpeg, '-y', '-i', input_path,
-                    '-c:a', 'libvorbis',
-                    '-b:a', target_bitrate,
-                    '-q:a', '4',  # 质量级别
-                    temp_output
-                ]
-            elif output_ext == '.opus':
-                # Opus编码 - 最高效的编码器
-                cmd = [
-                    ffmpeg, '-y', '-i', input_path,
-                    '-c:a', 'libopus',
-                    '-b:a', target_bitrate,
-                    '-vbr', 'on',
-                    '-compression_level', '10',
-                    temp_output
-                ]
-            else:
-                # MP3编码
-                cmd = [
-                    ffmpeg, '-y', '-i', input_path,
-                    '-c:a', 'libmp3lame',
-                    '-b:a', target_bitrate,
-                    '-q:a', '2',  # VBR质量
-                    temp_output
-                ]
+            cmd = ([ffmpeg, '-y', '-i', input_path]
+                   + AudioCompressor._codec_args(output_ext, target_bitrate)
+                   + [temp_output])
             
             if progress_callback:
                 progress_callback(f"正在压缩: {os.path.basename(input_path)}")
@@ -147,25 +189,7 @@ class AudioCompressor:
                     os.remove(temp_output)
                 return False, f"压缩失败: {result.stderr[-500:]}", ""
             
-            # 检查输出文件
-            if not os.path.exists(temp_output):
-                return False, "压缩后的文件未生成", ""
-            
-            # 获取文件大小信息
-            original_size = os.path.getsize(input_path)
-            compressed_size = os.path.getsize(temp_output)
-            ratio = original_size / compressed_size if compressed_size > 0 else 0
-            
-            # 移动临时文件到最终位置
-            if os.path.exists(output_path):
-                os.remove(output_path)
-            shutil.move(temp_output, output_path)
-            
-            # 删除原始WAV文件（如果输出路径不同）
-            if input_path != output_path and os.path.exists(input_path):
-                os.remove(input_path)
-            
-            return True, f"压缩完成 (比例 1:{ratio:.1f})", output_path
+            return AudioCompressor._finalize_output(input_path, temp_output, output_path)
             
         except Exception as e:
             # 清理临时文件
@@ -173,18 +197,87 @@ class AudioCompressor:
                 os.remove(temp_output)
             return False, f"压缩出错: {str(e)}", ""
     
+    @staticmethod
+    def compress_many_single_pass(jobs: List[Tuple[str, str]], target_bitrate: str = "64k",
+                                  progress_callback=None) -> List[tuple]:
+        """
+        用一个FFmpeg进程压缩多个文件 (多输入多输出，省去重复启动和探测的开销)
+        
+        Args:
+            jobs: [(输入路径, 输出路径), ...]
+            
+        Returns:
+            每个文件的 (success, message, output_path)，顺序与 jobs 一致
+        """
+        ffmpeg = AudioCompressor.find_ffmpeg()
+        if not ffmpeg:
+            return [(False, "未找到FFmpeg，请安装FFmpeg后重试", "")] * len(jobs)
+        
+        cmd = [ffmpeg, '-y']
+        for input_path, _ in jobs:
+            cmd += ['-i', input_path]
+        temp_outputs = []
+        for index, (_, output_path) in enumerate(jobs):
+            temp_output = AudioCompressor._temp_output_path(output_path)
+            temp_outputs.append(temp_output)
+            output_ext = os.path.splitext(output_path)[1].lower()
+            cmd += (['-map', f'{index}:a']
+                    + AudioCompressor._codec_args(output_ext, target_bitrate)
+                    + [temp_output])
+        
+        if progress_callback:
+            progress_callback(f"正在压缩 {len(jobs)} 个文件 (单进程)...")
+        
+        try:
+            result = subprocess.run(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace'
+            )
+            error = f"压缩失败: {result.stderr[-500:]}" if result.returncode != 0 else ""
+        except Exception as e:
+            error = f"压缩出错: {str(e)}"
+        
+        results = []
+        for (input_path, output_path), temp_output in zip(jobs, temp_outputs):
+            if error:
+                if os.path.exists(temp_output):
+                    os.remove(temp_output)
+                results.append((False, error, ""))
+            else:
+                results.append(AudioCompressor._finalize_output(input_path, temp_output, output_path))
+        return results
+    
+    @staticmethod
+    def resolve_format(output_format: str) -> str:
+        """'auto' 解析为输出后端能直接解码的压缩格式 (pygame 为 ogg，加载时无需 FFmpeg)"""
+        if output_format == 'auto':
+            from .audio_output import get_output_backend
+            return get_output_backend().preferred_stem_format
+        return output_format
+    
     @staticmethod
     def compress_directory(directory: str, target_bitrate: str = "64k",
                           output_format: str = "m4a",
-                          progress_callback=None) -> tuple:
+                          progress_callback=None,
+                          max_workers: int = 0,
+                          single_pass: bool = False) -> tuple:
         """
         压缩目录中的所有音频文件
         
+        每个文件一个FFmpeg进程，最多 max_workers 个同时运行；
+        single_pass 为 True 时所有文件交给一个FFmpeg进程
+        
         Args:
             directory: 目录路径
             target_bitrate: 目标比特率
-            output_format: 输出格式
-            progress_callback: 进度回调
+            output_format: 输出格式 ('auto' 表示按播放引擎选择能直接解码的格式)
+            progress_callback: 进度回调 (在调用线程中执行)
+            max_workers: 并行压缩数 (0 表示按CPU核心数)
+            single_pass: 使用单个FFmpeg进程多路输出
             
         Returns:
             (success: bool, message: str, compressed_files: list)
@@ -196,29 +289,42 @@ class AudioCompressor:
         source_formats = ('.wav', '.flac', '.aiff', '.aif')
         files_to_compress = []
         
-        for f in os.listdir(directory):
+        for f in sorted(os.listdir(directory)):
             if f.lower().endswith(source_formats):
                 files_to_compress.append(os.path.join(directory, f))
         
         if not files_to_compress:
             return True, "没有需要压缩的文件", []
         
+        output_format = AudioCompressor.resolve_format(output_format)
+        jobs = [(filepath, os.path.splitext(filepath)[0] + "." + output_format.lstrip('.'))
+                for filepath in files_to_compress]
+        total = len(jobs)
+        results = []
+        
+        with span("compress"):
+            if single_pass and total > 1:
+                results = list(zip(files_to_compress, AudioCompressor.compress_many_single_pass(
+                    jobs, target_bitrate, progress_callback)))
+            else:
+                workers = min(max_workers or AudioCompressor.default_workers(), total)
+                if progress_callback:
+                    progress_callback(f"正在压缩 {total} 个文件 ({workers} 路并行)...")
+                # 编码在FFmpeg子进程里完成，线程只负责等待，因此线程池即可占满多个核心
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="compress") as pool:
+                    futures = {
+                        pool.submit(AudioCompressor.compress_audio, filepath, output_path, target_bitrate): filepath
+                        for filepath, output_path in jobs
+                    }
+                    for future in as_completed(futures):
+                        filepath = futures[future]
+                        results.append((filepath, future.result()))
+                        if progress_callback:
+                            progress_callback(f"压缩中 ({len(results)}/{total}): {os.path.basename(filepath)}")
+        
         compressed_files = []
         failed_files = []
-        total = len(files_to_compress)
-        
-        for i, filepath in enumerate(files_to_compress):
-            if progress_callback:
-                progress_callback(f"压缩中 ({i+1}/{total}): {os.path.basename(filepath)}")
-            
-            # 确定输出路径
-            base = os.path.splitext(filepath)[0]
-            output_path = base + "." + output_format.lstrip('.')
-            
-            success, msg, out_path = AudioCompressor.compress_audio(
-                filepath, output_path, target_bitrate, progress_callback
-            )
-            
+        for filepath, (success, msg, out_path) in results:
             if success:
                 compressed_files.append(out_path)
             else:
@@ -231,15 +337,514 @@ class AudioCompressor:
         return True, f"成功压缩 {len(compressed_files)} 个文件", compressed_files
 
 
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "msst_worker.py")
+
+
+def _msst_env(msst_path: str) -> dict:
+    """运行 MSST 脚本的环境变量 (把 MSST 根目录加入 PYTHONPATH)"""
+    env = os.environ.copy()
+    pythonpath = env.get('PYTHONPATH', '')
+    if pythonpath:
+        env['PYTHONPATH'] = f"{msst_path}{os.pathsep}{pythonpath}"
+    else:
+        env['PYTHONPATH'] = msst_path
+    return env
+
+
+def stage_input_file(source: str, dest: str) -> str:
+    """
+    把输入文件放进暂存目录：同一文件系统上用硬链接，其次符号链接，最后才复制
+    
+    Returns:
+        使用的方式: 'hardlink' / 'symlink' / 'copy'
+    """
+    try:
+        os.link(source, dest)
+        return 'hardlink'
+    except (OSError, AttributeError, NotImplementedError):
+        pass
+    try:
+        os.symlink(os.path.abspath(source), dest)
+        return 'symlink'
+    except (OSError, AttributeError, NotImplementedError):
+        pass
+    shutil.copy2(source, dest)
+    return 'copy'
+
+
+STAGING_PREFIX = ".msst_job_"
+BATCH_STAGING_PREFIX = ".msst_batch_"
+
+
+def make_staging_dir(root: str, prefix: str = STAGING_PREFIX) -> str:
+    """在 root 下创建本次任务独占的隐藏暂存目录"""
+    os.makedirs(root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir=root)
+
+
+def cleanup_stale_staging(root: str, max_age: float = 24 * 3600) -> int:
+    """清理程序崩溃等情况下遗留的暂存目录，返回清理的数量"""
+    if not root or not os.path.isdir(root):
+        return 0
+    removed = 0
+    now = time.time()
+    for name in os.listdir(root):
+        if not name.startswith((STAGING_PREFIX, BATCH_STAGING_PREFIX)):
+            continue
+        path = os.path.join(root, name)
+        try:
+            if now - os.path.getmtime(path) < max_age:
+                continue
+        except OSError:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        removed += 1
+    if removed:
+        print(f"[MSST] 清理了 {removed} 个遗留的暂存目录")
+    return removed
+
+
+def commit_stems_dir(work_dir: str, final_dir: str):
+    """
+    把已经准备好 (移动、压缩完成) 的音轨目录提交到 stems 文件夹
+    
+    work_dir 与 final_dir 在同一目录下时整个目录一次重命名完成，
+    曲库扫描不会看到写了一半的音轨；目标已存在时先把旧目录改名到一旁
+    (暂存前缀，崩溃时由 cleanup_stale_staging 清理)，新目录改名到位后再删除旧目录
+    """
+    old_dir = None
+    if os.path.exists(final_dir):
+        old_dir = os.path.join(os.path.dirname(final_dir), f"{STAGING_PREFIX}old_{uuid.uuid4().hex[:8]}")
+        os.replace(final_dir, old_dir)
+    try:
+        try:
+            os.replace(work_dir, final_dir)
+        except OSError:
+            # 跨文件系统
+            shutil.move(work_dir, final_dir)
+    except OSError:
+        if old_dir is not None and not os.path.exists(final_dir):
+            os.replace(old_dir, final_dir)
+        raise
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class PersistentMSSTWorker:
+    """
+    常驻 MSST 分离进程客户端
+    
+    模型只在进程启动时加载一次，之后每首歌曲只需发送一条请求。
+    每个任务前做一次 ping 健康检查，进程退出或无响应时自动重启 (每个任务最多 MAX_RESTARTS 次，
+    超过后这个任务回退到逐首分离，下个任务重新计数)；分离过程中超过 SEPARATE_IDLE_TIMEOUT 没有任何输出视为卡死，结束进程，
+    下个任务时重启。
+    只有无法启动解释器、MSST 版本不提供常驻模式所需的接口 (导入失败) 或不遵守协议时才标记为
+    unsupported，由调用方回退到逐首启动进程
+    """
+    
+    STARTUP_TIMEOUT = 600.0  # 模型加载可能很慢 (CPU)
+    PING_TIMEOUT = 10.0
+    SEPARATE_IDLE_TIMEOUT = 600.0  # 分离中没有任何输出 (事件或日志) 的最长时间
+    MAX_RESTARTS = 3
+    
+    def __init__(self, python_path: str, msst_path: str, model_type: str,
+                 config_path: str, model_path: str, output_format: str = 'wav'):
+        self.python_path = python_path
+        self.msst_path = msst_path
+        self.model_type = model_type
+        self.config_path = config_path
+        self.model_path = model_path
+        self.output_format = output_format
+        
+        self.unsupported = False
+        self.last_error = ""
+        self.restarts = 0
+        self.jobs_done = 0
+        self._started = False  # 是否尝试启动过 (之后的启动都算重启)
+        self._last_activity = 0.0
+        
+        self._process: Optional[subprocess.Popen] = None
+        self._events: queue.Queue = queue.Queue()
+        self._job_lock = threading.Lock()
+        self._log_tail = deque(maxlen=50)
+        self._progress_callback: Optional[Callable[[str], None]] = None
+        
+    @property
+    def key(self) -> tuple:
+        return (self.python_path, self.msst_path, self.model_type,
+                self.config_path, self.model_path, self.output_format)
+        
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+        
+    def start(self) -> bool:
+        """启动进程并等待模型加载完成"""
+        self.terminate()
+        self._events = queue.Queue()
+        self._log_tail.clear()
+        
+        cmd = [
+            self.python_path or sys.executable, WORKER_SCRIPT,
+            "--msst_path", self.msst_path,
+            "--model_type", self.model_type,
+            "--config_path", self.config_path,
+            "--model_path", self.model_path,
+            "--output_format", self.output_format,
+        ]
+        try:
+            self._process = subprocess.Popen(
+                cmd, cwd=self.msst_path, env=_msst_env(self.msst_path),
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True, encoding='utf-8', errors='replace', bufsize=1
+            )
+        except OSError as e:
+            self.last_error = str(e)
+            self.unsupported = True
+            print(f"[MSSTWorker] 无法启动常驻分离进程，回退到逐首分离: {e}")
+            return False
+        
+        events = self._events
+        threading.Thread(target=self._read_events, args=(self._process.stdout, events),
+                         daemon=True, name="MSSTWorkerEvents").start()
+        threading.Thread(target=self._read_log, args=(self._process.stderr,),
+                         daemon=True, name="MSSTWorkerLog").start()
+        
+        event = self._wait_event(lambda e: e.get('event') in ('ready', 'error', 'exit'), self.STARTUP_TIMEOUT,
+                                 any_event=True)
+        if event and event.get('event') == 'ready':
+            print(f"[MSSTWorker] 常驻分离进程已就绪 (pid={event.get('pid')})")
+            return True
+        
+        self.last_error = (event or {}).get('message') or "\n".join(list(self._log_tail)[-15:]) or "启动超时"
+        if event and (event.get('kind') == 'import' or event.get('event') not in ('error', 'exit')):
+            # 导入失败或收到了协议之外的事件: 这个 MSST 版本不支持常驻模式
+            self.unsupported = True
+            print(f"[MSSTWorker] 不支持常驻分离进程，回退到逐首分离: {self.last_error[:200]}")
+        else:
+            print(f"[MSSTWorker] 常驻分离进程启动失败: {self.last_error[:200]}")
+        self.terminate()
+        return False
+        
+    def _read_events(self, stream, events: queue.Queue):
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.put(json.loads(line))
+            except ValueError:
+                self._log_tail.append(line)
+        events.put({'event': 'exit'})
+        
+    def _read_log(self, stream):
+        for line in stream:
+            # tqdm 用 \r 刷新同一行
+            line = line.strip().split('\r')[-1].strip()
+            if not line:
+                continue
+            self._last_activity = time.time()
+            self._log_tail.append(line)
+            callback = self._progress_callback
+            if callback:
+                callback(line)
+                
+    def _wait_event(self, predicate, timeout: Optional[float], idle: bool = False,
+                    any_event: bool = False) -> Optional[dict]:
+        """
+        等待满足条件的事件 (进程退出时返回 exit 事件)，超时返回 None
+
+        Args:
+            idle: timeout 按最后一次输出 (事件或日志行) 计算，有输出就重新计时
+            any_event: 收到不满足条件的事件时也立即返回该事件
+        """
+        started = time.time()
+        self._last_activity = started
+        while True:
+            remaining = None
+            if timeout:
+                since = self._last_activity if idle else started
+                remaining = since + timeout - time.time()
+                if remaining <= 0:
+                    return None
+                if idle:
+                    remaining = min(remaining, 1.0)  # 定期检查日志输出
+            try:
+                event = self._events.get(timeout=remaining)
+            except queue.Empty:
+                if idle:
+                    continue
+                return None
+            self._last_activity = time.time()
+            if predicate(event) or event.get('event') == 'exit' or any_event:
+                return event
+                
+    def _send(self, payload: dict) -> bool:
+        try:
+            self._process.stdin.write(json.dumps(payload, ensure_ascii=False) + "\n")
+            self._process.stdin.flush()
+            return True
+        except (OSError, ValueError, AttributeError):
+            return False
+            
+    def _ping_locked(self) -> bool:
+        if not self.is_alive():
+            return False
+        request_id = uuid.uuid4().hex
+        if not self._send({'id': request_id, 'cmd': 'ping'}):
+            return False
+        event = self._wait_event(lambda e: e.get('id') == request_id, self.PING_TIMEOUT)
+        return bool(event and event.get('event') == 'pong')
+        
+    def ping(self) -> bool:
+        """健康检查 (有任务在运行时只检查进程是否存活)"""
+        if not self._job_lock.acquire(blocking=False):
+            return self.is_alive()
+        try:
+            return self._ping_locked()
+        finally:
+            self._job_lock.release()
+            
+    def _ensure_ready_locked(self) -> bool:
+        if self._ping_locked():
+            return True
+        while not self.unsupported:
+            if self._started:
+                if self.restarts >= self.MAX_RESTARTS:
+                    print(f"[MSSTWorker] 分离进程已连续重启 {self.restarts} 次，本次回退到逐首分离")
+                    return False
+                self.restarts += 1
+                print(f"[MSSTWorker] 分离进程无响应，正在重启 ({self.restarts}/{self.MAX_RESTARTS})...")
+            self._started = True
+            if self.start():
+                return True
+        return False
+        
+    def separate(self, input_folder: str, output_dir: str,
+                 progress_callback: Optional[Callable[[str], None]] = None,
+                 timeout: Optional[float] = SEPARATE_IDLE_TIMEOUT, owner: Any = None,
+                 should_stop: Optional[Callable[[], bool]] = None) -> Tuple[Optional[bool], str]:
+        """
+        分离一个输入文件夹中的所有歌曲
+        
+        同一时间只运行一个任务，其他调用方排队等待；推理不能在同一个进程中并行
+        
+        Args:
+            timeout: 没有任何输出的最长时间 (秒)，超过时结束进程 (下个任务时重启)；None 表示不限
+            owner: 任务所属的调用方，terminate_job(owner) 只结束它自己的任务
+            should_stop: 排队结束后检查，返回 True 时不再开始分离
+        
+        Returns:
+            (成功与否, 消息)；常驻进程不可用时返回 (None, 原因)，调用方应回退
+        """
+        with self._job_lock:
+            if should_stop is not None and should_stop():
+                return False, "已取消"
+            self._job_owner = owner
+            try:
+                return self._separate_locked(input_folder, output_dir, progress_callback, timeout)
+            finally:
+                self._job_owner = None
+                
+    def _separate_locked(self, input_folder: str, output_dir: str,
+                         progress_callback: Optional[Callable[[str], None]],
+                         timeout: Optional[float]) -> Tuple[Optional[bool], str]:
+        # 重启次数按任务计算，一个任务重启失败回退后，下一个任务仍会尝试启动进程
+        self.restarts = 0
+        if progress_callback:
+            progress_callback("正在连接常驻分离进程...")
+        if not self._ensure_ready_locked():
+            return None, self.last_error
+        
+        self._progress_callback = progress_callback
+        try:
+            request_id = uuid.uuid4().hex
+            if not self._send({'id': request_id, 'cmd': 'separate',
+                               'input_folder': input_folder, 'output_dir': output_dir}):
+                return False, "无法向分离进程发送请求"
+            event = self._wait_event(lambda e: e.get('id') == request_id, timeout, idle=True)
+        finally:
+            self._progress_callback = None
+        
+        if event is None:
+            print(f"[MSSTWorker] 分离进程 {timeout:.0f}s 没有输出，结束进程")
+            self.terminate()
+            return False, "分离超时 (分离进程无响应)"
+        if event.get('event') == 'exit':
+            return False, "分离进程意外退出\n\n" + "\n".join(list(self._log_tail)[-15:])
+        if event.get('ok'):
+            self.jobs_done += 1
+            return True, f"分离耗时 {event.get('seconds', 0):.1f}s"
+        return False, event.get('error', '分离失败')
+            
+    def terminate_job(self, owner: Any) -> bool:
+        """owner 的任务正在运行时结束进程 (下次任务时自动重启)，返回是否结束"""
+        if owner is None or self._job_owner is not owner:
+            return False
+        self.terminate()
+        return True
+        
+    def terminate(self):
+        """立即结束进程 (下次任务时自动重启)"""
+        process = self._process
+        if process is None:
+            return
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self._process = None
+        
+    def stop(self):
+        """正常关闭进程"""
+        if self.is_alive():
+            self._send({'cmd': 'shutdown'})
+            try:
+                self._process.wait(10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.terminate()
+
+
+_persistent_worker: Optional[PersistentMSSTWorker] = None
+_persistent_worker_lock = threading.Lock()
+
+
+def get_persistent_worker(python_path: str, msst_path: str, model_type: str,
+                          config_path: str, model_path: str,
+                          output_format: str = 'wav') -> PersistentMSSTWorker:
+    """获取常驻分离进程 (配置变化时关闭旧进程)"""
+    global _persistent_worker
+    with _persistent_worker_lock:
+        worker = PersistentMSSTWorker(python_path, msst_path, model_type,
+                                      config_path, model_path, output_format)
+        if _persistent_worker is not None and _persistent_worker.key == worker.key:
+            return _persistent_worker
+        if _persistent_worker is not None:
+            _persistent_worker.stop()
+        _persistent_worker = worker
+        return worker
+
+
+def shutdown_persistent_worker():
+    """关闭常驻分离进程 (程序退出时调用)"""
+    global _persistent_worker
+    with _persistent_worker_lock:
+        if _persistent_worker is not None:
+            _persistent_worker.stop()
+            _persistent_worker = None
+
+
+@dataclass
+class MSSTProgressEvent:
+    """从 MSST 输出解析出的结构化进度"""
+    stage: str  # loading / processing / separating / ...
+    percent: Optional[float] = None  # 0 ~ 100
+    current: Optional[int] = None
+    total: Optional[int] = None
+    rate: Optional[float] = None  # 每秒完成的百分比 (按实际观测计算)
+    eta: Optional[float] = None  # 当前阶段预计剩余秒数
+    message: str = ""
+
+
+class MSSTProgressParser:
+    """
+    解析 MSST / tqdm 的输出行，并限制进度更新频率
+    
+    - "Processing xx.flac:  45%|████▌     | 45/100 [00:12<00:15,  3.6it/s]" 解析为百分比和计数
+    - 阶段变化 (加载模型、开始处理下一首) 立即发出，同一阶段内的百分比更新最多每 min_interval 秒一次
+    - 剩余时间按本阶段观测到的速度 (指数平滑) 估算
+    """
+    
+    PERCENT_RE = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%')
+    COUNT_RE = re.compile(r'\|\s*(\d+)/(\d+)')
+    STAGES = (
+        ('loading', ('Loading', '加载')),
+        ('processing', ('Processing', '处理')),
+        ('separating', ('Separating',)),
+    )
+    
+    def __init__(self, min_interval: float = 0.25, smoothing: float = 0.3):
+        self.min_interval = min_interval
+        self.smoothing = smoothing
+        self._stage_key = None
+        self._stage = None
+        self._stage_started = 0.0
+        self._last_percent = 0.0
+        self._last_time = 0.0
+        self._rate = None
+        self._last_emit = 0.0
+        
+    def _stage_of(self, line: str) -> Optional[str]:
+        for stage, keywords in self.STAGES:
+            if any(k in line for k in keywords):
+                return stage
+        return None
+        
+    def parse(self, line: str, now: Optional[float] = None) -> Optional[MSSTProgressEvent]:
+        """解析一行输出，不是进度行或需要限流时返回 None"""
+        now = time.monotonic() if now is None else now
+        stage = self._stage_of(line)
+        match = self.PERCENT_RE.search(line)
+        if stage is None and match is None:
+            return None
+        stage = stage or self._stage or 'progress'
+        
+        # 百分比之前的描述 (如 "Processing 001_song.flac") 标识同一阶段；
+        # 不含描述的 tqdm 行 (" 45%|...| [00:12<00:15]") 沿用关键字得到的阶段
+        if match:
+            prefix = line[:match.start()].strip().rstrip(':').strip()
+        else:
+            prefix = line.split(':', 1)[0].strip()
+        stage_key = prefix or stage
+        stage_changed = stage_key != self._stage_key
+        if stage_changed:
+            self._stage_key = stage_key
+            self._stage = stage
+            self._stage_started = now
+            self._last_percent = 0.0
+            self._last_time = now
+            self._rate = None
+            
+        event = MSSTProgressEvent(stage=stage, message=line)
+        if match:
+            percent = min(100.0, float(match.group(1)))
+            event.percent = percent
+            count = self.COUNT_RE.search(line)
+            if count:
+                event.current, event.total = int(count.group(1)), int(count.group(2))
+            dt = now - self._last_time
+            if percent > self._last_percent and dt > 0:
+                rate = (percent - self._last_percent) / dt
+                self._rate = rate if self._rate is None else self._rate + (rate - self._rate) * self.smoothing
+                self._last_percent = percent
+                self._last_time = now
+            if self._rate:
+                event.rate = self._rate
+                event.eta = max(0.0, (100.0 - percent) / self._rate)
+                
+        final = event.percent is not None and event.percent >= 100.0
+        if not stage_changed and not final and now - self._last_emit < self.min_interval:
+            return None
+        self._last_emit = now
+        return event
+
+
 class MSSTSeparatorThread(QThread):
     """MSST分离线程 - 通过subprocess调用MSST推理脚本"""
     progress = pyqtSignal(str)
+    progress_event = pyqtSignal(object)  # MSSTProgressEvent，已限流
     finished = pyqtSignal(bool, str, str)
     
+    LOG_RING_SIZE = 200  # 只保留最近的输出行，出错时用于显示
+    
     def __init__(self, msst_path: str, input_file: str, output_dir: str, 
                  model_type: str, config_path: str, model_path: str, output_format: str = 'wav',
                  python_path: str = '', compress_output: bool = True,
-                 compress_bitrate: str = '64k', compress_format: str = 'm4a'):
+                 compress_bitrate: str = '64k', compress_format: str = 'auto',
+                 use_persistent_worker: bool = False, compress_workers: int = 0,
+                 compress_single_pass: bool = False):
         super().__init__()
         self.msst_path = msst_path
         self.input_file = input_file
@@ -250,134 +855,74 @@ class MSSTSeparatorThread(QThread):
         self.output_format = output_format
         self.python_path = python_path  # MSST使用的Python解释器路径
         self._process = None
+        self._stop_requested = False
+        self._progress_parser = MSSTProgressParser()
         # 压缩选项
         self.compress_output = compress_output
         self.compress_bitrate = compress_bitrate
         self.compress_format = compress_format
+        self.compress_workers = compress_workers  # 0 表示按CPU核心数
+        self.compress_single_pass = compress_single_pass
+        # 常驻分离进程 (模型只加载一次)，不可用时回退到逐首启动进程
+        self.use_persistent_worker = use_persistent_worker
+        self._worker: Optional[PersistentMSSTWorker] = None
         
     def run(self):
+        # 每个任务独占一个隐藏暂存目录 (与输出目录同级)：input 放链接过来的歌曲，
+        # MSST 输出到 output，压缩完成后再整体提交到输出目录（以歌曲名命名）
+        job_dir = ""
         try:
             self.progress.emit("正在准备分离...")
             
-            # 创建输出目录（以歌曲名命名）
-            os.makedirs(self.output_dir, exist_ok=True)
+            job_dir = make_staging_dir(os.path.dirname(self.output_dir))
+            temp_input = os.path.join(job_dir, "input")
+            work_dir = os.path.join(job_dir, "output")
+            os.makedirs(temp_input)
+            os.makedirs(work_dir)
             
-            # 创建临时输入目录
-            temp_input = os.path.join(os.path.dirname(self.output_dir), "_temp_input")
-            os.makedirs(temp_input, exist_ok=True)
-            
-            # 复制输入文件
+            # 暂存输入文件 (优先硬链接/符号链接，不复制整个文件)
             input_basename = os.path.basename(self.input_file)
-            temp_file = os.path.join(temp_input, input_basename)
-            shutil.copy2(self.input_file, temp_file)
+            method = stage_input_file(self.input_file, os.path.join(temp_input, input_basename))
+            log_debug("MSST", f"暂存输入文件 ({method}): {input_basename}")
             
             self.progress.emit("正在调用MSST进行分离...")
             
-            # 尝试多个可能的脚本路径
-            possible_scripts = [
-                os.path.join(self.msst_path, "scripts", "msst_cli.py"),
-                os.path.join(self.msst_path, "inference", "msst_infer.py"),
-                os.path.join(self.msst_path, "msst_cli.py"),
-            ]
-            
-            inference_script = None
-            for script in possible_scripts:
-                if os.path.exists(script):
-                    inference_script = script
-                    break
-                    
+            inference_script, possible_scripts = self._find_inference_script()
             if not inference_script:
                 self.finished.emit(False, f"找不到MSST推理脚本。\n已尝试: {', '.join(possible_scripts)}", "")
-                shutil.rmtree(temp_input, ignore_errors=True)
                 return
             
-            # 确定Python解释器
-            python_exe = self.python_path if self.python_path else self._find_python()
-            
-            # 构建命令 - 根据文档使用正确的参数
-            cmd = [
-                python_exe,
-                inference_script,
-                "--model_type", self.model_type,
-                "--config_path", self.config_path,
-                "--model_path", self.model_path,
-                "-i", temp_input,  # 使用 -i 或 --input_folder
-                "-o", self.output_dir,  # 使用 -o 或 --output_folder
-                "--output_format", self.output_format,
-            ]
-            
-            self.progress.emit(f"执行命令: {os.path.basename(inference_script)}...")
-            
-            # 设置环境变量，确保能找到MSST的模块
-            env = os.environ.copy()
-            # 将MSST根目录添加到PYTHONPATH
-            pythonpath = env.get('PYTHONPATH', '')
-            if pythonpath:
-                env['PYTHONPATH'] = f"{self.msst_path}{os.pathsep}{pythonpath}"
-            else:
-                env['PYTHONPATH'] = self.msst_path
-            
-            # 使用subprocess运行
-            self._process = subprocess.Popen(
-                cmd,
-                cwd=self.msst_path,
-                env=env,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
-                errors='replace'
-            )
-            
-            # 读取输出
-            output_lines = []
-            while True:
-                line = self._process.stdout.readline()
-                if not line and self._process.poll() is not None:
-                    break
-                if line:
-                    line = line.strip()
-                    output_lines.append(line)
-                    # 解析进度信息
-                    if "Processing" in line or "处理" in line or "Separating" in line:
-                        self.progress.emit(line)
-                    elif "%" in line:
-                        self.progress.emit(line)
-                    elif "Loading" in line or "加载" in line:
-                        self.progress.emit(line)
-                        
-            return_code = self._process.wait()
-            
-            # 清理临时目录
-            shutil.rmtree(temp_input, ignore_errors=True)
+            return_code, output_lines = self._separate(inference_script, temp_input, work_dir)
+            if return_code is None:
+                self.finished.emit(False, "分离已取消", "")
+                return
             
             # 检查输出文件 - 可能在输出目录或其子目录中
-            output_files = self._find_output_files(self.output_dir)
+            output_files = self._find_output_files(work_dir)
             
             if output_files:
                 # 如果文件在子目录中，移动到主输出目录
-                self._move_files_to_output_dir(output_files, self.output_dir)
-                final_files = self._find_output_files(self.output_dir, recursive=False)
+                self._move_files_to_output_dir(output_files, work_dir)
+                final_files = self._find_output_files(work_dir, recursive=False)
                 
                 # 压缩输出文件（如果启用）
                 if self.compress_output and final_files:
                     self.progress.emit("正在压缩音轨文件...")
                     
-                    success, msg, compressed = AudioCompressor.compress_directory(
-                        self.output_dir,
-                        target_bitrate=self.compress_bitrate,
-                        output_format=self.compress_format,
-                        progress_callback=lambda m: self.progress.emit(m)
+                    success, msg, compressed = self._compress_directory(
+                        work_dir, lambda m: self.progress.emit(m)
                     )
                     
+                    # 重新获取压缩后的文件列表
+                    final_files = self._find_output_files(work_dir, recursive=False)
+                    commit_stems_dir(work_dir, self.output_dir)
                     if success:
-                        # 重新获取压缩后的文件列表
-                        final_files = self._find_output_files(self.output_dir, recursive=False)
                         self.finished.emit(True, f"分离并压缩完成! 生成了 {len(final_files)} 个音轨", self.output_dir)
                     else:
                         # 压缩失败，但分离成功
                         self.finished.emit(True, f"分离完成，但压缩失败: {msg}\n生成了 {len(final_files)} 个音轨", self.output_dir)
                 else:
+                    commit_stems_dir(work_dir, self.output_dir)
                     self.finished.emit(True, f"分离完成! 生成了 {len(final_files)} 个音轨", self.output_dir)
             elif return_code == 0:
                 # 进程成功但没找到文件，可能文件名或路径问题
@@ -391,7 +936,125 @@ class MSSTSeparatorThread(QThread):
         except Exception as e:
             import traceback
             self.finished.emit(False, f"分离过程出错: {str(e)}\n\n{traceback.format_exc()}", "")
+        finally:
+            if job_dir:
+                shutil.rmtree(job_dir, ignore_errors=True)
             
+    def _find_inference_script(self) -> Tuple[Optional[str], list]:
+        """查找 MSST 推理脚本，返回 (脚本路径, 已尝试的路径)"""
+        possible_scripts = [
+            os.path.join(self.msst_path, "scripts", "msst_cli.py"),
+            os.path.join(self.msst_path, "inference", "msst_infer.py"),
+            os.path.join(self.msst_path, "msst_cli.py"),
+        ]
+        for script in possible_scripts:
+            if os.path.exists(script):
+                return script, possible_scripts
+        return None, possible_scripts
+        
+    def _separate(self, inference_script: str, input_folder: str, output_dir: str) -> Tuple[Optional[int], list]:
+        """
+        分离输入文件夹中的所有歌曲到输出目录
+        
+        优先使用常驻分离进程，不可用时启动推理脚本
+        
+        Returns:
+            (返回码, 输出行)，已取消时返回码为 None
+        """
+        # 确定Python解释器
+        python_exe = self.python_path if self.python_path else self._find_python()
+        
+        return_code = None
+        output_lines = []
+        if self.use_persistent_worker and not self._stop_requested:
+            return_code, output_lines = self._run_with_worker(python_exe, input_folder, output_dir)
+        if return_code is not None:
+            return return_code, output_lines
+        if self._stop_requested:
+            return None, output_lines
+        
+        # 构建命令 - 根据文档使用正确的参数
+        cmd = [
+            python_exe,
+            inference_script,
+            "--model_type", self.model_type,
+            "--config_path", self.config_path,
+            "--model_path", self.model_path,
+            "-i", input_folder,  # 使用 -i 或 --input_folder
+            "-o", output_dir,  # 使用 -o 或 --output_folder
+            "--output_format", self.output_format,
+        ]
+        self.progress.emit(f"执行命令: {os.path.basename(inference_script)}...")
+        return self._run_subprocess(cmd)
+        
+    def _emit_progress_line(self, line: str):
+        """解析 MSST 输出行，进度行经过限流后转发"""
+        event = self._progress_parser.parse(line)
+        if event is not None:
+            self._publish_progress(event)
+            
+    def _publish_progress(self, event: MSSTProgressEvent):
+        self.progress_event.emit(event)
+        self.progress.emit(event.message)
+            
+    def _run_subprocess(self, cmd: list) -> Tuple[int, list]:
+        """启动一次 MSST 推理脚本 (每次都重新加载模型)"""
+        self._process = subprocess.Popen(
+            cmd,
+            cwd=self.msst_path,
+            env=_msst_env(self.msst_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace'
+        )
+        
+        # 读取输出 (只保留最近的若干行)
+        output_lines = deque(maxlen=self.LOG_RING_SIZE)
+        while True:
+            line = self._process.stdout.readline()
+            if not line and self._process.poll() is not None:
+                break
+            if line:
+                line = line.strip()
+                output_lines.append(line)
+                self._emit_progress_line(line)
+                    
+        return self._process.wait(), list(output_lines)
+        
+    def _run_with_worker(self, python_exe: str, input_folder: str, output_dir: str) -> Tuple[Optional[int], list]:
+        """通过常驻分离进程分离，不可用时返回 (None, [])"""
+        self._worker = get_persistent_worker(
+            python_exe, self.msst_path, self.model_type,
+            self.config_path, self.model_path, self.output_format
+        )
+        if self._worker.unsupported:
+            return None, []
+        output_lines = deque(maxlen=self.LOG_RING_SIZE)
+        
+        def on_line(line: str):
+            output_lines.append(line)
+            self._emit_progress_line(line)
+            
+        ok, message = self._worker.separate(input_folder, output_dir, on_line, owner=self,
+                                            should_stop=lambda: self._stop_requested)
+        if ok is None:
+            return None, []
+        output_lines.append(message)
+        return (0 if ok else 1), list(output_lines)
+        
+    def _compress_directory(self, directory: str, progress_callback) -> tuple:
+        """按当前压缩设置压缩目录中的音轨"""
+        return AudioCompressor.compress_directory(
+            directory,
+            target_bitrate=self.compress_bitrate,
+            output_format=self.compress_format,
+            progress_callback=progress_callback,
+            max_workers=self.compress_workers,
+            single_pass=self.compress_single_pass
+        )
+        
     def _find_output_files(self, directory: str, recursive: bool = True) -> list:
         """查找输出的音频文件"""
         audio_extensions = ('.wav', '.flac', '.mp3', '.m4a', '.aac', '.ogg', '.opus')
@@ -410,18 +1073,22 @@ class MSSTSeparatorThread(QThread):
                     
         return output_files
         
+    @staticmethod
+    def _unique_dest(dest: str) -> str:
+        """目标已存在时添加序号 (xxx_1.wav、xxx_2.wav ...)"""
+        if not os.path.exists(dest):
+            return dest
+        base, ext = os.path.splitext(dest)
+        counter = 1
+        while os.path.exists(f"{base}_{counter}{ext}"):
+            counter += 1
+        return f"{base}_{counter}{ext}"
+        
     def _move_files_to_output_dir(self, files: list, output_dir: str):
         """将子目录中的文件移动到输出目录"""
         for filepath in files:
             if os.path.dirname(filepath) != output_dir:
-                dest = os.path.join(output_dir, os.path.basename(filepath))
-                # 如果目标已存在，添加序号
-                if os.path.exists(dest):
-                    base, ext = os.path.splitext(dest)
-                    counter = 1
-                    while os.path.exists(f"{base}_{counter}{ext}"):
-                        counter += 1
-                    dest = f"{base}_{counter}{ext}"
+                dest = self._unique_dest(os.path.join(output_dir, os.path.basename(filepath)))
                 try:
                     shutil.move(filepath, dest)
                 except Exception:
@@ -462,8 +1129,236 @@ class MSSTSeparatorThread(QThread):
         
     def stop(self):
         """停止分离进程"""
+        self._stop_requested = True
         if self._process and self._process.poll() is None:
             self._process.terminate()
+        if self._worker is not None:
+            # 正在分离的任务无法单独中断，结束常驻进程 (下次任务时自动重启)；
+            # 还在排队的任务拿到锁后检查停止标志，不影响其他任务
+            self._worker.terminate_job(self)
+
+
+class MSSTBatchSeparatorThread(MSSTSeparatorThread):
+    """
+    批量分离线程 - 多首歌曲放进同一个输入文件夹，一次推理完成
+    
+    暂存文件名加上序号前缀 (001_歌曲名.flac)，MSST 输出的 001_歌曲名_vocals.wav
+    等文件按前缀分回各自的 stems 文件夹，去掉前缀后与单曲分离的命名一致。
+    
+    推理期间轮询输出目录：MSST 开始输出下一首歌曲时，上一首的音轨已经写完，
+    立即交给压缩线程处理，编码与后续歌曲的推理重叠进行
+    """
+    song_progress = pyqtSignal(str, str)  # 歌曲路径, 消息
+    song_finished = pyqtSignal(str, bool, str, str)  # 歌曲路径, 是否成功, 消息, 输出目录
+    
+    def __init__(self, msst_path: str, songs: List[Tuple[str, str]], staging_root: str,
+                 model_type: str, config_path: str, model_path: str, output_format: str = 'wav',
+                 python_path: str = '', compress_output: bool = True,
+                 compress_bitrate: str = '64k', compress_format: str = 'auto',
+                 use_persistent_worker: bool = False, compress_workers: int = 0,
+                 compress_single_pass: bool = False):
+        """
+        Args:
+            songs: [(歌曲路径, 该歌曲的 stems 输出目录), ...]
+            staging_root: 暂存目录所在位置 (通常是 stems 根目录，便于硬链接)
+        """
+        super().__init__(msst_path, "", "", model_type, config_path, model_path, output_format,
+                         python_path, compress_output, compress_bitrate, compress_format,
+                         use_persistent_worker, compress_workers, compress_single_pass)
+        self.songs = songs
+        self.staging_root = staging_root
+        self._staged: Dict[str, int] = {}  # 暂存文件名(无扩展名) -> 歌曲序号
+        self._batch_dir = ""
+        self._commit_pool: Optional[ThreadPoolExecutor] = None
+        self._commit_futures: Dict[int, object] = {}  # 歌曲序号 -> Future
+        
+    @staticmethod
+    def _staged_name(index: int, song_path: str) -> str:
+        return f"{index:03d}_{os.path.basename(song_path)}"
+        
+    POLL_INTERVAL = 0.5
+    
+    def run(self):
+        try:
+            batch_dir = make_staging_dir(self.staging_root, BATCH_STAGING_PREFIX)
+        except OSError as e:
+            message = f"无法创建暂存目录: {e}"
+            self._fail_remaining({}, message)
+            self.finished.emit(False, message, "")
+            return
+        input_dir = os.path.join(batch_dir, "input")
+        output_dir = os.path.join(batch_dir, "output")
+        results: Dict[int, bool] = {}
+        self._batch_dir = batch_dir
+        self._commit_futures = {}
+        # 单线程提交：压缩本身已经按音轨并行
+        self._commit_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="msst_commit")
+        watcher_stop = threading.Event()
+        watcher = threading.Thread(target=self._watch_outputs, args=(output_dir, watcher_stop),
+                                   name="msst_output_watcher", daemon=True)
+        try:
+            os.makedirs(input_dir, exist_ok=True)
+            os.makedirs(output_dir, exist_ok=True)
+            
+            self.progress.emit(f"正在准备批量分离 ({len(self.songs)} 首)...")
+            for index, (song_path, _) in enumerate(self.songs):
+                staged = self._staged_name(index, song_path)
+                try:
+                    stage_input_file(song_path, os.path.join(input_dir, staged))
+                    self._staged[os.path.splitext(staged)[0]] = index
+                except OSError as e:
+                    results[index] = False
+                    self.song_finished.emit(song_path, False, f"无法读取歌曲文件: {e}", "")
+            
+            inference_script, possible_scripts = self._find_inference_script()
+            if not inference_script:
+                message = f"找不到MSST推理脚本。\n已尝试: {', '.join(possible_scripts)}"
+                self._fail_remaining(results, message)
+                self.finished.emit(False, message, "")
+                return
+            
+            self.progress.emit(f"正在调用MSST批量分离 {len(self._staged)} 首...")
+            watcher.start()
+            try:
+                return_code, output_lines = self._separate(inference_script, input_dir, output_dir)
+            finally:
+                watcher_stop.set()
+                watcher.join()
+            
+            if return_code is not None:
+                # 进程结束后剩下的歌曲 (通常只有最后一首)
+                for index, files in self._demux_outputs(output_dir).items():
+                    self._submit_commit(index, files)
+            # 已经提交的歌曲即使取消也完成压缩
+            results.update(self._collect_commits())
+            
+            if return_code is None:
+                self._fail_remaining(results, "分离已取消")
+                self.finished.emit(False, "分离已取消", "")
+                return
+            
+            error_output = '\n'.join(output_lines[-15:])
+            self._fail_remaining(results, f"未找到该歌曲的输出文件 (返回码: {return_code})\n\n{error_output}")
+            
+            succeeded = sum(1 for ok in results.values() if ok)
+            self.finished.emit(succeeded > 0, f"批量分离完成: 成功 {succeeded}/{len(self.songs)} 首", "")
+        except Exception as e:
+            import traceback
+            message = f"批量分离出错: {str(e)}\n\n{traceback.format_exc()}"
+            watcher_stop.set()
+            results.update(self._collect_commits())
+            self._fail_remaining(results, message)
+            self.finished.emit(False, message, "")
+        finally:
+            self._commit_pool.shutdown(wait=True)
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            
+    def _watch_outputs(self, output_dir: str, stop_event: threading.Event):
+        """
+        推理期间轮询输出目录，把已经完成的歌曲提前交给压缩线程
+        
+        一首歌曲视为完成：MSST 已经开始输出其他歌曲，且它的文件大小在两次轮询间不再变化
+        """
+        sizes: Dict[str, int] = {}
+        current: Optional[int] = None
+        done_writing: set = set()
+        while not stop_event.wait(self.POLL_INTERVAL):
+            try:
+                grouped = self._demux_outputs(output_dir)
+            except OSError:
+                continue
+            changed: set = set()
+            for index, files in grouped.items():
+                for filepath in files:
+                    try:
+                        size = os.path.getsize(filepath)
+                    except OSError:
+                        continue
+                    if sizes.get(filepath) != size:
+                        sizes[filepath] = size
+                        changed.add(index)
+            # 最近有新输出的歌曲就是正在处理的歌曲，之前的歌曲都已写完
+            for index in sorted(changed):
+                if current is not None and index != current:
+                    done_writing.add(current)
+                current = index
+            for index in list(done_writing):
+                if index in grouped and index not in changed and index not in self._commit_futures:
+                    self._submit_commit(index, grouped[index])
+                    
+    def _submit_commit(self, index: int, files: list):
+        if index in self._commit_futures:
+            return
+        song_path, song_dir = self.songs[index]
+        self._commit_futures[index] = self._commit_pool.submit(
+            self._commit_song, index, song_path, song_dir, files)
+            
+    def _collect_commits(self) -> Dict[int, bool]:
+        results = {}
+        for index, future in list(self._commit_futures.items()):
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                song_path = self.songs[index][0]
+                results[index] = False
+                self.song_finished.emit(song_path, False, f"保存音轨失败: {e}", "")
+        return results
+            
+    def _fail_remaining(self, results: Dict[int, bool], message: str):
+        for index, (song_path, _) in enumerate(self.songs):
+            if index not in results:
+                results[index] = False
+                self.song_finished.emit(song_path, False, message, "")
+                
+    def _song_index(self, filename: str) -> Optional[int]:
+        """按暂存前缀找到输出文件所属的歌曲"""
+        if len(filename) > 4 and filename[:3].isdigit() and filename[3] == '_':
+            index = int(filename[:3])
+            if index < len(self.songs):
+                return index
+        return None
+        
+    def _demux_outputs(self, output_dir: str) -> Dict[int, list]:
+        grouped: Dict[int, list] = {}
+        for filepath in self._find_output_files(output_dir):
+            index = self._song_index(os.path.basename(filepath))
+            if index is not None:
+                grouped.setdefault(index, []).append(filepath)
+        return grouped
+        
+    def _commit_song(self, index: int, song_path: str, song_dir: str, files: list) -> bool:
+        """在工作目录中整理并压缩一首歌曲的输出，完成后提交到它的 stems 文件夹"""
+        work_dir = os.path.join(self._batch_dir, "commit", f"{index:03d}")
+        os.makedirs(work_dir, exist_ok=True)
+        for filepath in files:
+            # 去掉序号前缀；MSST 在不同子目录中输出同名文件时加序号，不互相覆盖
+            shutil.move(filepath, self._unique_dest(os.path.join(work_dir, os.path.basename(filepath)[4:])))
+        
+        title = os.path.splitext(os.path.basename(song_path))[0]
+        final_files = self._find_output_files(work_dir, recursive=False)
+        if self.compress_output and final_files:
+            self.song_progress.emit(song_path, "正在压缩音轨文件...")
+            success, msg, _ = self._compress_directory(
+                work_dir, lambda m: self.song_progress.emit(song_path, m)
+            )
+            final_files = self._find_output_files(work_dir, recursive=False)
+            if success:
+                message = f"分离并压缩完成! 生成了 {len(final_files)} 个音轨"
+            else:
+                message = f"分离完成，但压缩失败: {msg}\n生成了 {len(final_files)} 个音轨"
+        else:
+            message = f"分离完成! 生成了 {len(final_files)} 个音轨"
+        commit_stems_dir(work_dir, song_dir)
+        self.progress.emit(f"{title}: {message}")
+        self.song_finished.emit(song_path, True, message, song_dir)
+        return True
+        
+    def _publish_progress(self, event: MSSTProgressEvent):
+        super()._publish_progress(event)
+        for staged, index in self._staged.items():
+            if staged in event.message:
+                self.song_progress.emit(self.songs[index][0], event.message)
+                break
 
 
 def check_msst_environment(msst_path: str) -> tuple:
@@ -0,0 +1,559 @@
+"""
+MSST 分离任务队列
+
+- 可一次加入多首歌曲 (专辑 / 选中歌曲 / 所有未分离歌曲)
+- 队列持久化到 ~/.multi_track_player/separation_queue.json，重启后继续
+- 按并发上限调度，报告每个任务的进度和预计剩余时间
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from typing import Optional, List, Dict, Callable, Any
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from .msst import MSSTSeparatorThread, MSSTBatchSeparatorThread, cleanup_stale_staging
+from .models import SUPPORTED_FORMATS
+from .stems_store import get_stems_store, get_stems_folder_index
+
+# 任务状态
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_STATES = (JOB_PENDING, JOB_RUNNING)
+
+_PERCENT_RE = re.compile(r'(\d{1,3}(?:\.\d+)?)\s*%')
+
+
+@dataclass
+class SeparationJob:
+    """单首歌曲的分离任务"""
+    job_id: str
+    song_path: str
+    title: str
+    output_dir: str
+    status: str = JOB_PENDING
+    progress: float = 0.0  # 0 ~ 1
+    message: str = ""
+    created_at: float = field(default_factory=time.time)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    attempts: int = 0
+    batchable: bool = True  # 可以和其他歌曲合并为一批分离
+
+    @property
+    def elapsed(self) -> float:
+        if not self.started_at:
+            return 0.0
+        end = self.finished_at or time.time()
+        return max(0.0, end - self.started_at)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SeparationJob':
+        known = {k: v for k, v in data.items() if k in cls.__dataclass_fields__}
+        return cls(**known)
+
+
+class SeparationQueue(QObject):
+    """
+    分离任务调度器
+
+    任务的执行体由 runner_factory(job, config) 创建，返回带有
+    progress(str) / finished(bool, str, str) 信号的 QThread。
+    配置 msst_batch_size > 1 时，多个等待中的任务合并为一次推理，
+    由 batch_runner_factory(jobs, config) 创建，额外提供
+    song_progress(str, str) / song_finished(str, bool, str, str) 信号
+    """
+
+    job_added = pyqtSignal(object)  # SeparationJob
+    job_updated = pyqtSignal(object)  # SeparationJob
+    job_finished = pyqtSignal(object, bool, str, str)  # job, 是否成功, 消息, 输出目录
+    queue_idle = pyqtSignal()
+
+    DEFAULT_JOB_SECONDS = 180.0
+
+    def __init__(self, queue_file: str = "", max_concurrent: int = 1,
+                 runner_factory: Optional[Callable] = None,
+                 batch_runner_factory: Optional[Callable] = None, parent=None):
+        super().__init__(parent)
+        if not queue_file:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".multi_track_player")
+            os.makedirs(cache_dir, exist_ok=True)
+            queue_file = os.path.join(cache_dir, "separation_queue.json")
+        self.queue_file = queue_file
+        self.max_concurrent = max(1, max_concurrent)
+        self.runner_factory = runner_factory or self._default_runner
+        self.batch_runner_factory = batch_runner_factory or self._default_batch_runner
+        self.config: Dict[str, Any] = {}
+
+        self._jobs: List[SeparationJob] = []
+        self._runners: Dict[str, Any] = {}
+        self._stage_etas: Dict[str, float] = {}  # 进行中任务按观测速度估算的剩余秒数
+        self._paused = False
+        self._shutting_down = False
+        self._avg_job_seconds = self.DEFAULT_JOB_SECONDS
+        self._finished_count = 0
+
+        self._load()
+
+    # ---------------- 配置 ----------------
+
+    def set_config(self, config: Dict[str, Any]):
+        """设置 MSST 配置 (任务开始时读取，修改对之后的任务生效)"""
+        self.config = dict(config)
+
+    def set_max_concurrent(self, count: int):
+        self.max_concurrent = max(1, count)
+        self._save()
+        self._schedule()
+
+    @staticmethod
+    def _default_runner(job: SeparationJob, config: Dict[str, Any]):
+        return MSSTSeparatorThread(
+            config.get('msst_path', ''), job.song_path, job.output_dir,
+            config.get('model_type', 'bs_roformer'),
+            config.get('config_path', ''), config.get('model_path', ''),
+            config.get('output_format', 'wav'), config.get('msst_python_path', ''),
+            config.get('compress_stems', True), config.get('compress_bitrate', '64k'),
+            config.get('compress_format', 'auto'),
+            use_persistent_worker=config.get('msst_persistent_worker', True),
+            compress_workers=config.get('compress_workers', 0),
+            compress_single_pass=config.get('compress_single_pass', False)
+        )
+
+    @staticmethod
+    def _default_batch_runner(jobs: List[SeparationJob], config: Dict[str, Any]):
+        staging_root = config.get('stems_path', '') or os.path.dirname(jobs[0].output_dir)
+        return MSSTBatchSeparatorThread(
+            config.get('msst_path', ''), [(job.song_path, job.output_dir) for job in jobs],
+            staging_root, config.get('model_type', 'bs_roformer'),
+            config.get('config_path', ''), config.get('model_path', ''),
+            config.get('output_format', 'wav'), config.get('msst_python_path', ''),
+            config.get('compress_stems', True), config.get('compress_bitrate', '64k'),
+            config.get('compress_format', 'auto'),
+            use_persistent_worker=config.get('msst_persistent_worker', True),
+            compress_workers=config.get('compress_workers', 0),
+            compress_single_pass=config.get('compress_single_pass', False)
+        )
+
+    # ---------------- 队列操作 ----------------
+
+    def enqueue(self, song_path: str, title: str, output_dir: str,
+                front: bool = False) -> Optional[SeparationJob]:
+        """
+        加入一首歌曲，已在队列中 (等待或进行中) 时返回已有任务
+
+        Args:
+            front: 插到队首优先处理 (用户手动分离当前歌曲时)
+        """
+        existing = self.find_active(song_path)
+        if existing:
+            if front and existing.status == JOB_PENDING:
+                self._jobs.remove(existing)
+                self._jobs.insert(0, existing)
+                self._save()
+            return existing
+        job = SeparationJob(uuid.uuid4().hex[:12], song_path, title, output_dir, batchable=not front)
+        if front:
+            self._jobs.insert(0, job)
+        else:
+            self._jobs.append(job)
+        self._save()
+        self.job_added.emit(job)
+        self._schedule()
+        return job
+
+    def enqueue_many(self, items: List[tuple]) -> int:
+        """
+        批量加入
+
+        Args:
+            items: [(song_path, title, output_dir), ...]
+
+        Returns:
+            新加入的任务数
+        """
+        added = 0
+        for song_path, title, output_dir in items:
+            if self.find_active(song_path):
+                continue
+            job = SeparationJob(uuid.uuid4().hex[:12], song_path, title, output_dir)
+            self._jobs.append(job)
+            self.job_added.emit(job)
+            added += 1
+        if added:
+            self._save()
+            self._schedule()
+        return added
+
+    def find_active(self, song_path: str) -> Optional[SeparationJob]:
+        for job in self._jobs:
+            if job.song_path == song_path and job.status in ACTIVE_STATES:
+                return job
+        return None
+
+    def get_job(self, job_id: str) -> Optional[SeparationJob]:
+        for job in self._jobs:
+            if job.job_id == job_id:
+                return job
+        return None
+
+    def get_jobs(self) -> List[SeparationJob]:
+        return list(self._jobs)
+
+    def pending_count(self) -> int:
+        return sum(1 for job in self._jobs if job.status == JOB_PENDING)
+
+    def running_count(self) -> int:
+        return sum(1 for job in self._jobs if job.status == JOB_RUNNING)
+
+    def _active_runner_count(self) -> int:
+        # 一个批量分离线程占用一个并发名额
+        return len({id(runner) for runner in self._runners.values()})
+
+    def _is_active(self, job_id: str) -> bool:
+        job = self.get_job(job_id)
+        return job is not None and job.status in ACTIVE_STATES
+
+    def cancel(self, job_id: str):
+        """取消任务 (进行中的任务会终止分离进程)"""
+        job = self.get_job(job_id)
+        if not job or job.status not in ACTIVE_STATES:
+            return
+        runner = self._runners.get(job_id)
+        job.status = JOB_CANCELLED
+        job.finished_at = time.time()
+        job.message = "已取消"
+        # 只统计同一线程中仍在进行的其他任务 (已取消的任务在批量结束前仍留在 _runners 中)
+        shared = any(r is runner and other_id != job_id and self._is_active(other_id)
+                     for other_id, r in self._runners.items())
+        if runner is not None and not shared:
+            # 批量分离中的其他歌曲继续，只丢弃这首的结果
+            runner.stop()
+        self._save()
+        self.job_updated.emit(job)
+
+    def retry_failed(self) -> int:
+        """重新排队所有失败/取消的任务"""
+        count = 0
+        for job in self._jobs:
+            if job.status in (JOB_FAILED, JOB_CANCELLED) and not self.find_active(job.song_path):
+                job.status = JOB_PENDING
+                job.progress = 0.0
+                job.message = ""
+                job.started_at = job.finished_at = 0.0
+                self.job_updated.emit(job)
+                count += 1
+        if count:
+            self._save()
+            self._schedule()
+        return count
+
+    def clear_finished(self):
+        """移除已结束的任务"""
+        self._jobs = [job for job in self._jobs if job.status in ACTIVE_STATES]
+        self._save()
+
+    def pause(self):
+        """暂停调度 (进行中的任务继续完成)"""
+        self._paused = True
+
+    def resume(self):
+        self._paused = False
+        self._schedule()
+
+    def is_paused(self) -> bool:
+        return self._paused
+
+    # ---------------- 进度/ETA ----------------
+
+    def job_eta(self, job: SeparationJob) -> Optional[float]:
+        """单个任务的预计剩余秒数"""
+        if job.status == JOB_PENDING:
+            return self._avg_job_seconds
+        if job.status != JOB_RUNNING:
+            return None
+        elapsed = job.elapsed
+        stage_eta = self._stage_etas.get(job.job_id)
+        if stage_eta is not None:
+            return stage_eta
+        if job.progress >= 0.05:
+            return max(0.0, elapsed / job.progress - elapsed)
+        return max(0.0, self._avg_job_seconds - elapsed)
+
+    def queue_eta(self) -> float:
+        """整个队列的预计剩余秒数"""
+        running = [self.job_eta(j) or 0.0 for j in self._jobs if j.status == JOB_RUNNING]
+        pending = self.pending_count() * self._avg_job_seconds
+        return (sum(running) + pending) / self.parallel_inference
+
+    @property
+    def parallel_inference(self) -> int:
+        """实际能同时推理的任务数：常驻分离进程只有一个，任务在其中依次推理"""
+        return 1 if self.config.get('msst_persistent_worker', True) else self.max_concurrent
+
+    # ---------------- 调度 ----------------
+
+    def _schedule(self):
+        store = get_stems_store()
+        while not self._paused and self._active_runner_count() < self.max_concurrent:
+            pending = [job for job in self._jobs if job.status == JOB_PENDING]
+            if not pending:
+                break
+            # 内容相同的歌曲正在分离时先等待，完成后直接复用
+            busy = {store.fingerprint(job.song_path) for job in self._jobs if job.status == JOB_RUNNING}
+            batch_size = int(self.config.get('msst_batch_size', 1))
+            if batch_size <= 1 or not pending[0].batchable:
+                batch_size = 1
+            candidates = []
+            for job in pending:
+                if len(candidates) >= batch_size:
+                    break
+                if candidates and not job.batchable:
+                    continue
+                key = store.fingerprint(job.song_path)
+                if key is not None and key in busy:
+                    continue
+                busy.add(key)
+                candidates.append(job)
+            if not candidates:
+                break
+            if any([self._reuse_existing(job) for job in candidates]):
+                continue
+            if len(candidates) > 1:
+                self._start_batch(candidates)
+            else:
+                self._start_job(candidates[0])
+
+    def _reuse_existing(self, job: SeparationJob) -> bool:
+        """内容相同的歌曲已经分离过时直接复用结果，不再运行 MSST"""
+        stems_dir = get_stems_store().lookup(job.song_path)
+        if not stems_dir:
+            return False
+        message = "已有相同内容的分离音轨，直接复用"
+        job.status = JOB_DONE
+        job.progress = 1.0
+        job.started_at = job.finished_at = time.time()
+        job.message = message
+        self._save()
+        self.job_updated.emit(job)
+        self.job_finished.emit(job, True, message, stems_dir)
+        return True
+
+    def _mark_running(self, job: SeparationJob):
+        job.status = JOB_RUNNING
+        job.progress = 0.0
+        job.started_at = time.time()
+        job.finished_at = 0.0
+        job.attempts += 1
+        job.message = "正在准备分离..."
+
+    def _start_job(self, job: SeparationJob):
+        self._mark_running(job)
+
+        try:
+            # 不提前创建 stems 文件夹：分离完成后由暂存目录整体改名得到
+            runner = self.runner_factory(job, self.config)
+        except Exception as e:
+            self._finish_job(job, False, f"无法启动分离: {e}", "")
+            return
+
+        job_id = job.job_id
+        if hasattr(runner, 'progress_event'):
+            runner.progress_event.connect(lambda event: self._on_progress_event(job_id, event))
+        runner.progress.connect(lambda message: self._on_progress(job_id, message))
+        runner.finished.connect(lambda ok, message, path: self._on_finished(job_id, ok, message, path))
+        self._runners[job_id] = runner
+        self._save()
+        self.job_updated.emit(job)
+        runner.start()
+
+    def _start_batch(self, jobs: List[SeparationJob]):
+        for job in jobs:
+            self._mark_running(job)
+            job.message = f"批量分离中 ({len(jobs)} 首)..."
+        try:
+            runner = self.batch_runner_factory(jobs, self.config)
+        except Exception as e:
+            for job in jobs:
+                self._finish_job(job, False, f"无法启动分离: {e}", "")
+            return
+
+        job_ids = [job.job_id for job in jobs]
+        runner.progress.connect(lambda message: self._on_batch_progress(job_ids, message))
+        runner.song_progress.connect(lambda path, message: self._on_song_progress(job_ids, path, message))
+        runner.song_finished.connect(
+            lambda path, ok, message, out: self._on_song_finished(job_ids, path, ok, message, out))
+        runner.finished.connect(lambda ok, message, path: self._on_batch_finished(job_ids, message))
+        for job_id in job_ids:
+            self._runners[job_id] = runner
+        self._save()
+        for job in jobs:
+            self.job_updated.emit(job)
+        runner.start()
+
+    def _find_batch_job(self, job_ids: List[str], song_path: str) -> Optional[SeparationJob]:
+        for job_id in job_ids:
+            job = self.get_job(job_id)
+            if job and job.song_path == song_path:
+                return job
+        return None
+
+    def _on_batch_progress(self, job_ids: List[str], message: str):
+        # 整批的进度 (模型加载等) 显示在所有还没开始处理的歌曲上
+        for job_id in job_ids:
+            job = self.get_job(job_id)
+            if job and job.status == JOB_RUNNING and job.progress == 0.0:
+                job.message = message
+                self.job_updated.emit(job)
+
+    def _on_song_progress(self, job_ids: List[str], song_path: str, message: str):
+        job = self._find_batch_job(job_ids, song_path)
+        if job:
+            self._on_progress(job.job_id, message)
+
+    def _on_song_finished(self, job_ids: List[str], song_path: str, success: bool,
+                          message: str, output_path: str):
+        if self._shutting_down:
+            return
+        job = self._find_batch_job(job_ids, song_path)
+        if job is None:
+            return
+        self._runners.pop(job.job_id, None)
+        if job.status == JOB_RUNNING:
+            self._finish_job(job, success, message, output_path)
+
+    def _on_batch_finished(self, job_ids: List[str], message: str):
+        if self._shutting_down:
+            return
+        runners = [self._runners.pop(job_id) for job_id in job_ids if job_id in self._runners]
+        if runners:
+            runners[0].wait()
+        for job_id in job_ids:
+            job = self.get_job(job_id)
+            if job and job.status == JOB_RUNNING:
+                self._finish_job(job, False, message, "")
+        self._save()
+        self._schedule()
+        self._check_idle()
+
+    def _on_progress_event(self, job_id: str, event):
+        """结构化进度 (MSSTProgressEvent)：记录按实际速度估算的剩余时间"""
+        if event.eta is not None:
+            self._stage_etas[job_id] = event.eta
+
+    def _on_progress(self, job_id: str, message: str):
+        job = self.get_job(job_id)
+        if not job or job.status != JOB_RUNNING:
+            return
+        job.message = message
+        match = _PERCENT_RE.search(message)
+        if match:
+            job.progress = min(1.0, float(match.group(1)) / 100.0)
+        self.job_updated.emit(job)
+
+    def _on_finished(self, job_id: str, success: bool, message: str, output_path: str):
+        if self._shutting_down:
+            return
+        runner = self._runners.pop(job_id, None)
+        if runner is not None:
+            runner.wait()
+        job = self.get_job(job_id)
+        if job is None:
+            self._schedule()
+            return
+        if job.status == JOB_CANCELLED:
+            self._save()
+            self._schedule()
+            self._check_idle()
+            return
+        self._finish_job(job, success, message, output_path)
+
+    def _finish_job(self, job: SeparationJob, success: bool, message: str, output_path: str):
+        self._stage_etas.pop(job.job_id, None)
+        job.status = JOB_DONE if success else JOB_FAILED
+        job.finished_at = time.time()
+        job.message = message
+        if success:
+            job.progress = 1.0
+            store = get_stems_store()
+            store.register(job.song_path, output_path)
+            store.save()
+            # 增量更新 stems 文件夹索引
+            folder_index = get_stems_folder_index()
+            folder_index.update_folder(output_path, SUPPORTED_FORMATS)
+            folder_index.save()
+            # 滑动平均单首耗时，用于 ETA
+            self._finished_count += 1
+            weight = 1.0 / min(self._finished_count, 10)
+            self._avg_job_seconds += (job.elapsed - self._avg_job_seconds) * weight
+        self._save()
+        self.job_updated.emit(job)
+        self.job_finished.emit(job, success, message, output_path)
+        self._schedule()
+        self._check_idle()
+
+    def _check_idle(self):
+        if not self._runners and not self.pending_count():
+            self.queue_idle.emit()
+
+    # ---------------- 持久化 ----------------
+
+    def _load(self):
+        if not os.path.exists(self.queue_file):
+            return
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.max_concurrent = max(1, int(data.get('max_concurrent', self.max_concurrent)))
+            self._avg_job_seconds = float(data.get('avg_job_seconds', self.DEFAULT_JOB_SECONDS))
+            self._finished_count = int(data.get('finished_count', 0))
+            for item in data.get('jobs', []):
+                job = SeparationJob.from_dict(item)
+                # 上次退出时中断的任务重新排队
+                if job.status == JOB_RUNNING:
+                    job.status = JOB_PENDING
+                    job.progress = 0.0
+                    job.started_at = 0.0
+                self._jobs.append(job)
+            print(f"[分离队列] 已恢复 {self.pending_count()} 个待处理任务")
+        except Exception as e:
+            print(f"[分离队列] 加载队列失败: {e}")
+
+    def _save(self):
+        data = {
+            'version': 1,
+            'max_concurrent': self.max_concurrent,
+            'avg_job_seconds': self._avg_job_seconds,
+            'finished_count': self._finished_count,
+            'jobs': [asdict(job) for job in self._jobs],
+        }
+        temp_file = self.queue_file + ".tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.queue_file)
+        except Exception as e:
+            print(f"[分离队列] 保存队列失败: {e}")
+
+    def start(self):
+        """开始处理 (启动时调用，恢复上次未完成的任务)"""
+        cleanup_stale_staging(self.config.get('stems_path', ''))
+        self._schedule()
+
+    def shutdown(self):
+        """停止所有进行中的任务，它们会在下次启动时重新排队"""
+        self._paused = True
+        self._shutting_down = True
+        for job_id, runner in list(self._runners.items()):
+            runner.stop()
+            runner.wait(3000)
+        self._save()
+        # 保存时进行中的任务仍是 running 状态，下次加载时自动转为 pending
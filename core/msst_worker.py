@@ -0,0 +1,110 @@
+"""
+MSST 常驻分离进程
+
+由 MSST 环境的 Python 解释器启动 (不依赖本项目的其他模块)，模型只加载一次，
+之后通过标准输入/输出按行收发 JSON 请求：
+
+请求 (stdin):
+    {"id": "...", "cmd": "separate", "input_folder": "...", "output_dir": "..."}
+    {"id": "...", "cmd": "ping"}
+    {"id": "...", "cmd": "shutdown"}
+
+事件 (stdout):
+    {"event": "ready"} / {"event": "error", "kind": "import|load", "message": "..."}  启动结果
+    {"event": "pong", "id": "..."}
+    {"event": "done", "id": "...", "ok": true, "seconds": 12.3}
+    {"event": "done", "id": "...", "ok": false, "error": "..."}
+
+MSST 自身的日志和 tqdm 进度都输出到 stderr，由客户端当作进度行读取
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import traceback
+
+
+def _emit(stream, payload: dict):
+    stream.write(json.dumps(payload, ensure_ascii=False) + "\n")
+    stream.flush()
+
+
+def _load_separator(args):
+    """加载 MSST 模型 (MSST-WebUI 的 inference.msst_infer.MSSeparator)"""
+    sys.path.insert(0, args.msst_path)
+    os.chdir(args.msst_path)
+    from inference.msst_infer import MSSeparator
+
+    return MSSeparator(
+        model_type=args.model_type,
+        config_path=args.config_path,
+        model_path=args.model_path,
+        output_format=args.output_format,
+        store_dirs=args.msst_path,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MSST 常驻分离进程")
+    parser.add_argument('--msst_path', required=True)
+    parser.add_argument('--model_type', required=True)
+    parser.add_argument('--config_path', required=True)
+    parser.add_argument('--model_path', required=True)
+    parser.add_argument('--output_format', default='wav')
+    args = parser.parse_args()
+
+    # 协议只走原始 stdout，其余输出全部转到 stderr
+    protocol = sys.stdout
+    sys.stdout = sys.stderr
+
+    try:
+        separator = _load_separator(args)
+    except ImportError as e:
+        # MSST 版本不提供 MSSeparator，不支持常驻模式
+        _emit(protocol, {'event': 'error', 'kind': 'import', 'message': f"{e}\n{traceback.format_exc()}"})
+        return 1
+    except Exception as e:
+        _emit(protocol, {'event': 'error', 'kind': 'load', 'message': f"{e}\n{traceback.format_exc()}"})
+        return 1
+    _emit(protocol, {'event': 'ready', 'pid': os.getpid()})
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except ValueError:
+            continue
+        request_id = request.get('id', '')
+        cmd = request.get('cmd')
+
+        if cmd == 'ping':
+            _emit(protocol, {'event': 'pong', 'id': request_id})
+        elif cmd == 'shutdown':
+            break
+        elif cmd == 'separate':
+            start = time.perf_counter()
+            try:
+                separator.store_dirs = request['output_dir']
+                separator.process_folder(request['input_folder'])
+                _emit(protocol, {'event': 'done', 'id': request_id, 'ok': True,
+                                 'seconds': time.perf_counter() - start})
+            except Exception as e:
+                _emit(protocol, {'event': 'done', 'id': request_id, 'ok': False,
+                                 'error': f"{e}\n{traceback.format_exc()}"})
+        else:
+            _emit(protocol, {'event': 'done', 'id': request_id, 'ok': False,
+                             'error': f"未知命令: {cmd}"})
+
+    try:
+        separator.del_cache()
+    except Exception:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+"""
+性能追踪与分级日志
+
+- 命名 span：用单调时钟记录耗时，按名称保留最近 N 次样本并计算滚动百分位
+- 支持导出为 JSON 文件，调试对话框实时查看
+- 分级日志：热路径上的调试输出默认不打印，可通过环境变量 MTP_LOG_LEVEL 或设置调整
+
+用法：
+    from core.perf import span, traced, log_debug
+
+    with span("decode"):
+        ...
+
+    @traced("song_switch")
+    def play_song(...): ...
+
+    log_debug("播放器", "2. 停止所有音轨...")
+"""
+
+import os
+import json
+import time
+import math
+import threading
+import functools
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, List, Callable
+
+# ============================================================
+# 日志级别
+# ============================================================
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {
+    'debug': DEBUG,
+    'info': INFO,
+    'warning': WARNING,
+    'error': ERROR,
+}
+
+_log_level = LEVEL_NAMES.get(os.environ.get('MTP_LOG_LEVEL', 'info').lower(), INFO)
+
+
+def set_log_level(level):
+    """设置日志级别 (数值或 'debug'/'info'/'warning'/'error')"""
+    global _log_level
+    if isinstance(level, str):
+        level = LEVEL_NAMES.get(level.lower(), INFO)
+    _log_level = level
+
+
+def get_log_level() -> int:
+    return _log_level
+
+
+def log_enabled(level: int) -> bool:
+    return level >= _log_level
+
+
+def log(level: int, tag: str, message: str):
+    """按级别输出日志，格式与项目中的 print("[标签] 消息") 保持一致"""
+    if level >= _log_level:
+        print(f"[{tag}] {message}")
+
+
+def log_debug(tag: str, message: str):
+    if DEBUG >= _log_level:
+        print(f"[{tag}] {message}")
+
+
+def log_info(tag: str, message: str):
+    if INFO >= _log_level:
+        print(f"[{tag}] {message}")
+
+
+# ============================================================
+# Span 统计
+# ============================================================
+
+class SpanStats:
+    """单个 span 名称的统计 (最近 N 次样本 + 累计值)"""
+
+    def __init__(self, window: int):
+        self.samples: deque = deque(maxlen=window)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.errors = 0
+
+    def add(self, duration_ms: float, error: bool = False):
+        self.samples.append(duration_ms)
+        self.count += 1
+        self.total_ms += duration_ms
+        self.last_ms = duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+        if error:
+            self.errors += 1
+
+    @staticmethod
+    def _percentile(ordered: List[float], p: float) -> float:
+        if not ordered:
+            return 0.0
+        k = (len(ordered) - 1) * p
+        lo = int(math.floor(k))
+        hi = min(lo + 1, len(ordered) - 1)
+        return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'last_ms': self.last_ms,
+            'mean_ms': self.total_ms / self.count if self.count else 0.0,
+            'p50_ms': self._percentile(ordered, 0.50),
+            'p90_ms': self._percentile(ordered, 0.90),
+            'p99_ms': self._percentile(ordered, 0.99),
+            'max_ms': self.max_ms,
+        }
+
+
+class Tracer:
+    """
+    轻量级追踪器
+
+    线程安全，记录开销为一次 perf_counter 和一次加锁的 deque 追加
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self.enabled = os.environ.get('MTP_TRACE', '1') != '0'
+        self._stats: Dict[str, SpanStats] = {}
+        self._lock = threading.Lock()
+        self._started_at = time.time()
+
+    def record(self, name: str, duration_ms: float, error: bool = False):
+        """记录一次耗时"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = SpanStats(self.window)
+            stats.add(duration_ms, error)
+
+    @contextmanager
+    def span(self, name: str):
+        """计时上下文，块内抛出异常时记为错误"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.record(name, duration_ms, error)
+            log_debug("Trace", f"{name}: {duration_ms:.1f}ms")
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取所有 span 的统计摘要"""
+        with self._lock:
+            items = [(name, stats) for name, stats in self._stats.items()]
+            return {name: stats.summary() for name, stats in sorted(items)}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._started_at = time.time()
+
+    def export(self, file_path: str) -> bool:
+        """导出统计到 JSON 文件"""
+        data = {
+            'exported_at': time.time(),
+            'since': self._started_at,
+            'window': self.window,
+            'spans': self.get_stats(),
+        }
+        try:
+            with open(file_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            return True
+        except OSError as e:
+            print(f"[Trace] 导出失败: {e}")
+            return False
+
+
+_global_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """获取全局追踪器"""
+    global _global_tracer
+    if _global_tracer is None:
+        with _tracer_lock:
+            if _global_tracer is None:
+                _global_tracer = Tracer()
+    return _global_tracer
+
+
+def span(name: str):
+    """全局追踪器的计时上下文"""
+    return get_tracer().span(name)
+
+
+def traced(name: str) -> Callable:
+    """函数计时装饰器"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,241 @@
+"""
+播放器状态快照与跨线程命令
+
+HTTP 接口等后台线程不能直接读取 Qt 控件或调用播放方法：
+- 主窗口在定时刷新 (以及播放/暂停/切歌/跳转) 时发布不可变的 PlayerStateSnapshot，
+  PlayerStateStore 只做一次引用替换，读取方无需加锁
+- 播放、下一首等写操作经 PlayerCommandDispatcher 排队，由 Qt 主线程执行，
+  调用方通过 Future 等待结果
+- 发布快照时与上一个快照比较，产生切歌/播放/暂停/跳转/位置事件，
+  由 PlayerEventHub 推送给订阅者 (SSE)，取代高频轮询状态接口
+"""
+
+import json
+import time
+import queue
+import threading
+from dataclasses import dataclass, field, replace
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any, Callable, Tuple
+
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+
+# 等待主线程执行命令的默认超时 (秒)
+COMMAND_TIMEOUT = 5.0
+# 播放中推送位置事件的间隔 (秒)
+POSITION_EVENT_INTERVAL = 1.0
+# 位置与推算值相差超过该值 (毫秒) 视为跳转
+SEEK_THRESHOLD_MS = 1500
+# 每个订阅者最多积压的事件数，超出时断开该订阅者
+SUBSCRIBER_QUEUE_SIZE = 64
+
+
+@dataclass(frozen=True)
+class PlayerStateSnapshot:
+    """某一时刻的播放器状态 (发布后不再修改)"""
+    playing: bool = False
+    current_song: Optional[Dict[str, Any]] = None  # {'title', 'artist', 'path'}
+    position_ms: int = 0
+    duration_ms: int = 0
+    playback_rate: float = 1.0
+    timestamp: float = field(default_factory=time.monotonic)  # 采样时间 (monotonic)
+    version: int = 0
+
+    def position_at(self, now: Optional[float] = None) -> int:
+        """按采样后经过的时间推算当前位置 (毫秒)"""
+        if not self.playing:
+            return self.position_ms
+        now = time.monotonic() if now is None else now
+        position = self.position_ms + int((now - self.timestamp) * 1000 * self.playback_rate)
+        return min(position, self.duration_ms) if self.duration_ms > 0 else position
+
+    def to_status(self) -> Dict[str, Any]:
+        """/api/player/status 的响应格式"""
+        return {
+            'playing': self.playing,
+            'current_song': dict(self.current_song) if self.current_song else None,
+            'progress': self.position_at() / 1000.0,
+            'duration': self.duration_ms / 1000.0,
+        }
+
+
+class EventSubscription:
+    """一个事件订阅者：有上限的事件队列"""
+
+    def __init__(self, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue: "queue.Queue" = queue.Queue(maxsize)
+        self.closed = False
+
+    def get(self, timeout: float) -> Optional[bytes]:
+        """取下一条已编码的事件，超时返回 None；订阅被关闭时返回 b''"""
+        if self.closed:
+            return b''
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return b'' if self.closed else None
+
+    def close(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(b'')  # 唤醒等待中的读取方
+        except queue.Full:
+            pass
+
+
+class PlayerEventHub:
+    """
+    播放器事件的扇出
+
+    每条事件只编码一次，放入每个订阅者的队列；
+    订阅者消费太慢 (队列已满) 时被断开，不会拖慢发布方
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Tuple[EventSubscription, ...] = ()
+        self.dropped_count = 0
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[EventSubscription]:
+        """
+        订阅事件
+
+        Args:
+            limit: 订阅数上限；已达到上限时返回 None (检查和加入在同一把锁内完成)
+        """
+        subscription = EventSubscription()
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription):
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscription)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def encode(event: str, data: Dict[str, Any], event_id: int = 0) -> bytes:
+        """编码为 SSE 消息"""
+        payload = json.dumps(data, ensure_ascii=False)
+        return f"id: {event_id}\nevent: {event}\ndata: {payload}\n\n".encode('utf-8')
+
+    def broadcast(self, event: str, data: Dict[str, Any], event_id: int = 0):
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        message = self.encode(event, data, event_id)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                self._drop(subscription)
+
+    def _drop(self, subscription: EventSubscription):
+        self.dropped_count += 1
+        self.close(subscription)
+        print("[播放器事件] 订阅者消费过慢，已断开")
+
+    def close(self, subscription: EventSubscription):
+        subscription.close()
+        self.unsubscribe(subscription)
+
+    def close_all(self):
+        for subscription in self._subscribers:
+            self.close(subscription)
+
+
+class PlayerStateStore:
+    """
+    最新播放器状态的持有者
+
+    publish() 由 Qt 主线程调用，get() 可在任意线程调用；
+    快照不可变，替换引用是原子操作，因此读写都不需要锁。
+    状态变化通过 events 推送
+    """
+
+    def __init__(self):
+        self._snapshot = PlayerStateSnapshot()
+        self.events = PlayerEventHub()
+        self._last_position_event = 0.0
+
+    def get(self) -> PlayerStateSnapshot:
+        return self._snapshot
+
+    def publish(self, snapshot: PlayerStateSnapshot) -> PlayerStateSnapshot:
+        previous = self._snapshot
+        snapshot = replace(snapshot, version=previous.version + 1)
+        self._snapshot = snapshot
+        if self.events.subscriber_count:
+            self._emit_events(previous, snapshot)
+        return snapshot
+
+    def _emit_events(self, previous: PlayerStateSnapshot, current: PlayerStateSnapshot):
+        """比较前后两个快照，推送变化事件"""
+        position = {'position': current.position_ms / 1000.0, 'duration': current.duration_ms / 1000.0}
+        event_id = current.version
+        if current.current_song != previous.current_song:
+            self.events.broadcast('song', {'current_song': current.current_song, **position}, event_id)
+        elif abs(current.position_ms - previous.position_at(current.timestamp)) > SEEK_THRESHOLD_MS:
+            self.events.broadcast('seek', position, event_id)
+        if current.playing != previous.playing:
+            self.events.broadcast('play' if current.playing else 'pause', position, event_id)
+        if current.playing and current.timestamp - self._last_position_event >= POSITION_EVENT_INTERVAL:
+            self._last_position_event = current.timestamp
+            self.events.broadcast('position', position, event_id)
+
+
+class PlayerCommandDispatcher(QObject):
+    """
+    把写命令从任意线程转交给 Qt 主线程执行
+
+    dispatcher 必须在主线程创建；submit() 把命令放入队列并通过排队信号唤醒主线程，
+    主线程依次调用 handler(action, data)，结果写入 Future
+    """
+
+    _wake = pyqtSignal()
+
+    def __init__(self, handler: Callable[[str, Any], Any], parent=None):
+        super().__init__(parent)
+        self._handler = handler
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._wake.connect(self._drain)
+
+    def submit(self, action: str, data: Any = None) -> Future:
+        future: Future = Future()
+        self._queue.put((action, data, future))
+        self._wake.emit()
+        return future
+
+    def call(self, action: str, data: Any = None, timeout: float = COMMAND_TIMEOUT) -> Any:
+        """提交命令并等待主线程执行完成，超时时返回 None"""
+        if QThread.currentThread() == self.thread():
+            # 已在主线程：直接执行，避免等待自己
+            return self._handler(action, data)
+        future = self.submit(action, data)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            print(f"[播放器命令] 等待主线程执行超时: {action}")
+            return None
+        except Exception as e:
+            print(f"[播放器命令] 执行失败 {action}: {e}")
+            return None
+
+    def _drain(self):
+        while True:
+            try:
+                action, data, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self._handler(action, data))
+            except Exception as e:
+                future.set_exception(e)
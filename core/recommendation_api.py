@@ -22,11 +22,38 @@ POST /api/recommend/playlist
 
 GET /api/player/status
   响应: {"playing": true, "current_song": {...}, "progress": 0.5}
+  (读取主窗口发布的状态快照，不访问界面线程)
+
+GET /api/player/events
+  Server-Sent Events 推送，取代轮询状态接口。连接后先收到一条 state 事件 (同 status)，
+  之后推送 song (切歌) / play / pause / seek 和播放中每秒一次的 position 事件，
+  data 为 JSON: {"position": 秒, "duration": 秒, ...}。消费过慢的连接会被断开
+
+GET /api/library?offset=0&limit=100&fields=path,title&q=关键词&artist=&album=&has_stems=1
+  分页列出曲库 (limit=0 表示全部)，响应分块传输，不在内存中拼出完整 JSON
+  (HTTP/1.0 请求不支持分块传输，改为带 Content-Length 的完整响应)
+  响应: {"offset": 0, "songs": [...], "total": 匹配总数, "next_offset": 下一页起点或 null}
+
+POST /api/feedback/batch
+  请求: {"events": [{"type": "played", "song": {...}, "duration": 秒, "completed": true},
+                    {"type": "skipped", "song": {...}, "position": 秒},
+                    {"type": "liked", "song": {...}, "liked": true}]}
+  响应: {"success": true, "accepted": 2, "ignored": 0, "rejected": 0}
+  (ignored: 事件有效但推荐提供者没有实现对应的回调，例如默认的随机推荐)
+
+POST /api/queue
+  请求: {"songs": [{"path": "..."} 或 "路径", ...], "mode": "append" | "next" | "replace"}
+  响应: {"success": true, "queued": 2, "missing": [...], "length": 队列长度}
+  队列中的歌曲优先于推荐和播放模式，由"下一首"依次播放
 
 POST /api/player/play
   请求: {"song": {...}}
   响应: {"success": true}
 
+服务器使用有上限的线程池并发处理请求，支持 HTTP/1.1 keep-alive；
+推荐接口 (可能较慢) 同时运行的数量单独限制，不会占满线程而拖慢状态接口。
+线程和等待队列都满、或推荐接口等待超时时返回 503 (带 Retry-After)。
+
 示例代码:
 --------
 ```python
@@ -47,12 +74,41 @@ player.set_recommendation_provider(MyRecommender())
 
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, asdict
 from typing import Optional, List, Dict, Any, Callable
 from abc import ABC, abstractmethod
 from http.server import HTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 
+from .perf import span, log_debug
+from .player_state import PlayerStateStore
+
+# 并发处理连接的线程数，以及线程都忙时最多排队的连接数
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_MAX_PENDING = 64
+# 同时调用推荐提供者 (get_next_song / get_playlist) 的请求数
+DEFAULT_MAX_PROVIDER_CALLS = 4
+# keep-alive 连接空闲 (以及读取请求) 的超时时间 (秒)
+REQUEST_TIMEOUT = 5.0
+# 请求体大小上限
+MAX_BODY_BYTES = 16 * 1024 * 1024
+# 事件推送连接数上限 (每个连接占用一个线程)
+MAX_EVENT_SUBSCRIBERS = 8
+# 没有事件时发送注释行保持连接的间隔 (秒)
+EVENT_HEARTBEAT_INTERVAL = 15.0
+# 曲库接口可选的字段和默认字段
+LIBRARY_FIELDS = ('path', 'filename', 'title', 'artist', 'album', 'duration',
+                  'has_stems', 'stems_path', 'is_online', 'source')
+DEFAULT_LIBRARY_FIELDS = ('path', 'title', 'artist', 'album', 'duration', 'has_stems')
+DEFAULT_LIBRARY_LIMIT = 100
+# 分块传输时每块包含的歌曲数
+LIBRARY_CHUNK_SONGS = 256
+# 批量反馈的事件类型 -> 推荐提供者的回调
+FEEDBACK_HOOKS = {'played': 'on_song_played', 'skipped': 'on_song_skipped', 'liked': 'on_song_liked'}
+# 流式响应的路由：耗时取决于客户端的连接和读取速度，不计入 api.GET 的耗时
+STREAMING_ROUTES = ('/api/player/events', '/api/library')
+
 
 @dataclass
 class SongRecommendation:
@@ -141,45 +197,112 @@ class RecommendationProvider(ABC):
             liked: True表示收藏，False表示取消收藏
         """
         pass
+        
+    def handles_feedback(self, hook: str) -> bool:
+        """是否真正处理某个反馈回调 (hook 为 on_song_played 等方法名)
+        
+        默认按子类是否覆盖了该方法判断；只转发反馈的提供者应按转发目标判断
+        """
+        return getattr(type(self), hook) is not getattr(RecommendationProvider, hook)
 
 
 class DefaultRecommendationProvider(RecommendationProvider):
-    """默认推荐提供者 - 随机推荐"""
+    """默认推荐提供者 - 随机推荐
+    
+    set_song_pool 时建立 路径 -> 位置 索引，推荐时用排除位图做拒绝采样：
+    每次只访问被排除的歌曲和抽中的歌曲，不再扫描整个歌曲池。
+    抽样结果仍是在未排除的歌曲中均匀随机 (与逐一筛选后 random.choice / random.sample 分布相同)；
+    被排除的歌曲占多数时退回到筛选列表的方式
+    """
     
     def __init__(self):
         self.song_pool: List[Dict] = []
+        self._slots: Dict[Any, List[int]] = {}  # 路径 -> 在歌曲池中的位置
+        self._excluded = bytearray()  # 排除位图，每次推荐后清零
+        self._lock = threading.Lock()
         
     def set_song_pool(self, songs: List[Dict]):
         """设置歌曲池"""
-        self.song_pool = songs
-        
-    def get_next_song(self, current_song, history, context) -> Optional[SongRecommendation]:
-        import random
-        if not self.song_pool:
-            return None
+        slots: Dict[Any, List[int]] = {}
+        for i, song in enumerate(songs):
+            slots.setdefault(song.get('path'), []).append(i)
+        with self._lock:
+            self.song_pool = songs
+            self._slots = slots
+            self._excluded = bytearray(len(songs))
             
-        # 排除最近播放的歌曲
-        recent_paths = {h.get('path') for h in history[-10:]} if history else set()
-        if current_song:
-            recent_paths.add(current_song.get('path'))
-            
-        available = [s for s in self.song_pool if s.get('path') not in recent_paths]
+    def _mark(self, paths) -> List[int]:
+        """在位图中标记这些路径对应的位置，返回被标记的位置"""
+        marked = []
+        for path in paths:
+            for slot in self._slots.get(path, ()):
+                if not self._excluded[slot]:
+                    self._excluded[slot] = 1
+                    marked.append(slot)
+        return marked
         
-        if not available:
-            available = self.song_pool
+    def _clear(self, slots: List[int]):
+        for slot in slots:
+            self._excluded[slot] = 0
             
-        selected = random.choice(available)
+    def _sample(self, count: int) -> List[int]:
+        """在未标记的位置中不放回地均匀抽取 count 个 (调用方持有锁)"""
+        import random
+        size = len(self.song_pool)
+        chosen = []
+        taken = set()
+        while len(chosen) < count:
+            slot = random.randrange(size)
+            if self._excluded[slot] or slot in taken:
+                continue
+            taken.add(slot)
+            chosen.append(slot)
+        return chosen
+        
+    def get_next_song(self, current_song, history, context) -> Optional[SongRecommendation]:
+        import random
+        with self._lock:
+            pool = self.song_pool
+            if not pool:
+                return None
+                
+            # 排除最近播放的歌曲
+            recent_paths = {h.get('path') for h in history[-10:]} if history else set()
+            if current_song:
+                recent_paths.add(current_song.get('path'))
+                
+            marked = self._mark(recent_paths)
+            try:
+                available_count = len(pool) - len(marked)
+                if available_count <= 0:
+                    selected = random.choice(pool)
+                elif available_count * 2 >= len(pool):
+                    selected = pool[self._sample(1)[0]]
+                else:
+                    selected = random.choice([s for i, s in enumerate(pool) if not self._excluded[i]])
+            finally:
+                self._clear(marked)
         return SongRecommendation(song_info=selected, reason="随机推荐")
         
     def get_playlist(self, seed_songs, count=10, context=None) -> List[SongRecommendation]:
         import random
-        if not self.song_pool:
-            return []
-            
-        seed_paths = {s.get('path') for s in seed_songs}
-        available = [s for s in self.song_pool if s.get('path') not in seed_paths]
-        
-        selected = random.sample(available, min(count, len(available)))
+        with self._lock:
+            pool = self.song_pool
+            if not pool:
+                return []
+                
+            seed_paths = {s.get('path') for s in seed_songs}
+            marked = self._mark(seed_paths)
+            try:
+                available_count = len(pool) - len(marked)
+                count = max(0, min(count, available_count))
+                if count * 2 <= available_count and available_count * 2 >= len(pool):
+                    selected = [pool[i] for i in self._sample(count)]
+                else:
+                    available = [s for i, s in enumerate(pool) if not self._excluded[i]]
+                    selected = random.sample(available, count)
+            finally:
+                self._clear(marked)
         return [SongRecommendation(song_info=s, reason="随机推荐") for s in selected]
 
 
@@ -188,20 +311,80 @@ class RecommendationAPIHandler(BaseHTTPRequestHandler):
     
     provider: Optional[RecommendationProvider] = None
     player_callback: Optional[Callable] = None
+    state_store: Optional[PlayerStateStore] = None
+    library: tuple = ()  # 曲库快照 (SongInfo 元组，整体替换)
+    
+    # HTTP/1.1: 响应带 Content-Length，连接可以复用
+    protocol_version = "HTTP/1.1"
+    # 连接上的读超时 (StreamRequestHandler 会设置到 socket 上)
+    timeout = REQUEST_TIMEOUT
     
     def log_message(self, format, *args):
         pass  # 静默日志
         
+    def end_headers(self):
+        # 有连接在排队时，处理完本次请求就关闭 keep-alive 连接，让出线程
+        if not self.close_connection and getattr(self.server, 'has_waiting', lambda: False)():
+            self.send_header('Connection', 'close')
+        super().end_headers()
+        
     def _send_json(self, data: dict, status: int = 200):
+        self._send_body(json.dumps(data, ensure_ascii=False).encode('utf-8'), status)
+        
+    def _send_body(self, body: bytes, status: int = 200, content_type: str = 'application/json; charset=utf-8'):
         self.send_response(status)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def _start_chunked(self, content_type: str = 'application/json; charset=utf-8'):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Transfer-Encoding', 'chunked')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
         
+    def _write_chunk(self, data: bytes):
+        if data:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+            
+    def _end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        
+    def _send_busy(self):
+        self.send_response(503)
+        self.send_header('Retry-After', '1')
+        body = b'{"error": "Server busy"}'
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def _acquire_provider(self) -> bool:
+        """占用一个推荐调用名额，等待超时时返回 503"""
+        slots = getattr(self.server, 'provider_slots', None)
+        if slots is None or slots.acquire(timeout=REQUEST_TIMEOUT):
+            return True
+        self._send_busy()
+        return False
+        
+    def _release_provider(self):
+        slots = getattr(self.server, 'provider_slots', None)
+        if slots is not None:
+            slots.release()
+            
     def _read_json(self) -> Optional[dict]:
         try:
             content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            content_length = -1
+        if content_length < 0 or content_length > MAX_BODY_BYTES:
+            # 请求体没有读取，连接上的数据已不可用
+            self.close_connection = True
+            return None
+        try:
             body = self.rfile.read(content_length)
             return json.loads(body.decode('utf-8'))
         except Exception:
@@ -212,26 +395,156 @@ class RecommendationAPIHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Content-Length', '0')
         self.end_headers()
         
     def do_GET(self):
+        if urllib.parse.urlparse(self.path).path in STREAMING_ROUTES:
+            self._dispatch(self._handle_get)
+            return
+        with span("api.GET"):
+            self._dispatch(self._handle_get)
+            
+    def do_POST(self):
+        with span("api.POST"):
+            self._dispatch(self._handle_post)
+            
+    def _dispatch(self, handler: Callable):
+        """处理请求，出错时返回 500 而不是直接断开连接"""
+        try:
+            handler()
+        except (ConnectionError, TimeoutError):
+            self.close_connection = True
+        except Exception as e:
+            print(f"[播放器内置API] 处理 {self.command} {self.path} 出错: {e}")
+            self.close_connection = True
+            try:
+                self._send_json({'error': 'Internal error'}, 500)
+            except OSError:
+                pass
+            
+    def _handle_get(self):
         parsed = urllib.parse.urlparse(self.path)
         path = parsed.path
         
         if path == '/api/player/status':
-            if self.player_callback:
+            if self.state_store:
+                self._send_json(self.state_store.get().to_status())
+            elif self.player_callback:
                 status = self.player_callback('get_status')
                 self._send_json(status or {})
             else:
                 self._send_json({'error': 'Player not connected'}, 503)
                 
+        elif path == '/api/library':
+            self._stream_library(urllib.parse.parse_qs(parsed.query))
+            
+        elif path == '/api/player/events':
+            self._stream_events()
+            
         elif path == '/api/health':
             self._send_json({'status': 'ok', 'version': '3.0'})
             
         else:
             self._send_json({'error': 'Not found'}, 404)
             
-    def do_POST(self):
+    @staticmethod
+    def _library_filter(query: Dict[str, List[str]]) -> Callable:
+        """根据查询参数构造歌曲过滤函数"""
+        text = query.get('q', [''])[0].casefold()
+        artist = query.get('artist', [''])[0].casefold()
+        album = query.get('album', [''])[0].casefold()
+        has_stems = query.get('has_stems', [''])[0].lower()
+        
+        def match(song) -> bool:
+            if artist and song.artist.casefold() != artist:
+                return False
+            if album and song.album.casefold() != album:
+                return False
+            if has_stems and song.has_stems != (has_stems in ('1', 'true', 'yes')):
+                return False
+            if text and text not in f"{song.title}\n{song.artist}\n{song.album}".casefold():
+                return False
+            return True
+        return match
+        
+    def _stream_library(self, query: Dict[str, List[str]]):
+        """分页列出曲库，按块编码输出"""
+        try:
+            offset = max(0, int(query.get('offset', ['0'])[0]))
+            limit = max(0, int(query.get('limit', [str(DEFAULT_LIBRARY_LIMIT)])[0]))
+        except ValueError:
+            self._send_json({'error': 'Invalid offset or limit'}, 400)
+            return
+        requested = [f for f in query.get('fields', [''])[0].split(',') if f]
+        fields = tuple(f for f in requested if f in LIBRARY_FIELDS) or DEFAULT_LIBRARY_FIELDS
+        
+        parts = self._library_parts(self._library_filter(query), offset, limit, fields)
+        if self.request_version == 'HTTP/1.0':
+            # HTTP/1.0 客户端不认识分块传输，拼出完整响应
+            self._send_body(b''.join(parts))
+            return
+        self._start_chunked()
+        for part in parts:
+            self._write_chunk(part)
+        self._end_chunked()
+        
+    def _library_parts(self, match: Callable, offset: int, limit: int, fields: tuple):
+        """逐段生成曲库响应的 JSON (每段最多 LIBRARY_CHUNK_SONGS 首)"""
+        matched = (song for song in self.library if match(song))
+        yield f'{{"offset": {offset}, "songs": ['.encode('utf-8')
+        total = 0
+        written = 0
+        batch = []
+        for song in matched:
+            total += 1
+            if total <= offset or (limit and written >= limit):
+                continue
+            # 第一首之后的每首前面加逗号
+            batch.append((',' if written else '') +
+                         json.dumps({f: getattr(song, f, None) for f in fields}, ensure_ascii=False))
+            written += 1
+            if len(batch) >= LIBRARY_CHUNK_SONGS:
+                yield ''.join(batch).encode('utf-8')
+                batch = []
+        yield ''.join(batch).encode('utf-8')
+        next_offset = offset + written if offset + written < total else None
+        yield f'], "total": {total}, "next_offset": {json.dumps(next_offset)}}}'.encode('utf-8')
+        
+    def _stream_events(self):
+        """SSE 推送播放器事件，直到客户端断开或消费过慢被断开"""
+        if not self.state_store:
+            self._send_json({'error': 'Player not connected'}, 503)
+            return
+        hub = self.state_store.events
+        subscription = hub.subscribe(limit=MAX_EVENT_SUBSCRIBERS)
+        if subscription is None:
+            self._send_busy()
+            return
+        # 响应没有长度，以关闭连接结束
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            snapshot = self.state_store.get()
+            self.wfile.write(hub.encode('state', snapshot.to_status(), snapshot.version))
+            self.wfile.flush()
+            while True:
+                message = subscription.get(EVENT_HEARTBEAT_INTERVAL)
+                if message == b'':
+                    break
+                self.wfile.write(message if message is not None else b": keepalive\n\n")
+                self.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            hub.unsubscribe(subscription)
+            
+    def _handle_post(self):
         parsed = urllib.parse.urlparse(self.path)
         path = parsed.path
         data = self._read_json()
@@ -246,7 +559,12 @@ class RecommendationAPIHandler(BaseHTTPRequestHandler):
             ctx_data = data.get('context', {}) if data else {}
             context = PlayContext(**ctx_data) if ctx_data else PlayContext()
             
-            result = self.provider.get_next_song(current, history, context)
+            if not self._acquire_provider():
+                return
+            try:
+                result = self.provider.get_next_song(current, history, context)
+            finally:
+                self._release_provider()
             if result:
                 self._send_json(asdict(result))
             else:
@@ -262,7 +580,12 @@ class RecommendationAPIHandler(BaseHTTPRequestHandler):
             ctx_data = data.get('context', {}) if data else {}
             context = PlayContext(**ctx_data) if ctx_data else None
             
-            results = self.provider.get_playlist(seeds, count, context)
+            if not self._acquire_provider():
+                return
+            try:
+                results = self.provider.get_playlist(seeds, count, context)
+            finally:
+                self._release_provider()
             self._send_json({'songs': [asdict(r) for r in results]})
             
         elif path == '/api/player/play':
@@ -301,19 +624,161 @@ class RecommendationAPIHandler(BaseHTTPRequestHandler):
                 )
             self._send_json({'success': True})
             
+        elif path == '/api/feedback/batch':
+            if not self.provider:
+                self._send_json({'error': 'No recommendation provider'}, 503)
+                return
+            events = data.get('events') if isinstance(data, dict) else None
+            if not isinstance(events, list):
+                self._send_json({'error': 'No events provided'}, 400)
+                return
+            counts = {'accepted': 0, 'ignored': 0, 'rejected': 0}
+            for event in events:
+                counts[self._apply_feedback(event)] += 1
+            self._send_json({'success': True, **counts})
+            
+        elif path == '/api/queue':
+            if not self.player_callback:
+                self._send_json({'error': 'Player not connected'}, 503)
+                return
+            songs = data.get('songs') if isinstance(data, dict) else None
+            mode = data.get('mode', 'append') if isinstance(data, dict) else 'append'
+            if not isinstance(songs, list) or mode not in ('append', 'next', 'replace'):
+                self._send_json({'error': 'Invalid queue request'}, 400)
+                return
+            paths = [s.get('path', '') if isinstance(s, dict) else str(s) for s in songs]
+            result = self.player_callback('enqueue', {'paths': paths, 'mode': mode})
+            if result is None:
+                self._send_json({'error': 'Player busy'}, 503)
+            else:
+                self._send_json({'success': True, **result})
+            
         else:
             self._send_json({'error': 'Not found'}, 404)
+            
+    def _apply_feedback(self, event) -> str:
+        """
+        处理一条批量反馈事件
+        
+        Returns:
+            'accepted'; 'ignored' (推荐提供者没有实现这类反馈的回调); 'rejected' (无效或处理失败)
+        """
+        if not isinstance(event, dict) or not isinstance(event.get('song'), dict):
+            return 'rejected'
+        kind = event.get('type')
+        hook = FEEDBACK_HOOKS.get(kind)
+        if hook is None:
+            return 'rejected'
+        if not self.provider.handles_feedback(hook):
+            return 'ignored'
+        song = event['song']
+        try:
+            if kind == 'played':
+                self.provider.on_song_played(song, event.get('duration', 0), event.get('completed', False))
+            elif kind == 'skipped':
+                self.provider.on_song_skipped(song, event.get('position', 0))
+            else:
+                self.provider.on_song_liked(song, event.get('liked', True))
+        except Exception as e:
+            print(f"[播放器内置API] 处理反馈失败: {e}")
+            return 'rejected'
+        return 'accepted'
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    用有上限的线程池处理连接的 HTTP 服务器
+    
+    - 最多 max_workers 个连接同时处理，慢请求不会阻塞其他请求
+    - 线程都忙时最多 max_pending 个连接排队，超出时立即返回 503
+    - 有连接排队时，keep-alive 连接在当前请求结束后关闭，避免长连接占住所有线程
+    - 推荐调用单独限流 (provider_slots)，慢推荐不影响状态接口
+    """
+    
+    def __init__(self, server_address, handler_class,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 max_provider_calls: int = DEFAULT_MAX_PROVIDER_CALLS):
+        super().__init__(server_address, handler_class)
+        self.provider_slots = threading.BoundedSemaphore(max_provider_calls)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api")
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        self.rejected_count = 0
+        
+    def has_waiting(self) -> bool:
+        """是否有连接在等待线程"""
+        return self._waiting > 0
+        
+    def process_request(self, request, client_address):
+        if not self._slots.acquire(blocking=False):
+            self.rejected_count += 1
+            self._reject(request)
+            return
+        with self._waiting_lock:
+            self._waiting += 1
+        try:
+            self._executor.submit(self._process_request, request, client_address)
+        except RuntimeError:
+            # 线程池已关闭
+            with self._waiting_lock:
+                self._waiting -= 1
+            self._slots.release()
+            self.shutdown_request(request)
+            
+    def _process_request(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+            
+    def _reject(self, request):
+        """服务器繁忙：直接在监听线程中返回 503"""
+        body = b'{"error": "Server busy"}'
+        response = (
+            b"HTTP/1.1 503 Service Unavailable\r\n"
+            b"Content-Type: application/json; charset=utf-8\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n"
+            b"Retry-After: 1\r\n"
+            b"Connection: close\r\n\r\n" + body
+        )
+        try:
+            request.settimeout(1.0)
+            request.sendall(response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+        
+    def handle_error(self, request, client_address):
+        # 客户端断开等错误不打印堆栈
+        log_debug("播放器内置API", f"连接 {client_address} 出错")
+        
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 
 class RecommendationAPIServer:
     """推荐API服务器"""
     
-    def __init__(self, port: int = 23331):
+    def __init__(self, port: int = 23331, max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 max_provider_calls: int = DEFAULT_MAX_PROVIDER_CALLS):
         self.port = port
-        self.server: Optional[HTTPServer] = None
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_provider_calls = max_provider_calls
+        self.server: Optional[PooledHTTPServer] = None
         self.thread: Optional[threading.Thread] = None
         self.provider: Optional[RecommendationProvider] = None
         self.player_callback: Optional[Callable] = None
+        self.state_store: Optional[PlayerStateStore] = None
         
     def set_provider(self, provider: RecommendationProvider):
         """设置推荐提供者"""
@@ -325,13 +790,24 @@ class RecommendationAPIServer:
         self.player_callback = callback
         RecommendationAPIHandler.player_callback = callback
         
+    def set_library(self, songs):
+        """设置曲库快照 (曲库变化后整体替换)"""
+        RecommendationAPIHandler.library = tuple(songs)
+        
+    def set_state_store(self, store: PlayerStateStore):
+        """设置播放器状态快照 (状态接口直接读取，不经过回调)"""
+        self.state_store = store
+        RecommendationAPIHandler.state_store = store
+        
     def start(self):
         """启动服务器"""
         if self.server:
             return
             
         try:
-            self.server = HTTPServer(('127.0.0.1', self.port), RecommendationAPIHandler)
+            self.server = PooledHTTPServer(('127.0.0.1', self.port), RecommendationAPIHandler,
+                                           self.max_workers, self.max_pending,
+                                           self.max_provider_calls)
             self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
             self.thread.start()
             print(f"[播放器内置API] 推荐接口已启动 (端口: {self.port})")
@@ -341,6 +817,9 @@ class RecommendationAPIServer:
     def stop(self):
         """停止服务器"""
         if self.server:
+            if self.state_store:
+                self.state_store.events.close_all()
             self.server.shutdown()
+            self.server.server_close()
             self.server = None
             self.thread = None
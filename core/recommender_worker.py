@@ -0,0 +1,98 @@
+"""
+推荐系统的后台工作线程
+
+切歌时推荐系统的学习 (更新模型、写盘) 和打分不应拖慢音频开始播放：
+- submit() 把播放事件交给单个后台线程按顺序处理，调用方立即返回
+- prefetch() 在当前歌曲播放期间提前计算下一首推荐，切歌时 take() 直接取结果，
+  还没算完就返回 None，由调用方改用默认的下一首
+
+推荐系统对象只在这个线程中被调用 (事件和推荐共用一个线程)，不需要自身线程安全；
+其他线程 (例如调试对话框) 需要结果时用 call() 排队到这个线程执行并等待
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Callable, Any, Hashable
+
+from .perf import span, log_debug
+
+
+class RecommenderWorker:
+    """按提交顺序执行推荐系统调用的单线程队列"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recommender")
+        self._lock = threading.Lock()
+        self._prefetch_key: Optional[Hashable] = None
+        self._prefetch_future: Optional[Future] = None
+        self._closed = False
+
+    def submit(self, name: str, fn: Callable, *args, **kwargs) -> Optional[Future]:
+        """提交一个不需要结果的调用 (异常只打印，不影响后续调用)"""
+        if self._closed:
+            return None
+        return self._executor.submit(self._run, name, fn, args, kwargs)
+
+    def call(self, name: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        在后台线程上执行调用并等待结果 (排在已提交的事件之后)
+
+        与 submit() 不同，异常会抛给调用方；已关闭时直接在当前线程执行
+        """
+        if self._closed:
+            return fn(*args, **kwargs)
+        return self._executor.submit(self._run_raising, name, fn, args, kwargs).result()
+
+    @staticmethod
+    def _run_raising(name: str, fn: Callable, args, kwargs) -> Any:
+        with span(name):
+            return fn(*args, **kwargs)
+
+    @staticmethod
+    def _run(name: str, fn: Callable, args, kwargs) -> Any:
+        try:
+            with span(name):
+                return fn(*args, **kwargs)
+        except Exception as e:
+            print(f"[推荐系统] 后台任务失败 {name}: {e}")
+            return None
+
+    def prefetch(self, key: Hashable, fn: Callable, *args, **kwargs):
+        """提前计算 key (通常是当前歌曲路径) 对应的下一首推荐，替换之前的预取"""
+        future = self.submit("recommender.prefetch", fn, *args, **kwargs)
+        with self._lock:
+            previous = self._prefetch_future
+            self._prefetch_key, self._prefetch_future = key, future
+        if previous is not None:
+            previous.cancel()
+
+    def take(self, key: Hashable) -> Any:
+        """
+        取出 key 对应的预取结果
+
+        Returns:
+            已算完的结果；没有预取、key 不匹配或尚未算完时返回 None
+        """
+        with self._lock:
+            if self._prefetch_key != key or self._prefetch_future is None:
+                return None
+            future = self._prefetch_future
+            if not future.done():
+                log_debug("推荐系统", "下一首推荐尚未算完")
+                return None
+            self._prefetch_key, self._prefetch_future = None, None
+        return None if future.cancelled() else future.result()
+
+    def invalidate(self):
+        """丢弃预取结果 (例如歌曲池变化后)"""
+        with self._lock:
+            future = self._prefetch_future
+            self._prefetch_key, self._prefetch_future = None, None
+        if future is not None:
+            future.cancel()
+
+    def shutdown(self, wait: bool = True):
+        """处理完已提交的事件后停止 (未开始的预取被取消)"""
+        self._closed = True
+        self.invalidate()
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,320 @@
+"""
+按音频内容索引的分离音轨库
+
+分离结果以歌曲文件内容的快速指纹为键登记在持久化索引中：
+- 文件改名、移动或在不同文件夹中有重复副本时，仍然找到同一份分离音轨
+- 查找是一次字典访问，指纹按 (路径, 大小, 修改时间) 缓存，已知文件不再读取内容
+- 已经分离过的内容不会再交给 MSST
+
+stems 文件夹仍然按歌曲名存放在 stems 根目录下，索引只记录 指纹 -> 文件夹。
+
+StemsFolderIndex 记录 stems 根目录下每个文件夹里的音频文件和修改时间，
+启动和扫描时只需 stat 每个文件夹，修改时间没变的文件夹不再重新列出
+"""
+
+import os
+import json
+import stat
+import hashlib
+import threading
+from typing import Optional, Dict, List, Iterable
+
+INDEX_VERSION = 1
+FOLDER_INDEX_VERSION = 1
+# 指纹取文件头、中、尾各一段，加上文件大小
+SAMPLE_SIZE = 64 * 1024
+
+
+def audio_fingerprint(path: str) -> str:
+    """
+    计算音频文件的快速内容指纹
+
+    只读取开头、中间、结尾各 64KB，对大文件也是常数时间；
+    字节相同的副本 (改名、移动、复制) 得到相同的指纹
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        if size <= SAMPLE_SIZE * 3:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2 - SAMPLE_SIZE // 2, size - SAMPLE_SIZE):
+                f.seek(offset)
+                digest.update(f.read(SAMPLE_SIZE))
+    return digest.hexdigest()
+
+
+class StemsStore:
+    """
+    指纹 -> stems 文件夹 的持久化索引
+
+    线程安全；修改后标记为脏，由 save() 统一写盘 (原子替换)
+    """
+
+    def __init__(self, index_file: str = ""):
+        if not index_file:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".multi_track_player")
+            os.makedirs(cache_dir, exist_ok=True)
+            index_file = os.path.join(cache_dir, "stems_store.json")
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        self._entries: Dict[str, str] = {}  # 指纹 -> stems 文件夹
+        self._files: Dict[str, list] = {}  # 歌曲路径 -> [大小, 修改时间(ns), 指纹]
+        self._dirty = False
+        self._load()
+
+    # ---------------- 指纹 ----------------
+
+    def fingerprint(self, path: str) -> Optional[str]:
+        """获取歌曲文件的指纹 (文件未变化时直接使用缓存)"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._files.get(path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                return cached[2]
+        try:
+            value = audio_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            self._files[path] = [stat.st_size, stat.st_mtime_ns, value]
+            self._dirty = True
+        return value
+
+    # ---------------- 查找与登记 ----------------
+
+    def lookup(self, song_path: str) -> Optional[str]:
+        """查找与该歌曲内容相同的已分离音轨文件夹，不存在时返回 None"""
+        key = self.fingerprint(song_path)
+        if not key:
+            return None
+        with self._lock:
+            stems_dir = self._entries.get(key)
+        if stems_dir and os.path.isdir(stems_dir):
+            return stems_dir
+        if stems_dir:
+            # 文件夹已被删除
+            with self._lock:
+                self._entries.pop(key, None)
+                self._dirty = True
+        return None
+
+    def register(self, song_path: str, stems_dir: str) -> Optional[str]:
+        """登记歌曲的分离结果，返回指纹"""
+        key = self.fingerprint(song_path)
+        if not key or not stems_dir:
+            return None
+        with self._lock:
+            if self._entries.get(key) != stems_dir:
+                self._entries[key] = stems_dir
+                self._dirty = True
+        return key
+
+    def forget_stems(self, stems_dir: str):
+        """stems 文件夹被删除时移除对应的登记"""
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v == stems_dir]:
+                del self._entries[key]
+                self._dirty = True
+
+    def find_duplicates(self, song_path: str, candidates: List[str]) -> List[str]:
+        """在候选路径中找出与该歌曲内容相同的其他文件"""
+        key = self.fingerprint(song_path)
+        if not key:
+            return []
+        return [p for p in candidates if p != song_path and self.fingerprint(p) == key]
+
+    def retain_files(self, paths: List[str]):
+        """只保留仍在曲库中的文件的指纹缓存 (扫描完成后调用)"""
+        keep = set(paths)
+        with self._lock:
+            removed = [p for p in self._files if p not in keep]
+            for p in removed:
+                del self._files[p]
+            if removed:
+                self._dirty = True
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    # ---------------- 持久化 ----------------
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return
+            self._entries = dict(data.get('entries', {}))
+            self._files = dict(data.get('files', {}))
+        except Exception as e:
+            print(f"[音轨库] 加载索引失败: {e}")
+
+    def save(self):
+        """索引有变化时写盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                'version': INDEX_VERSION,
+                'entries': dict(self._entries),
+                'files': dict(self._files),
+            }
+            self._dirty = False
+        temp_file = self.index_file + ".tmp"
+        try:
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_file, self.index_file)
+        except Exception as e:
+            print(f"[音轨库] 保存索引失败: {e}")
+
+
+class StemsFolderIndex:
+    """
+    stems 根目录的持久化索引: 文件夹 -> 音频文件列表
+
+    每个文件夹记录修改时间 (st_mtime_ns)，文件夹内增删文件会改变它，
+    因此校验只需对每个文件夹做一次 stat；根目录修改时间不变时也不必重新列出根目录
+    """
+
+    def __init__(self, index_file: str = ""):
+        if not index_file:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".multi_track_player")
+            os.makedirs(cache_dir, exist_ok=True)
+            index_file = os.path.join(cache_dir, "stems_folders.json")
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        # stems 根目录 -> {'mtime': 根目录修改时间, 'folders': {文件夹名: {'mtime': ..., 'files': [...]}}}
+        self._roots: Dict[str, dict] = {}
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def _scan_folder(folder_path: str, mtime: int, extensions: tuple) -> dict:
+        files = []
+        try:
+            with os.scandir(folder_path) as it:
+                for entry in it:
+                    if entry.name.lower().endswith(extensions) and entry.is_file():
+                        files.append(entry.name)
+        except OSError:
+            pass
+        return {'mtime': mtime, 'files': sorted(files)}
+
+    def folders(self, stems_path: str, extensions: Iterable[str]) -> Dict[str, List[str]]:
+        """
+        获取 stems 根目录下含有音频文件的文件夹
+
+        Returns:
+            {文件夹名: [音频文件名, ...]}
+        """
+        extensions = tuple(extensions)
+        try:
+            root_mtime = os.stat(stems_path).st_mtime_ns
+        except OSError:
+            return {}
+        with self._lock:
+            entry = self._roots.get(stems_path) or {'mtime': None, 'folders': {}}
+            known = entry['folders']
+            if entry['mtime'] == root_mtime:
+                names = list(known.keys())
+            else:
+                try:
+                    # 隐藏目录是正在进行的分离任务
+                    names = [n for n in os.listdir(stems_path) if not n.startswith('.')]
+                except OSError:
+                    return {}
+            folders = {}
+            rescanned = 0
+            for name in names:
+                folder_path = os.path.join(stems_path, name)
+                try:
+                    st = os.stat(folder_path)
+                except OSError:
+                    continue
+                if not stat.S_ISDIR(st.st_mode):
+                    continue
+                info = known.get(name)
+                if info is None or info['mtime'] != st.st_mtime_ns:
+                    info = self._scan_folder(folder_path, st.st_mtime_ns, extensions)
+                    rescanned += 1
+                folders[name] = info
+            if rescanned or entry['mtime'] != root_mtime or len(folders) != len(known):
+                self._roots[stems_path] = {'mtime': root_mtime, 'folders': folders}
+                self._dirty = True
+            return {name: info['files'] for name, info in folders.items() if info['files']}
+
+    def update_folder(self, folder_path: str, extensions: Iterable[str]):
+        """分离完成后更新单个文件夹 (不重新校验整个根目录)"""
+        stems_path = os.path.dirname(folder_path)
+        name = os.path.basename(folder_path)
+        try:
+            mtime = os.stat(folder_path).st_mtime_ns
+        except OSError:
+            return
+        with self._lock:
+            entry = self._roots.get(stems_path)
+            if entry is None:
+                return
+            entry['folders'][name] = self._scan_folder(folder_path, mtime, tuple(extensions))
+            self._dirty = True
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != FOLDER_INDEX_VERSION:
+                return
+            self._roots = dict(data.get('roots', {}))
+        except Exception as e:
+            print(f"[音轨库] 加载文件夹索引失败: {e}")
+
+    def save(self):
+        """索引有变化时写盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {'version': FOLDER_INDEX_VERSION, 'roots': self._roots}
+            temp_file = self.index_file + ".tmp"
+            try:
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(temp_file, self.index_file)
+                self._dirty = False
+            except Exception as e:
+                print(f"[音轨库] 保存文件夹索引失败: {e}")
+
+
+_global_store: Optional[StemsStore] = None
+_global_folder_index: Optional[StemsFolderIndex] = None
+_store_lock = threading.Lock()
+
+
+def get_stems_store() -> StemsStore:
+    """获取全局音轨库"""
+    global _global_store
+    if _global_store is None:
+        with _store_lock:
+            if _global_store is None:
+                _global_store = StemsStore()
+    return _global_store
+
+
+def get_stems_folder_index() -> StemsFolderIndex:
+    """获取全局 stems 文件夹索引"""
+    global _global_folder_index
+    if _global_folder_index is None:
+        with _store_lock:
+            if _global_folder_index is None:
+                _global_folder_index = StemsFolderIndex()
+    return _global_folder_index
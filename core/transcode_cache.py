@@ -0,0 +1,209 @@
+"""
+播放转码缓存
+
+输出后端不能直接解码的音轨 (例如旧版本分离出的 M4A/AAC 音轨、FLAC、Opus)
+每次加载都要经过 pydub → FFmpeg 解码 → WAV 导出。首次加载时在后台用 FFmpeg
+把它们转码为后端能直接解码的格式 (pygame 为 Ogg Vorbis，高质量)，之后的加载
+直接读取缓存文件。
+
+- 缓存键为 (路径, 大小, 修改时间)，源文件变化后自动失效
+- 单个低优先级转码线程，不和播放抢 CPU
+- 缓存总大小超过上限时按最近使用时间淘汰
+"""
+
+import os
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from .audio_output import get_output_backend
+from .perf import get_tracer, log_debug
+
+DEFAULT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB
+# 转码质量：缓存文件由有损音轨再次编码，用较高的 Vorbis 质量减少二次损失
+VORBIS_QUALITY = '6'
+# 后台 FFmpeg 进程的 nice 值
+LOW_PRIORITY_NICE = 10
+
+
+def popen_low_priority(cmd: list, **kwargs) -> subprocess.Popen:
+    """
+    以低优先级启动后台 FFmpeg 进程 (转码缓存、向量索引共用)
+
+    Windows 使用 BELOW_NORMAL_PRIORITY_CLASS；其他系统用 nice 命令启动，没有 nice 时
+    启动后再用 setpriority 降低。不用 preexec_fn: 多线程进程 fork 后在 exec 之前
+    执行 Python 代码可能死锁
+    """
+    if os.name == 'nt':
+        kwargs.setdefault('creationflags', getattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS', 0))
+        return subprocess.Popen(cmd, **kwargs)
+    nice = shutil.which('nice')
+    if nice:
+        return subprocess.Popen([nice, '-n', str(LOW_PRIORITY_NICE)] + list(cmd), **kwargs)
+    process = subprocess.Popen(cmd, **kwargs)
+    try:
+        os.setpriority(os.PRIO_PROCESS, process.pid, LOW_PRIORITY_NICE)
+    except OSError:
+        pass
+    return process
+
+
+class TranscodeCache:
+    """播放用的转码文件缓存"""
+
+    def __init__(self, cache_dir: str = "", max_bytes: int = DEFAULT_MAX_BYTES):
+        if not cache_dir:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".multi_track_player", "transcode_cache")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[str] = set()
+        self._failed: Set[str] = set()  # 转码失败的文件，本次运行不再重试
+        self._lock = threading.Lock()
+        self._ffmpeg: Optional[str] = None
+
+    def _find_ffmpeg(self) -> str:
+        if self._ffmpeg is None:
+            from .msst import AudioCompressor
+            self._ffmpeg = AudioCompressor.find_ffmpeg()
+        return self._ffmpeg
+
+    @staticmethod
+    def _target_ext() -> str:
+        """转码目标格式：后端偏好的压缩格式，不能直接解码时用 WAV"""
+        backend = get_output_backend()
+        ext = "." + backend.preferred_stem_format
+        return ext if ext in backend.native_formats else ".wav"
+
+    def _cache_path(self, file_path: str) -> Optional[str]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        key = hashlib.blake2b(
+            f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key + self._target_ext())
+
+    def needs_transcode(self, file_path: str) -> bool:
+        """输出后端不能直接解码该文件"""
+        return os.path.splitext(file_path)[1].lower() not in get_output_backend().native_formats
+
+    def resolve(self, file_path: str) -> str:
+        """
+        返回实际用于播放的文件路径
+
+        已有转码缓存时返回缓存文件；否则返回原文件，并在后台安排转码供下次使用
+        """
+        if not self.enabled or not self.needs_transcode(file_path):
+            return file_path
+        cache_path = self._cache_path(file_path)
+        if cache_path and os.path.exists(cache_path):
+            try:
+                os.utime(cache_path, None)  # 记录最近使用时间
+            except OSError:
+                pass
+            return cache_path
+        if cache_path:
+            self.request(file_path)
+        return file_path
+
+    def request(self, file_path: str):
+        """在后台转码 (已在排队或没有 FFmpeg 时忽略)"""
+        if not self._find_ffmpeg():
+            return
+        with self._lock:
+            if file_path in self._pending or file_path in self._failed:
+                return
+            self._pending.add(file_path)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcode")
+            self._executor.submit(self._transcode, file_path)
+
+    def _transcode(self, file_path: str):
+        try:
+            cache_path = self._cache_path(file_path)
+            if not cache_path or os.path.exists(cache_path):
+                return
+            os.makedirs(self.cache_dir, exist_ok=True)
+            target_ext = self._target_ext()
+            temp_path = cache_path + ".temp" + target_ext
+            if target_ext == '.wav':
+                codec = ['-c:a', 'pcm_s16le']
+            else:
+                codec = ['-c:a', 'libvorbis', '-q:a', VORBIS_QUALITY]
+            cmd = ([self._find_ffmpeg(), '-y', '-loglevel', 'error', '-threads', '1',
+                    '-i', file_path, '-vn'] + codec + [temp_path])
+            with get_tracer().span("transcode"):
+                process = popen_low_priority(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                returncode = process.wait()
+            if returncode != 0 or not os.path.exists(temp_path):
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                print(f"[转码缓存] 转码失败: {os.path.basename(file_path)}")
+                with self._lock:
+                    self._failed.add(file_path)
+                return
+            os.replace(temp_path, cache_path)
+            log_debug("转码缓存", f"已缓存: {os.path.basename(file_path)}")
+            self._evict()
+        except Exception as e:
+            print(f"[转码缓存] 转码出错 {os.path.basename(file_path)}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(file_path)
+
+    def _evict(self):
+        """超过大小上限时删除最久未使用的缓存文件"""
+        try:
+            entries = []
+            total = 0
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and '.temp' not in entry.name:
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+            if total <= self.max_bytes:
+                return
+            for _, size, path in sorted(entries):
+                os.remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        except OSError as e:
+            print(f"[转码缓存] 清理失败: {e}")
+
+    def clear(self):
+        """删除所有缓存文件"""
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_global_transcode_cache: Optional[TranscodeCache] = None
+_transcode_lock = threading.Lock()
+
+
+def get_transcode_cache() -> TranscodeCache:
+    """获取全局转码缓存"""
+    global _global_transcode_cache
+    if _global_transcode_cache is None:
+        with _transcode_lock:
+            if _global_transcode_cache is None:
+                _global_transcode_cache = TranscodeCache()
+    return _global_transcode_cache
@@ -0,0 +1,219 @@
+"""
+歌曲转换 (上一首 -> 下一首) 反馈记录
+
+旧的 transitions.json 以 "来源路径->目标路径" 为键，每条记录重复保存两个完整路径，
+条目数随歌曲数平方增长，每次更新都整体重写。TransitionStore 改用 SQLite (WAL)：
+- songs 表把路径映射为整数 ID，路径只保存一次
+- transitions 表以 (来源ID, 目标ID) 为主键 (WITHOUT ROWID，同一来源的行连续存放)，
+  保存好/一般/差三种反馈的计数和更新时间
+- 每次反馈只更新一行；计数按半衰期随时间衰减，读取时再按经过的时间折算
+- transitions_from() 只读取某一首歌曲作为来源的行
+
+首次打开时自动导入旧的 transitions.json (旧文件保留不动)
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional, Dict, Tuple
+
+SCHEMA_VERSION = 1
+# 计数的半衰期 (天)
+DEFAULT_HALF_LIFE_DAYS = 30.0
+
+GOOD = 'good'
+NEUTRAL = 'neutral'
+BAD = 'bad'
+
+# 播放行为 -> 反馈类型 (包括旧 history.json 中的行为名)
+ACTION_OUTCOMES = {
+    'complete': GOOD,
+    'end': GOOD,
+    'half': NEUTRAL,
+    'skip_mid': NEUTRAL,
+    'skip_late': NEUTRAL,
+    'skip': BAD,
+    'skip_early': BAD,
+}
+
+
+def default_data_dir() -> str:
+    """推荐系统数据目录 (与个人推荐系统相同: user_data/recommender)"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'user_data', 'recommender')
+
+
+class TransitionStore:
+    """
+    歌曲转换反馈的稀疏矩阵
+
+    线程安全；所有写入都是单行的插入或更新，不会重写整个文件
+    """
+
+    def __init__(self, db_path: str = "", half_life_days: float = DEFAULT_HALF_LIFE_DAYS):
+        data_dir = os.path.dirname(db_path) if db_path else default_data_dir()
+        os.makedirs(data_dir, exist_ok=True)
+        self.db_path = db_path or os.path.join(data_dir, "transitions.db")
+        self.half_life = half_life_days * 86400.0
+        self._lock = threading.Lock()
+        self._ids: Dict[str, int] = {}  # 路径 -> 歌曲 ID
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        legacy_file = os.path.join(data_dir, "transitions.json")
+        if self._get_meta('legacy_imported') is None and os.path.exists(legacy_file):
+            self.import_legacy(legacy_file)
+
+    def _init_schema(self):
+        with self._conn:
+            self._conn.executescript("""
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                CREATE TABLE IF NOT EXISTS songs (id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE);
+                CREATE TABLE IF NOT EXISTS transitions (
+                    from_id INTEGER NOT NULL,
+                    to_id INTEGER NOT NULL,
+                    good REAL NOT NULL DEFAULT 0,
+                    neutral REAL NOT NULL DEFAULT 0,
+                    bad REAL NOT NULL DEFAULT 0,
+                    updated REAL NOT NULL,
+                    PRIMARY KEY (from_id, to_id)
+                ) WITHOUT ROWID;
+            """)
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ---------------- 歌曲 ID ----------------
+
+    def song_id(self, path: str, create: bool = False) -> Optional[int]:
+        """获取歌曲的整数 ID，create 为 True 时不存在则分配"""
+        with self._lock, self._conn:
+            return self._song_id(path, create)
+
+    def _song_id(self, path: str, create: bool) -> Optional[int]:
+        song_id = self._ids.get(path)
+        if song_id is not None:
+            return song_id
+        row = self._conn.execute("SELECT id FROM songs WHERE path = ?", (path,)).fetchone()
+        if row is None:
+            if not create:
+                return None
+            song_id = self._conn.execute("INSERT INTO songs (path) VALUES (?)", (path,)).lastrowid
+        else:
+            song_id = row[0]
+        self._ids[path] = song_id
+        return song_id
+
+    # ---------------- 衰减 ----------------
+
+    def _decay(self, elapsed: float) -> float:
+        if self.half_life <= 0 or elapsed <= 0:
+            return 1.0
+        return 0.5 ** (elapsed / self.half_life)
+
+    # ---------------- 写入 ----------------
+
+    def record(self, from_path: str, to_path: str, outcome: str, timestamp: Optional[float] = None):
+        """
+        记录一次转换反馈
+
+        Args:
+            outcome: GOOD / NEUTRAL / BAD，或 ACTION_OUTCOMES 中的播放行为名
+        """
+        outcome = ACTION_OUTCOMES.get(outcome, outcome)
+        if not from_path or not to_path or from_path == to_path or outcome not in (GOOD, NEUTRAL, BAD):
+            return
+        now = time.time() if timestamp is None else timestamp
+        with self._lock, self._conn:
+            from_id = self._song_id(from_path, True)
+            to_id = self._song_id(to_path, True)
+            row = self._conn.execute(
+                "SELECT good, neutral, bad, updated FROM transitions WHERE from_id = ? AND to_id = ?",
+                (from_id, to_id)).fetchone()
+            counts = {GOOD: 0.0, NEUTRAL: 0.0, BAD: 0.0}
+            if row is not None:
+                factor = self._decay(now - row[3])
+                counts = {GOOD: row[0] * factor, NEUTRAL: row[1] * factor, BAD: row[2] * factor}
+            counts[outcome] += 1.0
+            self._conn.execute(
+                "INSERT OR REPLACE INTO transitions VALUES (?, ?, ?, ?, ?, ?)",
+                (from_id, to_id, counts[GOOD], counts[NEUTRAL], counts[BAD], now))
+
+    def import_legacy(self, json_file: str) -> int:
+        """导入旧的 transitions.json，返回导入的条数"""
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[转换记录] 读取旧数据失败: {e}")
+            return 0
+        imported = 0
+        with self._lock, self._conn:
+            for entry in data.values():
+                from_path = entry.get('from_song')
+                to_path = entry.get('to_song')
+                if not from_path or not to_path:
+                    continue
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO transitions VALUES (?, ?, ?, ?, ?, ?)",
+                    (self._song_id(from_path, True), self._song_id(to_path, True),
+                     float(entry.get('good_count', 0)), float(entry.get('neutral_count', 0)),
+                     float(entry.get('bad_count', 0)), float(entry.get('last_update', time.time()))))
+                imported += 1
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('legacy_imported', ?)", (str(imported),))
+        print(f"[转换记录] 已导入旧数据 {imported} 条")
+        return imported
+
+    # ---------------- 读取 ----------------
+
+    def transitions_from(self, from_path: str, now: Optional[float] = None) -> Dict[str, Tuple[float, float, float]]:
+        """
+        读取以某首歌曲为来源的所有转换
+
+        Returns:
+            目标路径 -> (好, 一般, 差) 的衰减后计数
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            from_id = self._song_id(from_path, False)
+            if from_id is None:
+                return {}
+            rows = self._conn.execute(
+                "SELECT s.path, t.good, t.neutral, t.bad, t.updated FROM transitions t "
+                "JOIN songs s ON s.id = t.to_id WHERE t.from_id = ?", (from_id,)).fetchall()
+        result = {}
+        for path, good, neutral, bad, updated in rows:
+            factor = self._decay(now - updated)
+            result[path] = (good * factor, neutral * factor, bad * factor)
+        return result
+
+    def scores_from(self, from_path: str) -> Dict[str, float]:
+        """以某首歌曲为来源的转换评分 (-1 ~ 1，好的反馈越多越高；计数少时趋近 0)"""
+        return {path: (good - bad) / (good + neutral + bad + 1.0)
+                for path, (good, neutral, bad) in self.transitions_from(from_path).items()}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM transitions").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_global_store: Optional[TransitionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_transition_store() -> TransitionStore:
+    """获取全局转换记录"""
+    global _global_store
+    if _global_store is None:
+        with _store_lock:
+            if _global_store is None:
+                _global_store = TransitionStore()
+    return _global_store
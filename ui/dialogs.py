@@ -9,8 +9,12 @@ from PyQt6.QtWidgets import (
     QWidget, QFileDialog, QCheckBox, QMessageBox, QTableWidget,
     QTableWidgetItem, QHeaderView
 )
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 from PyQt6.QtGui import QFont
 
+from core.perf import get_tracer, get_log_level, set_log_level, LEVEL_NAMES
+from core.audio_output import get_output_backend, DEFAULT_SAMPLE_RATE
+
 
 class SettingsDialog(QDialog):
     """基本设置对话框"""
@@ -19,7 +23,7 @@ class SettingsDialog(QDialog):
         super().__init__(parent)
         self.config = config.copy()
         self.setWindowTitle("设置")
-        self.setFixedSize(600, 400)
+        self.setFixedSize(600, 480)
         self.setup_ui()
         
     def setup_ui(self):
@@ -49,6 +53,7 @@ class SettingsDialog(QDialog):
             }
             QTabBar::tab:selected { background: #3a3a4a; color: #ffffff; }
             QSpinBox, QCheckBox { color: #e0e0e0; }
+            QComboBox { background: #2a2a3a; border: 2px solid #3a3a4a; border-radius: 8px; padding: 6px; color: #e0e0e0; }
         """)
         
         layout = QVBoxLayout(self)
@@ -98,8 +103,42 @@ class SettingsDialog(QDialog):
         stems_layout.addWidget(browse_stems)
         layout.addWidget(stems_group)
         
+        audio_group = QGroupBox("音频输出 (多音轨模式)")
+        audio_layout = QHBoxLayout(audio_group)
+        audio_layout.addWidget(QLabel("采样率:"))
+        self.sample_rate_combo = QComboBox()
+        for label, rate in [("跟随音源", 0), ("44100 Hz", 44100), ("48000 Hz", 48000)]:
+            self.sample_rate_combo.addItem(label, rate)
+        rate_index = self.sample_rate_combo.findData(self.config.get('audio_sample_rate', 0))
+        self.sample_rate_combo.setCurrentIndex(max(0, rate_index))
+        self.sample_rate_combo.setToolTip("跟随音源: 按分离音轨的采样率打开设备，避免重采样")
+        self.sample_rate_combo.currentIndexChanged.connect(self._update_buffer_size_labels)
+        audio_layout.addWidget(self.sample_rate_combo)
+        audio_layout.addSpacing(20)
+        audio_layout.addWidget(QLabel("缓冲区:"))
+        self.buffer_size_combo = QComboBox()
+        for size in [256, 512, 1024, 2048, 4096]:
+            self.buffer_size_combo.addItem(str(size), size)
+        buffer_index = self.buffer_size_combo.findData(self.config.get('audio_buffer_size', 2048))
+        self.buffer_size_combo.setCurrentIndex(max(0, buffer_index))
+        self._update_buffer_size_labels()
+        self.buffer_size_combo.setToolTip("缓冲区越小延迟越低，但过小可能出现爆音")
+        audio_layout.addWidget(self.buffer_size_combo)
+        audio_layout.addStretch()
+        layout.addWidget(audio_group)
+        
         layout.addStretch()
         return widget
+    
+    def _update_buffer_size_labels(self):
+        """按所选采样率 (跟随音源时用设备当前的采样率) 显示每种缓冲区大小的延迟"""
+        rate = self.sample_rate_combo.currentData()
+        if not rate:
+            opened = get_output_backend().get_opened_config()
+            rate = opened.sample_rate if opened else DEFAULT_SAMPLE_RATE
+        for i in range(self.buffer_size_combo.count()):
+            size = self.buffer_size_combo.itemData(i)
+            self.buffer_size_combo.setItemText(i, f"{size} ({size / rate * 1000:.0f}ms)")
         
     def _create_api_tab(self) -> QWidget:
         widget = QWidget()
@@ -139,6 +178,18 @@ class SettingsDialog(QDialog):
         pool_note.setStyleSheet("color: #808080; font-size: 11px;")
         rec_settings_layout.addWidget(pool_note)
         
+        self.rec_embedding_check = QCheckBox("推荐接口使用相似度推荐 (需要 NumPy)")
+        self.rec_embedding_check.setChecked(self.config.get('embedding_recommender_enabled', True))
+        self.rec_embedding_check.setToolTip("按歌曲特征向量推荐相似歌曲；还没有向量的歌曲会请求外部推荐服务")
+        rec_settings_layout.addWidget(self.rec_embedding_check)
+        
+        service_layout = QHBoxLayout()
+        service_layout.addWidget(QLabel("外部推荐服务:"))
+        self.rec_service_edit = QLineEdit(self.config.get('recommender_service_url', 'http://127.0.0.1:8000'))
+        self.rec_service_edit.setStyleSheet("background: #2a2a3a; border: 2px solid #3a3a4a; border-radius: 8px; padding: 8px;")
+        service_layout.addWidget(self.rec_service_edit)
+        rec_settings_layout.addLayout(service_layout)
+        
         layout.addWidget(rec_settings_group)
         
         # 音源说明
@@ -170,6 +221,10 @@ class SettingsDialog(QDialog):
         self.config['recommendation_port'] = self.rec_port_spin.value()
         self.config['recommendation_enabled'] = self.rec_enabled.isChecked()
         self.config['recommendation_pool_size'] = self.rec_pool_spin.value()
+        self.config['embedding_recommender_enabled'] = self.rec_embedding_check.isChecked()
+        self.config['recommender_service_url'] = self.rec_service_edit.text().strip()
+        self.config['audio_sample_rate'] = self.sample_rate_combo.currentData()
+        self.config['audio_buffer_size'] = self.buffer_size_combo.currentData()
         return self.config
 
 
@@ -292,6 +347,23 @@ class MSSTDialog(QDialog):
         format_layout.addStretch()
         layout.addWidget(format_group)
         
+        # 常驻分离进程
+        self.persistent_worker_check = QCheckBox("使用常驻分离进程 (模型只加载一次，批量分离更快)")
+        self.persistent_worker_check.setChecked(self.config.get('msst_persistent_worker', True))
+        self.persistent_worker_check.setToolTip("MSST版本不支持时会自动回退到每首歌启动一次分离脚本")
+        layout.addWidget(self.persistent_worker_check)
+        
+        # 批量分离
+        batch_layout = QHBoxLayout()
+        batch_layout.addWidget(QLabel("队列批量分离歌曲数:"))
+        self.msst_batch_spin = QSpinBox()
+        self.msst_batch_spin.setRange(1, 32)
+        self.msst_batch_spin.setValue(int(self.config.get('msst_batch_size', 4)))
+        self.msst_batch_spin.setToolTip("分离队列中的多首歌曲合并为一次推理，1 表示逐首分离")
+        batch_layout.addWidget(self.msst_batch_spin)
+        batch_layout.addStretch()
+        layout.addLayout(batch_layout)
+        
         # 压缩设置
         compress_group = QGroupBox("音轨压缩设置 (分离后自动压缩)")
         compress_layout = QVBoxLayout(compress_group)
@@ -306,9 +378,10 @@ class MSSTDialog(QDialog):
         # 压缩格式
         compress_options_layout.addWidget(QLabel("压缩格式:"))
         self.compress_format_combo = QComboBox()
-        self.compress_format_combo.addItems(["m4a", "ogg", "opus", "mp3"])
-        self.compress_format_combo.setCurrentText(self.config.get('compress_format', 'm4a'))
-        self.compress_format_combo.setToolTip("m4a: 兼容性最好\nogg: 开源格式\nopus: 压缩效率最高\nmp3: 通用格式")
+        self.compress_format_combo.addItems(["auto", "m4a", "ogg", "opus", "mp3"])
+        self.compress_format_combo.setCurrentText(self.config.get('compress_format', 'auto'))
+        self.compress_format_combo.setToolTip("auto: 按播放引擎选择 (pygame 为 ogg，可直接解码，加载最快)\n"
+                                              "m4a: 兼容性最好\nogg: 开源格式\nopus: 压缩效率最高\nmp3: 通用格式")
         compress_options_layout.addWidget(self.compress_format_combo)
         
         compress_options_layout.addSpacing(20)
@@ -324,6 +397,27 @@ class MSSTDialog(QDialog):
         compress_options_layout.addStretch()
         compress_layout.addLayout(compress_options_layout)
         
+        parallel_layout = QHBoxLayout()
+        
+        # 并行压缩
+        parallel_layout.addWidget(QLabel("并行压缩数:"))
+        self.compress_workers_spin = QSpinBox()
+        self.compress_workers_spin.setRange(0, 32)
+        self.compress_workers_spin.setSpecialValueText("自动")
+        self.compress_workers_spin.setValue(int(self.config.get('compress_workers', 0)))
+        self.compress_workers_spin.setToolTip("同时运行的FFmpeg进程数，自动 = CPU核心数")
+        parallel_layout.addWidget(self.compress_workers_spin)
+        
+        parallel_layout.addSpacing(20)
+        
+        self.compress_single_pass_check = QCheckBox("单个FFmpeg进程压缩全部音轨")
+        self.compress_single_pass_check.setChecked(self.config.get('compress_single_pass', False))
+        self.compress_single_pass_check.setToolTip("只启动一次FFmpeg，多路输出；音轨较短时更快")
+        parallel_layout.addWidget(self.compress_single_pass_check)
+        
+        parallel_layout.addStretch()
+        compress_layout.addLayout(parallel_layout)
+        
         compress_note = QLabel("💡 压缩需要安装FFmpeg。WAV/FLAC文件将被压缩，原始文件会被删除。")
         compress_note.setStyleSheet("color: #808080; font-size: 11px;")
         compress_layout.addWidget(compress_note)
@@ -435,9 +529,13 @@ class MSSTDialog(QDialog):
             'config_path': self.config_path_edit.text(),
             'model_path': self.model_path_edit.text(),
             'output_format': self.format_combo.currentText(),
+            'msst_persistent_worker': self.persistent_worker_check.isChecked(),
+            'msst_batch_size': self.msst_batch_spin.value(),
             'compress_stems': self.compress_enabled.isChecked(),
             'compress_format': self.compress_format_combo.currentText(),
-            'compress_bitrate': self.compress_bitrate_combo.currentText()
+            'compress_bitrate': self.compress_bitrate_combo.currentText(),
+            'compress_workers': self.compress_workers_spin.value(),
+            'compress_single_pass': self.compress_single_pass_check.isChecked()
         }
 
 
@@ -867,15 +965,24 @@ class SourceAPIConfigDialog(QDialog):
 class RecommenderDebugDialog(QDialog):
     """推荐系统调试对话框"""
     
-    def __init__(self, recommender, settings, parent=None):
+    def __init__(self, recommender, settings, parent=None, history=None, worker=None):
         super().__init__(parent)
         self.recommender = recommender
         self.settings = settings
+        self.history = history  # ListeningHistory: 播放次数、跳过率等汇总
+        self.worker = worker  # RecommenderWorker: 推荐系统只在它的线程中被调用
         self.setWindowTitle("🧠 推荐系统调试")
         self.setMinimumSize(800, 700)
         self.setup_ui()
         self.refresh_data()
         
+    def _call(self, method: str, *args):
+        """调用推荐系统的方法 (有后台线程时排队到该线程执行并等待结果)"""
+        fn = getattr(self.recommender, method)
+        if self.worker is None:
+            return fn(*args)
+        return self.worker.call(f"recommender.{method}", fn, *args)
+        
     def setup_ui(self):
         self.setStyleSheet("""
             QDialog { background: #1a1a24; }
@@ -1003,13 +1110,13 @@ class RecommenderDebugDialog(QDialog):
         
         # 歌曲偏好表格
         self.songs_table = QTableWidget()
-        self.songs_table.setColumnCount(7)
+        self.songs_table.setColumnCount(9)
         self.songs_table.setHorizontalHeaderLabels([
-            "歌曲名称", "艺术家", "学习状态", "偏好分数", "置信度", "播放次数", "完成次数"
+            "歌曲名称", "艺术家", "学习状态", "偏好分数", "置信度", "播放次数", "完成次数", "跳过率", "最近播放"
         ])
         self.songs_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         self.songs_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.ResizeToContents)
-        for i in range(2, 7):
+        for i in range(2, 9):
             self.songs_table.horizontalHeader().setSectionResizeMode(i, QHeaderView.ResizeMode.ResizeToContents)
         layout.addWidget(self.songs_table)
         
@@ -1196,9 +1303,9 @@ class RecommenderDebugDialog(QDialog):
     def _refresh_training_songs(self):
         """刷新训练用歌曲列表"""
         self.training_song_list.clear()
-        if self.recommender:
+        if self.recommender or self.history is not None:
             try:
-                stats = self.recommender.get_statistics()
+                stats = self._get_statistics()
                 all_songs = stats.get('all_songs', [])
                 
                 for song in all_songs:
@@ -1300,8 +1407,8 @@ class RecommenderDebugDialog(QDialog):
                 action_emoji = "❤️"
                 self._like_count += 1
             
-            self.recommender.on_song_start(song_data)
-            self.recommender.on_song_end(song_data, played_seconds, reason)
+            self._call('on_song_start', song_data)
+            self._call('on_song_end', song_data, played_seconds, reason)
             
             self._training_count += 1
             
@@ -1311,7 +1418,7 @@ class RecommenderDebugDialog(QDialog):
             self._update_training_stats()
             
             if self.auto_save_check.isChecked() and self._training_count % 10 == 0:
-                self.recommender.save()
+                self._call('save')
                 self._add_training_log("INFO", "💾 自动保存")
             
             self.refresh_data()
@@ -1428,7 +1535,7 @@ class RecommenderDebugDialog(QDialog):
         try:
             # 检查推荐系统是否有日志历史方法
             if hasattr(self.recommender, 'get_log_history'):
-                logs = self.recommender.get_log_history()
+                logs = self._call('get_log_history')
                 if logs:
                     self.log_text.clear()
                     for log in logs:
@@ -1447,12 +1554,12 @@ class RecommenderDebugDialog(QDialog):
         
     def refresh_data(self):
         """刷新所有数据显示"""
-        if not self.recommender:
+        if not self.recommender and self.history is None:
             self.stats_text.setText("⚠️ 推荐系统未初始化")
             return
             
         try:
-            stats = self.recommender.get_statistics()
+            stats = self._get_statistics()
             
             # 更新探索率显示
             exploration = stats.get('exploration_rate', 0.15)
@@ -1550,6 +1657,7 @@ class RecommenderDebugDialog(QDialog):
             
     def _update_songs_table(self, stats: dict):
         """更新歌曲偏好表格"""
+        from datetime import datetime
         all_songs = stats.get('all_songs', [])
         self.songs_table.setRowCount(len(all_songs))
         
@@ -1577,6 +1685,33 @@ class RecommenderDebugDialog(QDialog):
             self.songs_table.setItem(row, 5, QTableWidgetItem(str(song.get('play_count', 0))))
             # 完成次数
             self.songs_table.setItem(row, 6, QTableWidgetItem(str(song.get('complete_count', 0))))
+            # 跳过率
+            self.songs_table.setItem(row, 7, QTableWidgetItem(f"{song.get('skip_ratio', 0):.0%}"))
+            # 最近播放
+            last_played = song.get('last_played', 0)
+            last_text = datetime.fromtimestamp(last_played).strftime("%Y-%m-%d %H:%M") if last_played else "-"
+            self.songs_table.setItem(row, 8, QTableWidgetItem(last_text))
+            
+    def _get_statistics(self) -> dict:
+        """推荐系统的统计信息，播放次数、跳过率等取自播放历史的汇总 (不回放原始历史)"""
+        stats = self._call('get_statistics') if self.recommender else {}
+        if self.history is None:
+            return stats
+        aggregates = self.history.all_stats()
+        songs = stats.get('all_songs') or [{'path': path} for path in aggregates]
+        stats['all_songs'] = songs
+        for song in songs:
+            song_stats = aggregates.get(song.get('path', ''))
+            if song_stats is None:
+                continue
+            song['play_count'] = song_stats.play_count
+            song['complete_count'] = song_stats.complete_count
+            song['skip_ratio'] = song_stats.skip_ratio
+            song['last_played'] = song_stats.last_played
+        stats['total_plays'] = self.history.total_events
+        stats['history_events'] = self.history.total_events
+        stats.setdefault('total_songs', len(songs))
+        return stats
             
     def _on_learning_toggle(self, state):
         """切换学习开关"""
@@ -1587,9 +1722,11 @@ class RecommenderDebugDialog(QDialog):
         
     def _save_data(self):
         """保存推荐数据"""
+        if self.history is not None:
+            self.history.compact()
         if self.recommender:
             try:
-                self.recommender.save()
+                self._call('save')
                 self._add_log("INFO", "推荐数据已保存")
                 QMessageBox.information(self, "保存成功", "推荐学习数据已保存")
             except Exception as e:
@@ -1605,9 +1742,17 @@ class RecommenderDebugDialog(QDialog):
         )
         
         if reply == QMessageBox.StandardButton.Yes:
+            if self.history is not None:
+                try:
+                    self.history.reset()
+                    self._add_log("WARNING", "播放历史已重置")
+                except OSError as e:
+                    self._add_log("ERROR", f"重置播放历史失败: {str(e)}")
+                if not self.recommender:
+                    self.refresh_data()
             if self.recommender:
                 try:
-                    self.recommender.reset()
+                    self._call('reset')
                     self._add_log("WARNING", "学习数据已重置")
                     self.refresh_data()
                     QMessageBox.information(self, "重置成功", "学习数据已重置")
@@ -1645,3 +1790,265 @@ class RecommenderDebugDialog(QDialog):
     def add_external_log(self, level: str, message: str):
         """从外部添加日志（供主窗口调用）"""
         self._add_log(level, message)
+
+
+class PerformanceDialog(QDialog):
+    """性能追踪对话框 - 实时显示各 span 的滚动百分位，可导出"""
+    
+    COLUMNS = ["名称", "次数", "最近(ms)", "平均(ms)", "P50(ms)", "P90(ms)", "P99(ms)", "最大(ms)", "错误"]
+    KEYS = ['count', 'last_ms', 'mean_ms', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'errors']
+    
+    def __init__(self, settings, lock_stats_provider=None, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.lock_stats_provider = lock_stats_provider
+        self.setWindowTitle("⏱️ 性能追踪")
+        self.setMinimumSize(820, 520)
+        self.setup_ui()
+        
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(1000)
+        self._refresh_timer.timeout.connect(self.refresh_data)
+        self._refresh_timer.start()
+        self.refresh_data()
+        
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QDialog { background: #1a1a24; }
+            QLabel { color: #e0e0e0; }
+            QPushButton { background: #7c5ce0; color: white; border: none; border-radius: 8px; padding: 8px 16px; }
+            QPushButton:hover { background: #9c7cf0; }
+            QComboBox { background: #2a2a3a; border: 1px solid #3a3a4a; border-radius: 6px; padding: 6px; color: #e0e0e0; }
+            QTableWidget { background: #1a1a24; color: #e0e0e0; border: 1px solid #3a3a4a; gridline-color: #2a2a3a; }
+            QHeaderView::section { background: #2a2a3a; color: #a0a0a0; padding: 6px; border: none; }
+        """)
+        layout = QVBoxLayout(self)
+        
+        top = QHBoxLayout()
+        top.addWidget(QLabel("日志级别:"))
+        self.level_combo = QComboBox()
+        self.level_combo.addItems(["debug", "info", "warning", "error"])
+        current = {v: k for k, v in LEVEL_NAMES.items()}.get(get_log_level(), "info")
+        self.level_combo.setCurrentText(current)
+        self.level_combo.currentTextChanged.connect(self._on_level_changed)
+        top.addWidget(self.level_combo)
+        top.addStretch()
+        
+        reset_btn = QPushButton("重置")
+        reset_btn.clicked.connect(self._reset)
+        top.addWidget(reset_btn)
+        export_btn = QPushButton("导出...")
+        export_btn.clicked.connect(self._export)
+        top.addWidget(export_btn)
+        layout.addLayout(top)
+        
+        self.span_table = QTableWidget(0, len(self.COLUMNS))
+        self.span_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.span_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.span_table.verticalHeader().setVisible(False)
+        self.span_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.span_table, 3)
+        
+        layout.addWidget(QLabel("混音引擎锁等待:"))
+        self.lock_table = QTableWidget(0, 5)
+        self.lock_table.setHorizontalHeaderLabels(["方法", "获取次数", "等待次数", "总等待(ms)", "最大等待(ms)"])
+        self.lock_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.lock_table.verticalHeader().setVisible(False)
+        self.lock_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.lock_table, 1)
+        
+    def refresh_data(self):
+        stats = get_tracer().get_stats()
+        self.span_table.setRowCount(len(stats))
+        for row, (name, summary) in enumerate(stats.items()):
+            self.span_table.setItem(row, 0, QTableWidgetItem(name))
+            for col, key in enumerate(self.KEYS, start=1):
+                value = summary.get(key, 0)
+                text = f"{value:.1f}" if isinstance(value, float) else str(value)
+                self.span_table.setItem(row, col, QTableWidgetItem(text))
+        
+        lock_stats = self.lock_stats_provider() if self.lock_stats_provider else {}
+        self.lock_table.setRowCount(len(lock_stats))
+        for row, (method, item) in enumerate(sorted(lock_stats.items())):
+            values = [method, str(item.get('acquisitions', 0)), str(item.get('contended', 0)),
+                      f"{item.get('total_wait_ms', 0):.1f}", f"{item.get('max_wait_ms', 0):.1f}"]
+            for col, text in enumerate(values):
+                self.lock_table.setItem(row, col, QTableWidgetItem(text))
+        
+    def _on_level_changed(self, level: str):
+        set_log_level(level)
+        self.settings.setValue("log_level", level)
+        
+    def _reset(self):
+        get_tracer().reset()
+        self.refresh_data()
+        
+    def _export(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "导出性能数据", "trace_stats.json", "JSON文件 (*.json)")
+        if not file_path:
+            return
+        if get_tracer().export(file_path):
+            QMessageBox.information(self, "导出成功", f"已导出到: {file_path}")
+        else:
+            QMessageBox.warning(self, "导出失败", "无法写入文件")
+            
+    def closeEvent(self, event):
+        self._refresh_timer.stop()
+        super().closeEvent(event)
+
+
+class SeparationQueueDialog(QDialog):
+    """分离队列对话框 - 查看任务进度/ETA，批量加入、取消、重试"""
+    
+    enqueue_all_requested = pyqtSignal()
+    concurrency_changed = pyqtSignal(int)
+    
+    STATUS_TEXT = {
+        "pending": "⏳ 等待",
+        "running": "✂️ 分离中",
+        "done": "✅ 完成",
+        "failed": "❌ 失败",
+        "cancelled": "⛔ 已取消",
+    }
+    
+    def __init__(self, queue, parent=None):
+        super().__init__(parent)
+        self.queue = queue
+        self.setWindowTitle("📋 分离队列")
+        self.setMinimumSize(860, 520)
+        self.setup_ui()
+        
+        self.queue.job_added.connect(self._on_job_changed)
+        self.queue.job_updated.connect(self._on_job_changed)
+        # 任务变化只标记需要刷新，由定时器统一重绘 (批量加入歌曲时不逐首重建表格)
+        self._dirty = False
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setInterval(1000)
+        self._refresh_timer.timeout.connect(self._on_refresh_timer)
+        self._refresh_timer.start()
+        self.refresh_data()
+        
+    def setup_ui(self):
+        self.setStyleSheet("""
+            QDialog { background: #1a1a24; }
+            QLabel { color: #e0e0e0; }
+            QPushButton { background: #7c5ce0; color: white; border: none; border-radius: 8px; padding: 8px 16px; }
+            QPushButton:hover { background: #9c7cf0; }
+            QPushButton#secondaryBtn { background: #4a4a5e; }
+            QSpinBox { background: #2a2a3a; border: 1px solid #3a3a4a; border-radius: 6px; padding: 6px; color: #e0e0e0; }
+            QTableWidget { background: #1a1a24; color: #e0e0e0; border: 1px solid #3a3a4a; gridline-color: #2a2a3a; }
+            QTableWidget::item:selected { background: #7c5ce0; }
+            QHeaderView::section { background: #2a2a3a; color: #a0a0a0; padding: 6px; border: none; }
+        """)
+        layout = QVBoxLayout(self)
+        
+        top = QHBoxLayout()
+        add_all_btn = QPushButton("➕ 加入所有未分离歌曲")
+        add_all_btn.clicked.connect(self.enqueue_all_requested.emit)
+        top.addWidget(add_all_btn)
+        top.addStretch()
+        top.addWidget(QLabel("同时分离:"))
+        self.concurrency_spin = QSpinBox()
+        self.concurrency_spin.setRange(1, 4)
+        self.concurrency_spin.setValue(self.queue.max_concurrent)
+        self.concurrency_spin.setToolTip("同时运行的分离任务数\nGPU显存或内存不足时请保持为1\n"
+                                         "使用常驻分离进程时推理仍依次进行，只有暂存和压缩等步骤并行")
+        self.concurrency_spin.valueChanged.connect(self.concurrency_changed.emit)
+        top.addWidget(self.concurrency_spin)
+        layout.addLayout(top)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        self.job_table = QTableWidget(0, 5)
+        self.job_table.setHorizontalHeaderLabels(["歌曲", "状态", "进度", "剩余时间", "信息"])
+        self.job_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.job_table.horizontalHeader().setSectionResizeMode(4, QHeaderView.ResizeMode.Stretch)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self.job_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.job_table)
+        
+        buttons = QHBoxLayout()
+        self.pause_btn = QPushButton()
+        self.pause_btn.setObjectName("secondaryBtn")
+        self.pause_btn.clicked.connect(self._toggle_pause)
+        buttons.addWidget(self.pause_btn)
+        cancel_btn = QPushButton("取消选中")
+        cancel_btn.setObjectName("secondaryBtn")
+        cancel_btn.clicked.connect(self._cancel_selected)
+        buttons.addWidget(cancel_btn)
+        retry_btn = QPushButton("重试失败")
+        retry_btn.setObjectName("secondaryBtn")
+        retry_btn.clicked.connect(self.queue.retry_failed)
+        buttons.addWidget(retry_btn)
+        clear_btn = QPushButton("清除已结束")
+        clear_btn.setObjectName("secondaryBtn")
+        clear_btn.clicked.connect(self._clear_finished)
+        buttons.addWidget(clear_btn)
+        buttons.addStretch()
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.accept)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+        
+    @staticmethod
+    def _format_eta(seconds) -> str:
+        if seconds is None:
+            return ""
+        seconds = int(seconds)
+        if seconds >= 3600:
+            return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        return f"{seconds // 60}:{seconds % 60:02d}"
+        
+    def refresh_data(self):
+        self._dirty = False
+        jobs = self.queue.get_jobs()
+        self.job_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            title_item = QTableWidgetItem(job.title)
+            title_item.setData(Qt.ItemDataRole.UserRole, job.job_id)
+            title_item.setToolTip(job.song_path)
+            self.job_table.setItem(row, 0, title_item)
+            self.job_table.setItem(row, 1, QTableWidgetItem(self.STATUS_TEXT.get(job.status, job.status)))
+            self.job_table.setItem(row, 2, QTableWidgetItem(f"{job.progress * 100:.0f}%"))
+            self.job_table.setItem(row, 3, QTableWidgetItem(self._format_eta(self.queue.job_eta(job))))
+            self.job_table.setItem(row, 4, QTableWidgetItem(job.message))
+        
+        self.summary_label.setText(
+            f"进行中 {self.queue.running_count()} 首，等待 {self.queue.pending_count()} 首，"
+            f"预计剩余 {self._format_eta(self.queue.queue_eta())}"
+        )
+        self.pause_btn.setText("▶️ 继续" if self.queue.is_paused() else "⏸ 暂停队列")
+        
+    def _on_job_changed(self, job):
+        self._dirty = True
+        
+    def _on_refresh_timer(self):
+        # 有任务在运行时剩余时间每秒变化，也需要刷新
+        if self._dirty or self.queue.running_count():
+            self.refresh_data()
+        
+    def _toggle_pause(self):
+        if self.queue.is_paused():
+            self.queue.resume()
+        else:
+            self.queue.pause()
+        self.refresh_data()
+        
+    def _cancel_selected(self):
+        for index in self.job_table.selectionModel().selectedRows():
+            item = self.job_table.item(index.row(), 0)
+            if item:
+                self.queue.cancel(item.data(Qt.ItemDataRole.UserRole))
+        self.refresh_data()
+        
+    def _clear_finished(self):
+        self.queue.clear_finished()
+        self.refresh_data()
+        
+    def done(self, result):
+        self._refresh_timer.stop()
+        self.queue.job_added.disconnect(self._on_job_changed)
+        self.queue.job_updated.disconnect(self._on_job_changed)
+        super().done(result)
@@ -5,6 +5,8 @@
 import os
 import sys
 import random
+import time
+from collections import deque
 from pathlib import Path
 from typing import Optional, List
 
@@ -29,11 +31,23 @@ from PyQt6.QtMultimedia import QMediaPlayer
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from core.models import SongInfo, SongScanner, VirtualSongListModel, SongCache, SUPPORTED_FORMATS
-from core.msst import MSSTSeparatorThread
+from core.models import SongInfo, SongScanner, VirtualSongListModel, SongCache, StemsStatusUpdater, SUPPORTED_FORMATS
+from core.msst import MSSTSeparatorThread, shutdown_persistent_worker
+from core.msst_queue import SeparationQueue, SeparationJob
+from core.stems_store import get_stems_store
 from core.recommendation_api import RecommendationAPIServer, DefaultRecommendationProvider
+from core.embedding_index import NUMPY_AVAILABLE
+from core.embedding_recommender import EmbeddingRecommendationProvider
+from core.embedding_indexer import EmbeddingIndexer
+from core.transition_store import get_transition_store
+from core.listening_history import get_listening_history
+from core.recommender_worker import RecommenderWorker
+from core.player_state import PlayerStateSnapshot, PlayerStateStore, PlayerCommandDispatcher
 from core.lxmusic_api import OnlineMusicClient, OnlineSong
 from core.custom_source import CustomSourceManager, SourceAPIProxy
+from core.audio_output import AudioOutputConfig, set_output_backend
+from core.transcode_cache import get_transcode_cache
+from core.perf import get_tracer, traced, set_log_level, log_debug, log_info
 
 # 预加载系统
 try:
@@ -43,9 +57,9 @@ except ImportError:
     PRELOADER_AVAILABLE = False
     print("[警告] 预加载模块未找到，使用基础模式")
 
-from ui.track_control import TrackControl, TrackControlPanel
+from ui.track_control import TrackControl, TrackControlPanel, get_mixer_engine
 from ui.lyrics_page import LyricsPage
-from ui.dialogs import SettingsDialog, MSSTDialog, OnlineSearchDialog, CustomSourceDialog, RecommenderDebugDialog
+from ui.dialogs import SettingsDialog, MSSTDialog, OnlineSearchDialog, CustomSourceDialog, RecommenderDebugDialog, PerformanceDialog, SeparationQueueDialog
 
 
 class ClickableSlider(QSlider):
@@ -111,7 +125,7 @@ class CollapsibleSongList(QFrame):
         self.song_table = QTableView()
         self.song_table.setModel(self.song_model)
         self.song_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
-        self.song_table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.song_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.song_table.setShowGrid(False)
         self.song_table.verticalHeader().setVisible(False)
         self.song_table.horizontalHeader().setStretchLastSection(True)
@@ -160,7 +174,13 @@ class MultiTrackPlayer(QMainWindow):
         super().__init__()
         self.settings = QSettings("MultiTrackPlayer", "Settings")
         self.config = self._load_config()
+        self._apply_audio_output_config()
+        if not os.environ.get('MTP_LOG_LEVEL'):
+            set_log_level(self.settings.value("log_level", "info"))
+        self._performance_dialog: Optional[PerformanceDialog] = None
         self.songs: List[SongInfo] = []
+        # 通过 API 加入的待播队列，优先于推荐和播放模式
+        self.play_queue: deque = deque()
         self.current_song: Optional[SongInfo] = None
         self.current_song_index = -1
         self.track_controls: List[TrackControl] = []
@@ -173,9 +193,33 @@ class MultiTrackPlayer(QMainWindow):
         self.current_page = "tracks"
         self.scanner: Optional[SongScanner] = None
         self.separator_thread: Optional[MSSTSeparatorThread] = None
+        # 分离任务队列 (持久化，重启后继续)
+        self.separation_queue = SeparationQueue(max_concurrent=self.config.get('msst_concurrency', 1))
+        self.separation_queue.set_config(self.config)
+        self.separation_queue.job_updated.connect(self._on_separation_job_updated)
+        self.separation_queue.job_finished.connect(self._on_separation_job_finished)
+        self._interactive_separation_path = ""
         self.lx_client = OnlineMusicClient()
         self.recommendation_server = RecommendationAPIServer(self.config.get('recommendation_port', 23331))
-        self.recommendation_provider = DefaultRecommendationProvider()
+        # 歌曲转换 (上一首 -> 下一首) 反馈
+        try:
+            self.transition_store = get_transition_store()
+        except Exception as e:
+            print(f"[推荐系统] 转换记录不可用: {e}")
+            self.transition_store = None
+        # 播放历史 (只追加) 与每首歌曲的汇总
+        try:
+            self.listening_history = get_listening_history()
+        except Exception as e:
+            print(f"[推荐系统] 播放历史不可用: {e}")
+            self.listening_history = None
+        self._previous_song_path = ""  # 当前歌曲之前播放的歌曲
+        self.recommendation_provider = self._create_recommendation_provider()
+        # 供 HTTP 接口读取的播放器状态快照，以及交给主线程执行的 API 命令
+        self.player_state = PlayerStateStore()
+        self._api_commands = PlayerCommandDispatcher(self._handle_api_callback, self)
+        # 后台增量计算歌曲向量 (播放中限速)
+        self.embedding_indexer = EmbeddingIndexer(is_playing=lambda: self.player_state.get().playing)
         # 添加歌曲缓存
         self.song_cache = SongCache()
         # 添加自定义音源管理器
@@ -189,8 +233,9 @@ class MultiTrackPlayer(QMainWindow):
         # 主音量 - 从配置加载
         self.master_volume = self.settings.value("master_volume", 80, type=int)
         
-        # 个人推荐系统初始化
+        # 个人推荐系统初始化 (学习和打分都在后台线程中进行)
         self._personal_recommender = None
+        self._recommender_worker = RecommenderWorker()
         self._skip_end_recording = False  # 标记是否跳过on_song_end记录
         self._init_personal_recommender()
         
@@ -211,7 +256,28 @@ class MultiTrackPlayer(QMainWindow):
         self._restore_playback_settings()
         # 改用缓存加载或扫描
         QTimer.singleShot(100, self.load_songs_with_cache)
+        # 继续上次未完成的分离任务
+        QTimer.singleShot(1000, self.separation_queue.start)
     
+    def _create_recommendation_provider(self):
+        """推荐接口使用的提供者：可用时为相似度推荐，随机推荐作为后备"""
+        provider = DefaultRecommendationProvider()
+        if self.config.get('embedding_recommender_enabled', True) and NUMPY_AVAILABLE:
+            provider = EmbeddingRecommendationProvider(
+                fallback=provider,
+                transitions=self.transition_store,
+                history=self.listening_history,
+                service_url=self.config.get('recommender_service_url', 'http://127.0.0.1:8000')
+            )
+            print(f"[播放器] 相似度推荐已启用 (已索引 {len(provider.index)} 首)")
+        return provider
+
+    def _schedule_embeddings(self):
+        """曲库加载后在后台为本地歌曲补算向量，并清理已不在曲库中的歌曲"""
+        if not self.config.get('embedding_recommender_enabled', True):
+            return
+        self.embedding_indexer.schedule([s.path for s in self.songs if not s.is_online], prune=True)
+
     def _init_personal_recommender(self):
         """初始化个人推荐系统"""
         try:
@@ -248,10 +314,37 @@ class MultiTrackPlayer(QMainWindow):
             # 压缩设置
             'compress_stems': self.settings.value("compress_stems", True, type=bool),
             'compress_bitrate': self.settings.value("compress_bitrate", "64k"),
-            'compress_format': self.settings.value("compress_format", "m4a"),
+            'compress_format': self.settings.value("compress_format", "auto"),
+            # 并行压缩数 (0 表示按CPU核心数) / 单个FFmpeg进程压缩全部音轨
+            'compress_workers': int(self.settings.value("compress_workers", 0)),
+            'compress_single_pass': self.settings.value("compress_single_pass", False, type=bool),
+            # 同时进行的分离任务数
+            'msst_concurrency': int(self.settings.value("msst_concurrency", 1)),
+            # 常驻分离进程 (模型只加载一次)
+            'msst_persistent_worker': self.settings.value("msst_persistent_worker", True, type=bool),
+            # 分离队列每次推理合并的歌曲数
+            'msst_batch_size': int(self.settings.value("msst_batch_size", 4)),
             # 推荐系统设置
             'recommendation_pool_size': int(self.settings.value("recommendation_pool_size", 20)),
+            'embedding_recommender_enabled': self.settings.value("embedding_recommender_enabled", True, type=bool),
+            'recommender_service_url': self.settings.value("recommender_service_url", "http://127.0.0.1:8000"),
+            # 音频输出设置 (采样率 0 表示跟随音源)
+            'audio_backend': self.settings.value("audio_backend", "pygame"),
+            'audio_sample_rate': int(self.settings.value("audio_sample_rate", 0)),
+            'audio_buffer_size': int(self.settings.value("audio_buffer_size", 2048)),
         }
+    
+    def _apply_audio_output_config(self):
+        """应用音频输出设置 (在设备下次打开时生效)"""
+        output_config = AudioOutputConfig(
+            sample_rate=self.config.get('audio_sample_rate', 0),
+            buffer_size=self.config.get('audio_buffer_size', 2048)
+        )
+        try:
+            set_output_backend(self.config.get('audio_backend', 'pygame'), output_config)
+        except ValueError as e:
+            print(f"[播放器] {e}，使用 pygame 输出")
+            set_output_backend('pygame', output_config)
         
     def _restore_playback_settings(self):
         """恢复播放设置（在UI创建后调用）"""
@@ -280,19 +373,33 @@ class MultiTrackPlayer(QMainWindow):
     def setup_recommendation_api(self):
         if self.config.get('recommendation_enabled', True):
             self.recommendation_server.set_provider(self.recommendation_provider)
-            self.recommendation_server.set_player_callback(self._handle_api_callback)
+            # 状态接口读取快照；写命令排队交给主线程执行
+            self.recommendation_server.set_state_store(self.player_state)
+            self.recommendation_server.set_player_callback(self._api_commands.call)
             self.recommendation_server.start()
         else:
             print("[播放器] 内置推荐API已禁用")
             
+    def _publish_player_state(self, position: Optional[int] = None, duration: Optional[int] = None):
+        """发布播放器状态快照 (在定时刷新和播放状态变化时调用)"""
+        song = self.current_song
+        tc = self.track_controls[0] if self.track_controls else None
+        if position is None:
+            position = tc.get_position() if tc else 0
+        if duration is None:
+            duration = tc.get_duration() if tc else 0
+        self.player_state.publish(PlayerStateSnapshot(
+            playing=self.is_playing,
+            current_song={'title': song.title, 'artist': song.artist, 'path': song.path} if song else None,
+            position_ms=position,
+            duration_ms=duration,
+            playback_rate=self.playback_rate,
+        ))
+        
     def _handle_api_callback(self, action: str, data=None):
+        """执行 API 命令 (由 PlayerCommandDispatcher 在主线程调用)"""
         if action == 'get_status':
-            return {
-                'playing': self.is_playing,
-                'current_song': {'title': self.current_song.title, 'artist': self.current_song.artist, 'path': self.current_song.path} if self.current_song else None,
-                'progress': self.track_controls[0].get_position() / 1000.0 if self.track_controls else 0,
-                'duration': self.track_controls[0].get_duration() / 1000.0 if self.track_controls else 0
-            }
+            return self.player_state.get().to_status()
         elif action == 'play_song' and data:
             path = data.get('path', '')
             if path and os.path.exists(path):
@@ -303,6 +410,22 @@ class MultiTrackPlayer(QMainWindow):
             return False
         elif action == 'play_next':
             self.play_next()
+        elif action == 'enqueue' and data:
+            return self._enqueue_songs(data.get('paths', []), data.get('mode', 'append'))
+            
+    def _enqueue_songs(self, paths: List[str], mode: str = "append") -> dict:
+        """把曲库中的歌曲加入待播队列 (mode: append / next / replace)"""
+        by_path = {song.path: song for song in self.songs}
+        found = [by_path[p] for p in paths if p in by_path]
+        missing = [p for p in paths if p not in by_path]
+        if mode == "replace":
+            self.play_queue.clear()
+        if mode == "next":
+            self.play_queue.extendleft(reversed(found))
+        else:
+            self.play_queue.extend(found)
+        print(f"[待播队列] 加入 {len(found)} 首，共 {len(self.play_queue)} 首")
+        return {'queued': len(found), 'missing': missing, 'length': len(self.play_queue)}
             
     def setup_ui(self):
         self.setWindowTitle("🎵 Multi-Track Player v3.0")
@@ -400,6 +523,11 @@ class MultiTrackPlayer(QMainWindow):
         msst_btn.clicked.connect(self.open_msst_settings)
         layout.addWidget(msst_btn)
         
+        queue_btn = QPushButton("📋 分离队列")
+        queue_btn.setStyleSheet("QPushButton { background: #c2410c; color: white; border: none; border-radius: 8px; padding: 10px 20px; } QPushButton:hover { background: #ea580c; }")
+        queue_btn.clicked.connect(self.open_separation_queue)
+        layout.addWidget(queue_btn)
+        
         # 推荐调试按钮
         recommender_btn = QPushButton("🧠 推荐调试")
         recommender_btn.setStyleSheet("QPushButton { background: #0891b2; color: white; border: none; border-radius: 8px; padding: 10px 20px; } QPushButton:hover { background: #06b6d4; }")
@@ -536,6 +664,7 @@ class MultiTrackPlayer(QMainWindow):
         QShortcut(QKeySequence(Qt.Key.Key_Escape), self, self.clear_search)
         QShortcut(QKeySequence("Ctrl+L"), self, lambda: self.switch_page("lyrics"))
         QShortcut(QKeySequence("Ctrl+T"), self, lambda: self.switch_page("tracks"))
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.open_performance_dialog)
         
         # 全局快捷键
         self._setup_global_hotkeys()
@@ -655,7 +784,8 @@ class MultiTrackPlayer(QMainWindow):
         # 可以通过推荐系统增加偏好分数
         if self._personal_recommender:
             try:
-                self._personal_recommender.on_positive_feedback()
+                self._recommender_worker.submit("recommender.on_positive_feedback",
+                                                self._personal_recommender.on_positive_feedback)
                 print("[收藏] 已标记为喜欢")
             except Exception as e:
                 print(f"[收藏] 标记失败: {e}")
@@ -709,21 +839,47 @@ class MultiTrackPlayer(QMainWindow):
             
             # 注册到默认推荐提供者
             self.recommendation_provider.set_song_pool(song_info_list)
+            self.recommendation_server.set_library(self.songs)
+            self._schedule_embeddings()
             
             # 【关键修复】注册到个人推荐系统
             if self._personal_recommender:
-                self._personal_recommender.register_song_pool(song_info_list)
+                self._register_song_pool(song_info_list)
                 print(f"[播放器] 已将 {len(self.songs)} 首歌曲注册到个人推荐系统")
             
-            # 后台更新stems状态
-            self.song_cache.update_stems_status(self.songs, stems_path)
             self.song_list.song_model.set_songs(self.songs)
+            # 后台更新stems状态
+            self._start_stems_status_update(stems_path)
         else:
             # 缓存无效，重新扫描
             print("[播放器] 缓存无效，开始扫描歌曲...")
             self.start_scan()
         
+    def _start_stems_status_update(self, stems_path: str):
+        """在后台线程中查找歌曲的stems文件夹 (未缓存指纹的歌曲需要读取文件)"""
+        self._stop_stems_status_update()
+        self._stems_updater = StemsStatusUpdater(self.songs, stems_path)
+        self._stems_updater.stems_found.connect(self._on_stems_status_found)
+        self._stems_updater.start()
+        
+    def _stop_stems_status_update(self):
+        updater = getattr(self, '_stems_updater', None)
+        if updater and updater.isRunning():
+            updater.requestInterruption()
+            updater.wait()
+            
+    def _on_stems_status_found(self, found: dict):
+        """在界面线程中应用后台查找到的stems文件夹"""
+        for song in self.songs:
+            stems_dir = found.get(song.path)
+            if stems_dir and not song.has_stems:
+                song.has_stems = True
+                song.stems_path = stems_dir
+                self.song_list.song_model.update_song(song)
+        print(f"[播放器] 找到 {len(found)} 首歌曲的分离音轨")
+        
     def start_scan(self):
+        self._stop_stems_status_update()
         if self.scanner and self.scanner.isRunning():
             self.scanner.stop()
             self.scanner.wait()
@@ -764,10 +920,12 @@ class MultiTrackPlayer(QMainWindow):
         
         # 注册到默认推荐提供者
         self.recommendation_provider.set_song_pool(song_info_list)
+        self.recommendation_server.set_library(self.songs)
+        self._schedule_embeddings()
         
         # 【关键修复】注册到个人推荐系统
         if self._personal_recommender:
-            self._personal_recommender.register_song_pool(song_info_list)
+            self._register_song_pool(song_info_list)
             print(f"[播放器] 已将 {len(self.songs)} 首歌曲注册到个人推荐系统")
         
         # 保存缓存
@@ -795,11 +953,28 @@ class MultiTrackPlayer(QMainWindow):
         else:
             separate_action = menu.addAction("✂️ 分离音轨")
             separate_action.triggered.connect(lambda: self.separate_song(song))
+        selected = self._get_selected_songs()
+        if song not in selected:
+            selected = [song]
+        queue_action = menu.addAction(f"📥 加入分离队列 ({len(selected)} 首)")
+        queue_action.triggered.connect(lambda: self.enqueue_separation(selected))
+        if song.album:
+            album_songs = [s for s in self.songs if s.album == song.album and not s.is_online]
+            album_action = menu.addAction(f"💿 分离整张专辑: {song.album} ({len(album_songs)} 首)")
+            album_action.triggered.connect(lambda: self.enqueue_separation(album_songs))
         menu.addSeparator()
         open_folder_action = menu.addAction("📂 在资源管理器中打开")
         open_folder_action.triggered.connect(lambda: self.open_in_explorer(song.path))
         menu.exec(self.song_list.song_table.mapToGlobal(pos))
         
+    def _get_selected_songs(self) -> List[SongInfo]:
+        songs = []
+        for index in self.song_list.song_table.selectionModel().selectedRows():
+            song = self.song_list.song_model.get_song(index.row())
+            if song:
+                songs.append(song)
+        return songs
+        
     def open_in_explorer(self, path: str):
         import subprocess
         if sys.platform == 'win32':
@@ -821,11 +996,12 @@ class MultiTrackPlayer(QMainWindow):
         else:
             print(f"[播放器] 无法获取索引 {index} 的歌曲")
             
+    @traced("song_switch")
     def play_song(self, song: SongInfo):
-        print(f"\n[播放器] ======== 开始播放 ========")
-        print(f"[播放器] 歌曲: {song.title} - {song.artist}")
-        print(f"[播放器] 路径: {song.path}")
-        print(f"[播放器] 在线: {song.is_online}")
+        log_debug("播放器", "======== 开始播放 ========")
+        log_info("播放器", f"歌曲: {song.title} - {song.artist}")
+        log_debug("播放器", f"路径: {song.path}")
+        log_debug("播放器", f"在线: {song.is_online}")
         
         # 检查学习是否启用
         learning_enabled = self.settings.value("recommender_learning_enabled", True, type=bool)
@@ -841,14 +1017,14 @@ class MultiTrackPlayer(QMainWindow):
             try:
                 cached_position = self.track_controls[0].get_position()
                 cached_duration = self.track_controls[0].get_duration()
-                print(f"[播放器] 缓存当前播放状态: {cached_position/1000:.1f}s / {cached_duration/1000:.1f}s")
+                log_debug("播放器", f"缓存当前播放状态: {cached_position/1000:.1f}s / {cached_duration/1000:.1f}s")
             except Exception as e:
                 print(f"[播放器] 获取播放位置失败: {e}")
         
         # 记录上一首歌的播放信息（用于推荐系统）
         # 关键：检测用户的播放行为（秒切/听一半/听完）来学习当前喜好
-        print(f"[播放器] 1. 记录上一首歌信息... (skip={skip_recording})")
-        if self.current_song and self._personal_recommender and learning_enabled and not skip_recording:
+        log_debug("播放器", f"1. 记录上一首歌信息... (skip={skip_recording})")
+        if self.current_song and learning_enabled and not skip_recording:
             try:
                 position = cached_position
                 duration = cached_duration
@@ -871,34 +1047,31 @@ class MultiTrackPlayer(QMainWindow):
                     action = 'skip'  # 秒切 - 当前不想听这类型
                     behavior = "秒切"
                 
-                print(f"[推荐系统] 行为检测: {behavior} (播放{play_ratio:.1%}, {position/1000:.1f}s/{duration/1000:.1f}s)")
+                log_info("推荐系统", f"行为检测: {behavior} (播放{play_ratio:.1%}, {position/1000:.1f}s/{duration/1000:.1f}s)")
                 
-                self._personal_recommender.on_song_end(
-                    {'path': self.current_song.path, 'title': self.current_song.title, 
-                     'artist': self.current_song.artist, 'duration': duration / 1000},
-                    position / 1000,
-                    action
-                )
+                self._record_song_end(self.current_song, position / 1000, duration / 1000, action)
             except Exception as e:
                 print(f"[推荐系统] 记录结束事件失败: {e}")
                 import traceback
                 traceback.print_exc()
         
-        print(f"[播放器] 2. 停止所有音轨...")
+        log_debug("播放器", "2. 停止所有音轨...")
         self.stop_all_tracks()
-        print(f"[播放器] 3. 清理音轨...")
+        log_debug("播放器", "3. 清理音轨...")
         self.cleanup_tracks()
-        print(f"[播放器] 4. 设置当前歌曲...")
+        log_debug("播放器", "4. 设置当前歌曲...")
+        if self.current_song and self.current_song is not song:
+            self._previous_song_path = self.current_song.path
         self.current_song = song
         self.current_song_index = self.songs.index(song) if song in self.songs else -1
         self.mode = "single"
         self.mode_label.setText("模式: 单曲")
-        print(f"[播放器] 5. 更新UI...")
+        log_debug("播放器", "5. 更新UI...")
         self.track_panel.set_current_song(song.title)
         self.lyrics_page.set_song(song.title, song.artist, song.album)
-        print(f"[播放器] 6. 设置封面...")
+        log_debug("播放器", "6. 设置封面...")
         self.lyrics_page.set_cover(song.cover_data)
-        print(f"[播放器] 7. 设置歌词...")
+        log_debug("播放器", "7. 设置歌词...")
         self.lyrics_page.set_lyrics(song.lyrics)
         if song.has_stems:
             self.track_panel.separate_btn.setText("🎚️ 播放分离音轨")
@@ -908,16 +1081,16 @@ class MultiTrackPlayer(QMainWindow):
         self.track_panel.separate_status.setText("")
         
         # 添加音轨控件 - 单音轨模式使用QMediaPlayer（异步加载，不阻塞UI）
-        print(f"[播放器] 8. 添加音轨控件...")
+        log_debug("播放器", "8. 添加音轨控件...")
         tc = self.track_panel.add_track(song.path, force_qmedia=True)
-        print(f"[播放器] 9. 设置播放速率...")
+        log_debug("播放器", "9. 设置播放速率...")
         tc.set_playback_rate(self.playback_rate)
         self.track_controls.append(tc)
         
         # 设置播放器 - 确保在播放前完成设置
-        print(f"[播放器] 10. 初始化音轨控件...")
+        log_debug("播放器", "10. 初始化音轨控件...")
         tc.setup_player()
-        print(f"[播放器] 11. setup_player完成")
+        log_debug("播放器", "11. setup_player完成")
         
         # 设置播放结束回调（支持pygame模式的自动下一首）
         sync_manager = self.track_panel.get_sync_manager()
@@ -927,23 +1100,21 @@ class MultiTrackPlayer(QMainWindow):
         if tc.player is not None:
             tc.player.mediaStatusChanged.connect(self.on_media_status_changed)
         
-        print(f"[播放器] 12. 开始播放音轨...")
+        log_debug("播放器", "12. 开始播放音轨...")
         self.play_all_tracks()
         self.is_playing = True
         self.play_btn.setText("⏸")
         self.update_timer.start(100)
+        self._publish_player_state()
         
-        # 通知推荐系统新歌开始播放
-        if self._personal_recommender and learning_enabled:
-            try:
-                self._personal_recommender.on_song_start({
-                    'path': song.path, 
-                    'title': song.title, 
-                    'artist': song.artist,
-                    'duration': song.duration
-                })
-            except Exception as e:
-                print(f"[推荐系统] 记录开始事件失败: {e}")
+        # 通知推荐系统新歌开始播放，并在播放期间预先计算下一首推荐
+        if self._personal_recommender:
+            song_info = {'path': song.path, 'title': song.title, 'artist': song.artist, 'duration': song.duration}
+            if learning_enabled:
+                self._recommender_worker.submit("recommender.on_song_start",
+                                                self._personal_recommender.on_song_start, song_info)
+            self._recommender_worker.prefetch(song.path, self._compute_recommendations, song_info,
+                                              self.config.get('recommendation_pool_size', 20))
         
         # 更新智能预加载器状态，预加载下一首歌曲
         if self._smart_preloader:
@@ -953,7 +1124,35 @@ class MultiTrackPlayer(QMainWindow):
             if self.play_mode == "shuffle":
                 self._smart_preloader.set_shuffle_state(self.shuffle_order, self.shuffle_index)
         
-        print(f"[播放器] ======== 播放初始化完成 ========")
+        log_debug("播放器", "======== 播放初始化完成 ========")
+
+    def _record_song_end(self, song: SongInfo, listened: float, duration: float, action: str):
+        """记录一首歌曲的播放结果 (秒)，交给推荐系统后台线程处理，不阻塞切歌"""
+        song_info = {'path': song.path, 'title': song.title, 'artist': song.artist, 'duration': duration}
+        self._recommender_worker.submit("recommender.on_song_end", self._ingest_song_end,
+                                        song_info, listened, action, self._previous_song_path)
+
+    def _ingest_song_end(self, song_info: dict, listened: float, action: str, previous_path: str):
+        """写入播放历史、上一首 -> 这首的转换反馈，并通知个人推荐系统 (在推荐系统后台线程中执行)"""
+        path = song_info['path']
+        if self.listening_history is not None:
+            try:
+                self.listening_history.record(path, action, listened, song_info['duration'], previous_path)
+            except Exception as e:
+                print(f"[推荐系统] 记录播放历史失败: {e}")
+        if self.transition_store is not None:
+            try:
+                self.transition_store.record(previous_path, path, action)
+            except Exception as e:
+                print(f"[推荐系统] 记录转换失败: {e}")
+        if self._personal_recommender:
+            self._personal_recommender.on_song_end(song_info, listened, action)
+
+    def _register_song_pool(self, song_info_list: list):
+        """把歌曲池交给个人推荐系统 (后台线程)，之前预取的推荐作废"""
+        self._recommender_worker.invalidate()
+        self._recommender_worker.submit("recommender.register_song_pool",
+                                        self._personal_recommender.register_song_pool, song_info_list)
         
     def play_stems(self, song: SongInfo):
         """播放分离音轨 - 改进版：找不到音轨时自动重新分离"""
@@ -1001,6 +1200,7 @@ class MultiTrackPlayer(QMainWindow):
                     shutil.rmtree(song.stems_path)
                 except:
                     pass
+                get_stems_store().forget_stems(song.stems_path)
                 # 重置状态并重新分离
                 song.has_stems = False
                 song.stems_path = ""
@@ -1026,12 +1226,40 @@ class MultiTrackPlayer(QMainWindow):
             tc.set_playback_rate(self.playback_rate)
             self.track_controls.append(tc)
         
-        # 为所有音轨初始化播放器
-        for i, tc in enumerate(self.track_controls):
-            tc.setup_player()
-            # QMediaPlayer 模式下，只对第一个音轨连接媒体状态变化信号
-            if i == 0 and tc.player is not None:
-                tc.player.mediaStatusChanged.connect(self.on_media_status_changed)
+        # 后台并行加载所有音轨，全部就绪后再同步开始播放
+        self.is_playing = False
+        self.play_btn.setText("⏳")
+        self.track_panel.separate_status.setText(f"⏳ 正在加载音轨 0/{len(audio_files)}...")
+        sync_manager = self.track_panel.get_sync_manager()
+        self._stems_load_started = time.perf_counter()
+        sync_manager.load_all_async(
+            on_progress=self._on_stems_load_progress,
+            on_finished=lambda ok, total: self._on_stems_loaded(song, ok, total)
+        )
+        self._publish_player_state()
+        
+        # 更新智能预加载器状态
+        if self._smart_preloader:
+            self._smart_preloader.set_playlist(self.songs)
+            self._smart_preloader.set_current_index(self.current_song_index)
+            self._smart_preloader.set_play_mode(self.play_mode)
+    
+    def _on_stems_load_progress(self, track: Optional[TrackControl], done: int, total: int):
+        """分离音轨加载进度"""
+        name = track.track_name if track else ""
+        self.track_panel.separate_status.setText(f"⏳ 正在加载音轨 {done}/{total}: {name}")
+        
+    def _on_stems_loaded(self, song: SongInfo, succeeded: int, total: int):
+        """所有分离音轨加载完成后同步开始播放"""
+        if self.current_song is not song or self.mode != "stems" or not self.track_controls:
+            return
+        get_tracer().record("stems_load", (time.perf_counter() - self._stems_load_started) * 1000)
+        self.track_panel.separate_status.setText(f"✅ 已加载 {succeeded}/{total} 个音轨")
+        
+        # QMediaPlayer 模式下，只对第一个音轨连接媒体状态变化信号
+        tc = self.track_controls[0]
+        if tc.player is not None:
+            tc.player.mediaStatusChanged.connect(self.on_media_status_changed)
         
         # 设置播放结束回调（支持pygame模式的自动下一首）
         sync_manager = self.track_panel.get_sync_manager()
@@ -1041,12 +1269,7 @@ class MultiTrackPlayer(QMainWindow):
         self.is_playing = True
         self.play_btn.setText("⏸")
         self.update_timer.start(100)
-        
-        # 更新智能预加载器状态
-        if self._smart_preloader:
-            self._smart_preloader.set_playlist(self.songs)
-            self._smart_preloader.set_current_index(self.current_song_index)
-            self._smart_preloader.set_play_mode(self.play_mode)
+        self._publish_player_state()
         
     def separate_current_song(self):
         if not self.current_song:
@@ -1058,53 +1281,138 @@ class MultiTrackPlayer(QMainWindow):
         else:
             self.separate_song(self.current_song)
             
-    def separate_song(self, song: SongInfo):
+    def _check_msst_config(self) -> bool:
+        """检查 MSST 配置是否完整，不完整时提示并打开设置"""
         msst_path = self.config.get('msst_path', '')
         stems_path = self.config.get('stems_path', '')
         config_path = self.config.get('config_path', '')
         model_path = self.config.get('model_path', '')
-        model_type = self.config.get('model_type', 'bs_roformer')
-        output_format = self.config.get('output_format', 'wav')
         python_path = self.config.get('msst_python_path', '')
-        # 压缩设置
-        compress_output = self.config.get('compress_stems', True)
-        compress_bitrate = self.config.get('compress_bitrate', '64k')
-        compress_format = self.config.get('compress_format', 'm4a')
         
         if not msst_path or not os.path.exists(msst_path):
             QMessageBox.warning(self, "MSST未配置", "请先在MSST设置中配置MSST WebUI的路径")
             self.open_msst_settings()
-            return
+            return False
         if not python_path or not os.path.exists(python_path):
             QMessageBox.warning(self, "Python路径未配置", "请先在MSST设置中配置Python解释器路径\n\n这应该是MSST虚拟环境中的python.exe")
             self.open_msst_settings()
-            return
+            return False
         if not stems_path:
             QMessageBox.warning(self, "输出路径未配置", "请先在MSST设置中配置分离音轨的保存路径")
             self.open_msst_settings()
-            return
+            return False
         if not config_path or not os.path.exists(config_path):
             QMessageBox.warning(self, "配置文件未设置", "请先在MSST设置中选择模型配置文件(*.yaml)")
             self.open_msst_settings()
-            return
+            return False
         if not model_path or not os.path.exists(model_path):
             QMessageBox.warning(self, "模型文件未设置", "请先在MSST设置中选择模型权重文件(*.ckpt)")
             self.open_msst_settings()
+            return False
+        return True
+        
+    def _separation_output_dir(self, song: SongInfo) -> str:
+        return os.path.join(self.config.get('stems_path', ''), Path(song.filename).stem)
+        
+    def separate_song(self, song: SongInfo):
+        """分离单首歌曲 (加入队列最前处理，完成后提示播放)"""
+        existing = get_stems_store().lookup(song.path)
+        if existing:
+            # 内容相同的歌曲 (改名/移动/重复) 已经分离过
+            self._on_separate_finished(song, True, "已有相同内容的分离音轨", existing)
+            return
+        if not self._check_msst_config():
             return
-        song_name = Path(song.filename).stem
-        output_dir = os.path.join(stems_path, song_name)
-        os.makedirs(output_dir, exist_ok=True)
+        self._interactive_separation_path = song.path
+        job = self.separation_queue.enqueue(song.path, song.title, self._separation_output_dir(song), front=True)
         self.track_panel.separate_btn.setEnabled(False)
         self.track_panel.separate_btn.setText("⏳ 正在分离...")
-        self.track_panel.separate_status.setText("正在初始化...")
-        self.separator_thread = MSSTSeparatorThread(
-            msst_path, song.path, output_dir, model_type, 
-            config_path, model_path, output_format, python_path,
-            compress_output, compress_bitrate, compress_format
-        )
-        self.separator_thread.progress.connect(self._on_separate_progress)
-        self.separator_thread.finished.connect(lambda s, m, p: self._on_separate_finished(song, s, m, p))
-        self.separator_thread.start()
+        if job and job.status == "pending":
+            self.track_panel.separate_status.setText("排队中，等待当前分离任务完成...")
+        else:
+            self.track_panel.separate_status.setText("正在初始化...")
+        
+    def enqueue_separation(self, songs: List[SongInfo]) -> int:
+        """批量加入分离队列 (跳过在线歌曲和已有音轨的歌曲)"""
+        if not self._check_msst_config():
+            return 0
+        songs = [s for s in songs if not s.is_online and not s.has_stems]
+        if self._attach_existing_stems(songs):
+            songs = [s for s in songs if not s.has_stems]
+        items = [(s.path, s.title, self._separation_output_dir(s)) for s in songs]
+        added = self.separation_queue.enqueue_many(items)
+        QMessageBox.information(self, "分离队列", f"已加入 {added} 首歌曲\n队列中共 {self.separation_queue.pending_count()} 首待处理")
+        return added
+        
+    def _attach_existing_stems(self, songs: List[SongInfo]) -> int:
+        """为内容已经分离过的歌曲直接关联音轨，返回关联的数量"""
+        store = get_stems_store()
+        attached = 0
+        for song in songs:
+            if song.has_stems or song.is_online:
+                continue
+            stems_dir = store.lookup(song.path)
+            if stems_dir:
+                song.has_stems = True
+                song.stems_path = stems_dir
+                self.song_list.song_model.update_song(song)
+                attached += 1
+        if attached:
+            store.save()
+            self.song_cache.save_cache(
+                self.songs,
+                self.config.get('music_path', ''),
+                self.config.get('stems_path', '')
+            )
+        return attached
+        
+    def enqueue_all_without_stems(self) -> int:
+        return self.enqueue_separation([s for s in self.songs if not s.has_stems])
+        
+    def open_separation_queue(self):
+        dialog = SeparationQueueDialog(self.separation_queue, self)
+        dialog.enqueue_all_requested.connect(self.enqueue_all_without_stems)
+        dialog.concurrency_changed.connect(self._on_separation_concurrency_changed)
+        dialog.exec()
+        
+    def _on_separation_concurrency_changed(self, count: int):
+        self.config['msst_concurrency'] = count
+        self.settings.setValue("msst_concurrency", count)
+        self.separation_queue.set_max_concurrent(count)
+        
+    def _on_separation_job_updated(self, job: SeparationJob):
+        if self.current_song and job.song_path == self.current_song.path and job.status == "running":
+            eta = self.separation_queue.job_eta(job)
+            eta_text = f" (剩余约 {int(eta // 60)}:{int(eta % 60):02d})" if eta else ""
+            self._on_separate_progress(job.message + eta_text)
+        
+    def _on_separation_job_finished(self, job: SeparationJob, success: bool, message: str, output_path: str):
+        song = next((s for s in self.songs if s.path == job.song_path), None)
+        interactive = job.song_path == self._interactive_separation_path
+        if interactive:
+            self._interactive_separation_path = ""
+        if song is None:
+            return
+        if success:
+            # 曲库中内容相同的其他副本共用这次的分离结果 (先按时长筛选，避免逐个读取文件)
+            self._attach_existing_stems([s for s in self.songs if s is not song and not s.has_stems
+                                         and s.duration == song.duration])
+        if interactive:
+            self._on_separate_finished(song, success, message, output_path)
+            return
+        if success:
+            song.has_stems = True
+            song.stems_path = output_path
+            self.song_list.song_model.update_song(song)
+            self.song_cache.save_cache(
+                self.songs,
+                self.config.get('music_path', ''),
+                self.config.get('stems_path', '')
+            )
+        if song is self.current_song and self.mode == "single":
+            self.track_panel.separate_btn.setEnabled(True)
+            self.track_panel.separate_btn.setText("🎚️ 播放分离音轨" if success else "✂️ 一键分离音轨")
+            self.track_panel.separate_status.setText(f"✅ {message}" if success else f"❌ {message}")
         
     def _on_separate_progress(self, message: str):
         self.track_panel.separate_status.setText(message)
@@ -1185,6 +1493,9 @@ class MultiTrackPlayer(QMainWindow):
             else:
                 print("[播放器] 歌曲列表为空，无法播放")
             return
+        if self.track_panel.get_sync_manager().is_loading():
+            # 分离音轨仍在后台加载，加载完成后会自动开始播放
+            return
         if self.is_playing:
             print("[播放器] 暂停播放")
             self.pause_all_tracks()
@@ -1196,6 +1507,7 @@ class MultiTrackPlayer(QMainWindow):
             self.play_btn.setText("⏸")
             self.update_timer.start(100)
         self.is_playing = not self.is_playing
+        self._publish_player_state()
         
     def stop_playback(self):
         self.stop_all_tracks()
@@ -1204,11 +1516,19 @@ class MultiTrackPlayer(QMainWindow):
         self.update_timer.stop()
         self.progress_slider.setValue(0)
         self.time_current.setText("0:00")
+        self._publish_player_state()
         
     def play_next(self):
         if not self.songs:
             return
         
+        # 待播队列优先
+        while self.play_queue:
+            queued = self.play_queue.popleft()
+            if os.path.exists(queued.path):
+                self.play_song(queued)
+                return
+        
         # 在单曲模式（非多音轨）下，优先使用推荐系统
         if self.mode == "single" and self._personal_recommender:
             next_song = self._get_recommended_next_song()
@@ -1228,65 +1548,55 @@ class MultiTrackPlayer(QMainWindow):
             next_song = self.songs[next_index]
         self.play_song(next_song)
     
+    @traced("recommender.next")
     def _get_recommended_next_song(self):
-        """从推荐系统获取下一首歌曲 - 改进版：从Top N中随机选择"""
-        if not self._personal_recommender:
+        """
+        从推荐系统获取下一首歌曲 - 从Top N中随机选择
+
+        推荐在当前歌曲开始播放后由后台线程预先算好；还没算完时返回 None，
+        使用默认的下一首，切歌不等待推荐系统打分
+        """
+        if not self._personal_recommender or not self.current_song:
             return None
         
+        result = self._recommender_worker.take(self.current_song.path)
+        if not result:
+            print("[推荐系统] 没有可用的预取推荐")
+            return None
+        
+        # 从推荐列表中随机选择一首，经常被跳过的歌曲 (播放历史汇总) 抽中的机会更小
+        weights = [self._recommendation_weight(info.get('path', '')) for info, _ in result]
+        song_info, reason = random.choices(result, weights=weights)[0]
+        rec_path = song_info.get('path', '')
+        
+        # 在歌曲列表中查找对应的歌曲
+        for song in self.songs:
+            if song.path == rec_path:
+                print(f"[推荐系统] 从Top {len(result)} 中随机选择: {song.title} ({reason})")
+                return song
+        
+        # 如果路径不在当前列表中
+        print(f"[推荐系统] 推荐的歌曲不在当前列表中: {rec_path}")
+        return None
+
+    def _recommendation_weight(self, path: str) -> float:
+        """推荐候选的抽取权重 (0.2 ~ 1)，按播放历史汇总中的跳过率降低"""
+        stats = self.listening_history.get(path) if self.listening_history is not None else None
+        return 1.0 - 0.8 * stats.skip_penalty if stats is not None else 1.0
+        
+    def _compute_recommendations(self, current_song_info: dict, pool_size: int) -> list:
+        """计算推荐列表 [(歌曲信息, 理由), ...] (在推荐系统后台线程中执行)"""
         try:
-            # 获取当前歌曲信息
-            current_song_info = None
-            if self.current_song:
-                current_song_info = {
-                    'path': self.current_song.path,
-                    'title': self.current_song.title,
-                    'artist': self.current_song.artist,
-                    'duration': self.current_song.duration
-                }
-            
-            # 获取推荐池大小配置
-            pool_size = self.config.get('recommendation_pool_size', 20)
-            
             # 获取推荐列表（而不是单个推荐）
-            result = self._personal_recommender.get_top_recommendations(
-                current_song_info, 
-                count=pool_size
-            )
-            
-            if result and len(result) > 0:
-                # 从推荐列表中随机选择一首
-                import random
-                selected = random.choice(result)
-                song_info, reason = selected
-                rec_path = song_info.get('path', '')
-                
-                # 在歌曲列表中查找对应的歌曲
-                for song in self.songs:
-                    if song.path == rec_path:
-                        print(f"[推荐系统] 从Top {len(result)} 中随机选择: {song.title} ({reason})")
-                        return song
-                
-                # 如果路径不在当前列表中
-                print(f"[推荐系统] 推荐的歌曲不在当前列表中: {rec_path}")
-                return None
-            else:
+            result = self._personal_recommender.get_top_recommendations(current_song_info, count=pool_size)
+            if not result:
                 print("[推荐系统] 没有获取到推荐结果")
-                return None
-                
+            return result or []
         except Exception as e:
             print(f"[推荐系统] 获取推荐失败: {e}")
             # 回退到旧方法
-            try:
-                result = self._personal_recommender.get_next_recommendation(current_song_info)
-                if result:
-                    song_info, reason = result
-                    rec_path = song_info.get('path', '')
-                    for song in self.songs:
-                        if song.path == rec_path:
-                            return song
-            except:
-                pass
-            return None
+            result = self._personal_recommender.get_next_recommendation(current_song_info)
+            return [result] if result else []
         
     def play_previous(self):
         if not self.songs:
@@ -1388,6 +1698,7 @@ class MultiTrackPlayer(QMainWindow):
         
         # 同步设置位置（这会自动处理 pygame 和 QMediaPlayer）
         sync_manager.set_all_positions_synced(position)
+        self._publish_player_state(position=position)
         
         # 给一点时间让位置设置生效
         QTimer.singleShot(50, lambda: self._resume_after_seek(was_playing))
@@ -1405,6 +1716,7 @@ class MultiTrackPlayer(QMainWindow):
         tc = self.track_controls[0]
         position = tc.get_position()
         duration = tc.get_duration()
+        self._publish_player_state(position, duration)
         if duration > 0:
             self.progress_slider.setValue(int((position / duration) * 1000))
         self.time_current.setText(self.format_time(position))
@@ -1451,16 +1763,12 @@ class MultiTrackPlayer(QMainWindow):
         
         # 【关键修复】歌曲自然结束 = 听完了，需要先记录 complete 行为
         learning_enabled = self.settings.value("recommender_learning_enabled", True, type=bool)
-        if self.current_song and self._personal_recommender and learning_enabled:
+        if self.current_song and learning_enabled:
             try:
                 duration = self.current_song.duration if self.current_song.duration else 180
                 print(f"[推荐系统] 歌曲自然结束，记录为 complete: {self.current_song.title}")
-                self._personal_recommender.on_song_end(
-                    {'path': self.current_song.path, 'title': self.current_song.title, 
-                     'artist': self.current_song.artist, 'duration': duration},
-                    duration,  # 自然结束 = 听完了整首歌
-                    'complete'  # 直接标记为 complete
-                )
+                # 自然结束 = 听完了整首歌，直接标记为 complete
+                self._record_song_end(self.current_song, duration, duration, 'complete')
             except Exception as e:
                 print(f"[推荐系统] 记录完成事件失败: {e}")
         
@@ -1561,6 +1869,8 @@ class MultiTrackPlayer(QMainWindow):
             old_stems_path = self.config.get('stems_path', '')
             self.config = dialog.get_config()
             self._save_config()
+            self._apply_audio_output_config()
+            self.separation_queue.set_config(self.config)
             # 只有当音乐路径改变时才提示用户手动刷新
             if old_music_path != self.config.get('music_path', '') or old_stems_path != self.config.get('stems_path', ''):
                 QMessageBox.information(self, "路径已更改", "音乐文件夹已更改，请点击刷新按钮重新扫描歌曲列表")
@@ -1570,17 +1880,27 @@ class MultiTrackPlayer(QMainWindow):
         if dialog.exec() == QDialog.DialogCode.Accepted:
             self.config.update(dialog.get_config())
             self._save_config()
+            self.separation_queue.set_config(self.config)
     
     def open_recommender_debug(self):
         """打开推荐系统调试对话框"""
-        dialog = RecommenderDebugDialog(self._personal_recommender, self.settings, self)
+        dialog = RecommenderDebugDialog(self._personal_recommender, self.settings, self,
+                                        history=self.listening_history, worker=self._recommender_worker)
         dialog.exec()
     
+    def open_performance_dialog(self):
+        """打开性能追踪窗口 (非模态，可在播放时常驻)"""
+        if self._performance_dialog is None:
+            self._performance_dialog = PerformanceDialog(
+                self.settings, lock_stats_provider=get_mixer_engine().get_lock_stats, parent=self)
+        self._performance_dialog.show()
+        self._performance_dialog.raise_()
+    
     def _on_preload_finished(self, file_path: str, success: bool):
         """预加载完成回调"""
         from pathlib import Path
         if success:
-            print(f"[预加载] ✓ 完成: {Path(file_path).name}")
+            log_debug("预加载", f"✓ 完成: {Path(file_path).name}")
         else:
             print(f"[预加载] ✗ 失败: {Path(file_path).name}")
     
@@ -1615,7 +1935,8 @@ class MultiTrackPlayer(QMainWindow):
         self.settings.setValue("play_mode", self.play_mode)
         self.settings.setValue("playback_rate", self.playback_rate)
         
-        # 保存个人推荐系统数据
+        # 处理完排队的推荐系统事件，再保存个人推荐系统数据
+        self._recommender_worker.shutdown()
         if self._personal_recommender:
             try:
                 self._personal_recommender.save()
@@ -1635,8 +1956,19 @@ class MultiTrackPlayer(QMainWindow):
         if hasattr(self, '_preloader') and self._preloader:
             self._preloader.shutdown()
         
+        self._stop_stems_status_update()
+        self.separation_queue.shutdown()
+        shutdown_persistent_worker()
+        get_transcode_cache().shutdown()
+        self.embedding_indexer.shutdown()
+        if self.transition_store is not None:
+            self.transition_store.close()
+        if self.listening_history is not None:
+            self.listening_history.compact()
+        
         self.stop_all_tracks()
         self.cleanup_tracks()
+        self.track_panel.get_sync_manager().shutdown()
         if self.scanner and self.scanner.isRunning():
             self.scanner.stop()
             self.scanner.wait()
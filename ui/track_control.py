@@ -12,7 +12,10 @@
 import os
 import time
 import threading
-from typing import Optional, List, Dict, Callable
+from contextlib import contextmanager
+from typing import Optional, List, Dict, Callable, Tuple
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from PyQt6.QtWidgets import (
@@ -33,6 +36,10 @@ except ImportError:
     PYGAME_AVAILABLE = False
     print("[音频引擎] pygame 未安装，使用 QMediaPlayer 模式")
 
+from core.audio_output import get_output_backend, probe_sample_rate, decode_audio_file
+from core.transcode_cache import get_transcode_cache
+from core.perf import traced, log_debug
+
 # 尝试导入预加载模块
 try:
     from core.audio_preloader import get_audio_cache, CachedAudio, PYDUB_AVAILABLE
@@ -110,6 +117,66 @@ class ClickableVolumeSlider(QSlider):
 # Pygame 混音引擎 - 改进版
 # ============================================================
 
+class ContendedLock:
+    """
+    带等待时间统计的锁
+    
+    按调用方法名记录获取次数、发生竞争的次数和等待耗时，
+    便于在性能分析中发现锁竞争回归
+    """
+    
+    # 等待超过该值(秒)视为一次竞争
+    CONTENTION_THRESHOLD = 0.0001
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+        
+    @contextmanager
+    def hold(self, method: str):
+        start = time.perf_counter()
+        self._lock.acquire()
+        waited = time.perf_counter() - start
+        try:
+            self._record(method, waited)
+            yield
+        finally:
+            self._lock.release()
+            
+    def _record(self, method: str, waited: float):
+        with self._stats_lock:
+            stat = self._stats.get(method)
+            if stat is None:
+                stat = {'acquisitions': 0, 'contended': 0, 'total_wait_ms': 0.0, 'max_wait_ms': 0.0}
+                self._stats[method] = stat
+            stat['acquisitions'] += 1
+            if waited > self.CONTENTION_THRESHOLD:
+                stat['contended'] += 1
+            waited_ms = waited * 1000
+            stat['total_wait_ms'] += waited_ms
+            if waited_ms > stat['max_wait_ms']:
+                stat['max_wait_ms'] = waited_ms
+                
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各方法的锁等待统计"""
+        with self._stats_lock:
+            return {method: dict(stat) for method, stat in self._stats.items()}
+            
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats.clear()
+
+
+@dataclass
+class DecodedTrack:
+    """解码完成、尚未装入引擎的音轨"""
+    file_path: str
+    sound: 'pygame.mixer.Sound'
+    audio_segment: Optional['AudioSegment'] = None
+    duration_ms: int = 0
+
+
 class PygameMixerEngine:
     """Pygame 混音引擎 - 单例模式，支持多音轨同步"""
     
@@ -125,7 +192,8 @@ class PygameMixerEngine:
         if self._initialized:
             return
         
-        self._lock = threading.Lock()
+        # 只保护引擎状态的短暂切换，解码和裁剪都在锁外完成
+        self._lock = ContendedLock()
         
         self.sounds: Dict[int, 'pygame.mixer.Sound'] = {}
         self.channels: Dict[int, 'pygame.mixer.Channel'] = {}
@@ -149,143 +217,116 @@ class PygameMixerEngine:
         if self._mixer_ready:
             return True
         
-        if not PYGAME_AVAILABLE:
+        if not get_output_backend().ensure_open():
             return False
-        
-        try:
-            if not pygame.get_init():
-                pygame.init()
-            
-            if not pygame.mixer.get_init():
-                pygame.mixer.pre_init(44100, -16, 2, 2048)
-                pygame.mixer.init()
-            
-            pygame.mixer.set_num_channels(32)
-            self._mixer_ready = True
-            return True
-        except Exception as e:
-            print(f"[PygameMixer] 初始化失败: {e}")
+        self._mixer_ready = True
+        return True
+    
+    def prepare_output(self, source_path: str) -> bool:
+        """
+        按音源采样率打开输出设备 (仅在引擎空闲时切换)
+        
+        切换采样率后，旧格式下创建的 Sound 缓存会被清空
+        """
+        backend = get_output_backend()
+        if self.sounds or self.is_busy():
+            return self.init_mixer()
+        
+        source_rate = probe_sample_rate(source_path)
+        if backend.is_open() and backend.needs_reopen(source_rate):
+            if PRELOADER_AVAILABLE:
+                get_audio_cache().clear()
+        if not backend.open(source_rate):
             return False
+        self._mixer_ready = True
+        return True
+    
+    def get_output_latency(self) -> dict:
+        """获取输出延迟信息 (缓冲延迟/实测延迟)"""
+        return get_output_backend().get_latency()
     
     def load_track(self, track_id: int, file_path: str) -> bool:
         if not self.init_mixer():
             return False
         
-        print(f"[PygameMixer] 开始加载: {os.path.basename(file_path)}")
-        
-        with self._lock:
-            try:
-                # 优先从缓存获取
-                if PRELOADER_AVAILABLE:
-                    cache = get_audio_cache()
-                    cached = cache.get(file_path)
-                    
-                    if cached and cached.sound:
-                        print(f"[PygameMixer] 从缓存加载成功")
-                        self.sounds[track_id] = cached.sound
-                        self.file_paths[track_id] = file_path
-                        self.volumes[track_id] = 0.8
-                        
-                        if cached.audio_segment:
-                            self.audio_segments[track_id] = cached.audio_segment
-                        
-                        if cached.duration_ms > self.duration_ms:
-                            self.duration_ms = cached.duration_ms
-                        
-                        self.channels[track_id] = pygame.mixer.Channel(track_id)
-                        return True
-                
-                # 检查文件格式 - pygame对某些格式支持不好
-                file_ext = os.path.splitext(file_path)[1].lower()
-                
-                # 对于FLAC和某些格式，pygame加载可能很慢或失败
-                # 尝试用pydub先转换
-                if file_ext in ['.flac', '.m4a', '.aac', '.wma', '.opus'] and PYDUB_AVAILABLE:
-                    print(f"[PygameMixer] 使用pydub加载 {file_ext} 格式...")
-                    try:
-                        audio_seg = AudioSegment.from_file(file_path)
-                        self.audio_segments[track_id] = audio_seg
-                        
-                        # 转换为pygame可以直接使用的格式
-                        import io
-                        buffer = io.BytesIO()
-                        audio_seg.export(buffer, format='wav')
-                        buffer.seek(0)
-                        sound = pygame.mixer.Sound(buffer)
-                        
-                        self.sounds[track_id] = sound
-                        self.file_paths[track_id] = file_path
-                        self.volumes[track_id] = 0.8
-                        
-                        duration = len(audio_seg)  # pydub的长度是毫秒
-                        if duration > self.duration_ms:
-                            self.duration_ms = duration
-                        
-                        self.channels[track_id] = pygame.mixer.Channel(track_id)
-                        print(f"[PygameMixer] pydub加载成功，时长: {duration/1000:.1f}秒")
-                        
-                        # 存入缓存
-                        if PRELOADER_AVAILABLE:
-                            size_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                            cached_audio = CachedAudio(
-                                file_path=file_path,
-                                sound=sound,
-                                audio_segment=audio_seg,
-                                duration_ms=duration,
-                                size_bytes=size_bytes
-                            )
-                            cache.put(file_path, cached_audio)
-                        
-                        return True
-                    except Exception as e:
-                        print(f"[PygameMixer] pydub加载失败: {e}")
-                        # 继续尝试直接用pygame加载
-                
-                # 直接用pygame加载（主要用于wav, mp3, ogg）
-                print(f"[PygameMixer] 使用pygame直接加载...")
-                sound = pygame.mixer.Sound(file_path)
-                self.sounds[track_id] = sound
-                self.file_paths[track_id] = file_path
-                self.volumes[track_id] = 0.8
-                
-                if PYDUB_AVAILABLE and track_id not in self.audio_segments:
-                    try:
-                        audio_seg = AudioSegment.from_file(file_path)
-                        self.audio_segments[track_id] = audio_seg
-                    except:
-                        pass
-                
-                duration = int(sound.get_length() * 1000)
-                if duration > self.duration_ms:
-                    self.duration_ms = duration
-                
-                self.channels[track_id] = pygame.mixer.Channel(track_id)
-                print(f"[PygameMixer] pygame加载成功，时长: {duration/1000:.1f}秒")
+        log_debug("PygameMixer", f"开始加载: {os.path.basename(file_path)}")
+        
+        # 解码在锁外进行，不阻塞 UI 线程的音量/暂停/进度查询
+        decoded = self.decode_track(file_path)
+        if decoded is None:
+            return False
+        self.install_track(track_id, decoded)
+        return True
+    
+    @traced("decode")
+    def decode_track(self, file_path: str) -> Optional[DecodedTrack]:
+        """解码音频文件 (不修改引擎状态，可在后台线程并行调用)"""
+        if not self.init_mixer():
+            return None
+        
+        try:
+            # 优先从缓存获取
+            if PRELOADER_AVAILABLE:
+                cache = get_audio_cache()
+                cached = cache.get(file_path)
                 
-                # 存入缓存
-                if PRELOADER_AVAILABLE:
-                    size_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
-                    cached_audio = CachedAudio(
+                if cached and cached.sound:
+                    log_debug("PygameMixer", f"从缓存加载成功: {os.path.basename(file_path)}")
+                    return DecodedTrack(
                         file_path=file_path,
-                        sound=sound,
-                        audio_segment=self.audio_segments.get(track_id),
-                        duration_ms=duration,
-                        size_bytes=size_bytes
+                        sound=cached.sound,
+                        audio_segment=cached.audio_segment,
+                        duration_ms=cached.duration_ms
                     )
-                    cache.put(file_path, cached_audio)
-                
-                return True
-                
-            except Exception as e:
-                print(f"[PygameMixer] 加载失败 {os.path.basename(file_path)}: {e}")
-                return False
+            
+            # pygame 不能直接解码的格式 (FLAC/M4A/Opus 等) 优先使用转码缓存，
+            # 没有缓存时经 pydub 解码，并在后台转码供下次加载
+            source_path = get_transcode_cache().resolve(file_path)
+            if source_path != file_path:
+                log_debug("PygameMixer", f"使用转码缓存: {os.path.basename(file_path)}")
+            
+            sound, audio_seg, duration = decode_audio_file(source_path)
+            decoded = DecodedTrack(file_path, sound, audio_seg, duration)
+            log_debug("PygameMixer", f"加载成功，时长: {duration/1000:.1f}秒")
+            
+            # 存入缓存
+            if PRELOADER_AVAILABLE:
+                size_bytes = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+                cached_audio = CachedAudio(
+                    file_path=file_path,
+                    sound=decoded.sound,
+                    audio_segment=decoded.audio_segment,
+                    duration_ms=decoded.duration_ms,
+                    size_bytes=size_bytes
+                )
+                cache.put(file_path, cached_audio)
+            
+            return decoded
+            
+        except Exception as e:
+            print(f"[PygameMixer] 加载失败 {os.path.basename(file_path)}: {e}")
+            return None
     
-    def _create_sound_from_position(self, track_id: int, position_ms: int) -> Optional['pygame.mixer.Sound']:
-        if not PYDUB_AVAILABLE or track_id not in self.audio_segments:
-            return self.sounds.get(track_id)
+    def install_track(self, track_id: int, decoded: DecodedTrack):
+        """将已解码的音轨装入引擎"""
+        with self._lock.hold("install_track"):
+            self._install_decoded(track_id, decoded)
+    
+    def _install_decoded(self, track_id: int, decoded: DecodedTrack):
+        self.sounds[track_id] = decoded.sound
+        self.file_paths[track_id] = decoded.file_path
+        self.volumes[track_id] = 0.8
+        
+        if decoded.audio_segment is not None:
+            self.audio_segments[track_id] = decoded.audio_segment
         
+        if decoded.duration_ms > self.duration_ms:
+            self.duration_ms = decoded.duration_ms
+        
+        self.channels[track_id] = get_output_backend().get_channel(track_id)
+    
+    def _create_sound_from_position(self, audio_seg: 'AudioSegment', position_ms: int) -> Optional['pygame.mixer.Sound']:
         try:
-            audio_seg = self.audio_segments[track_id]
             trimmed = audio_seg[position_ms:]
             
             if len(trimmed) == 0:
@@ -296,53 +337,62 @@ class PygameMixerEngine:
             trimmed.export(buffer, format='wav')
             buffer.seek(0)
             
-            return pygame.mixer.Sound(buffer)
+            return get_output_backend().create_sound(buffer)
         except Exception as e:
             print(f"[PygameMixer] 裁剪音频失败: {e}")
-            return self.sounds.get(track_id)
+            return None
     
     def _create_all_sounds_from_position(self, position_ms: int) -> Dict[int, 'pygame.mixer.Sound']:
+        """从指定位置为所有音轨创建 Sound (在锁外执行)"""
+        with self._lock.hold("snapshot"):
+            sounds = dict(self.sounds)
+            segments = dict(self.audio_segments)
+        
+        if position_ms <= 0 or not PYDUB_AVAILABLE:
+            return sounds
+        
         result = {}
-        for track_id in self.sounds.keys():
-            if position_ms > 0 and PYDUB_AVAILABLE and track_id in self.audio_segments:
-                trimmed = self._create_sound_from_position(track_id, position_ms)
-                result[track_id] = trimmed if trimmed else self.sounds[track_id]
-            else:
-                result[track_id] = self.sounds[track_id]
+        for track_id, sound in sounds.items():
+            trimmed = None
+            if track_id in segments:
+                trimmed = self._create_sound_from_position(segments[track_id], position_ms)
+            result[track_id] = trimmed if trimmed else sound
         return result
     
+    def _start_channels(self, sounds: Dict[int, 'pygame.mixer.Sound'], position_ms: int):
+        """停止所有通道并从指定位置同时启动 (调用方需持有锁)"""
+        for channel in self.channels.values():
+            if channel:
+                channel.stop()
+        
+        # 丢弃准备期间已被卸载的音轨
+        self._current_sounds = {tid: snd for tid, snd in sounds.items() if tid in self.sounds}
+        self._play_offset_ms = position_ms
+        self._is_paused = False
+        self._play_start_time = time.time()
+        
+        # 同时启动所有通道
+        for track_id, sound in self._current_sounds.items():
+            channel = self.channels.get(track_id)
+            if channel and sound:
+                channel.set_volume(self.volumes.get(track_id, 0.8))
+                channel.play(sound)
+        
+        self.is_playing = True
+    
+    @traced("play_start")
     def play_all(self, start_position_ms: int = 0):
         if not self.sounds:
             return
         
-        with self._lock:
-            # 先停止所有通道
-            for channel in self.channels.values():
-                if channel:
-                    channel.stop()
-            
-            self._play_offset_ms = start_position_ms
-            self._is_paused = False
-            
-            # 预先为所有音轨创建Sound对象
-            if start_position_ms > 0 and PYDUB_AVAILABLE:
-                self._current_sounds = self._create_all_sounds_from_position(start_position_ms)
-            else:
-                self._current_sounds = dict(self.sounds)
-            
-            self._play_start_time = time.time()
-            
-            # 同时启动所有通道
-            for track_id, sound in self._current_sounds.items():
-                channel = self.channels.get(track_id)
-                if channel and sound:
-                    channel.set_volume(self.volumes.get(track_id, 0.8))
-                    channel.play(sound)
-            
-            self.is_playing = True
+        # 预先为所有音轨创建Sound对象
+        sounds = self._create_all_sounds_from_position(start_position_ms)
+        
+        with self._lock.hold("play_all"):
+            self._start_channels(sounds, start_position_ms)
     
     def pause_all(self):
-        with self._lock:
+        with self._lock.hold("pause_all"):
             if self.is_playing and not self._is_paused:
                 self._paused_position_ms = self.get_position()
                 self._is_paused = True
@@ -353,7 +403,7 @@ class PygameMixerEngine:
             self.is_playing = False
     
     def unpause_all(self):
-        with self._lock:
+        with self._lock.hold("unpause_all"):
             if self._is_paused:
                 self._play_start_time = time.time()
                 self._play_offset_ms = self._paused_position_ms
@@ -365,48 +415,37 @@ class PygameMixerEngine:
             self.is_playing = True
     
     def stop_all(self):
-        with self._lock:
-            for channel in self.channels.values():
-                if channel:
-                    channel.stop()
-            self.is_playing = False
-            self._play_offset_ms = 0
-            self._paused_position_ms = 0
-            self._is_paused = False
-            self._current_sounds.clear()
+        with self._lock.hold("stop_all"):
+            self._stop_all_locked()
+    
+    def _stop_all_locked(self):
+        for channel in self.channels.values():
+            if channel:
+                channel.stop()
+        self.is_playing = False
+        self._play_offset_ms = 0
+        self._paused_position_ms = 0
+        self._is_paused = False
+        self._current_sounds.clear()
     
+    @traced("seek")
     def set_position(self, position_ms: int):
         if not self.sounds:
             return
         
-        with self._lock:
-            was_playing = self.is_playing
-            was_paused = self._is_paused
-            
-            for channel in self.channels.values():
-                if channel:
-                    channel.stop()
-            
-            self._play_offset_ms = position_ms
-            
-            if was_playing or was_paused:
-                self._is_paused = False
-                
-                if PYDUB_AVAILABLE and position_ms > 0:
-                    self._current_sounds = self._create_all_sounds_from_position(position_ms)
-                else:
-                    self._current_sounds = dict(self.sounds)
-                
-                self._play_start_time = time.time()
-                
-                for track_id, sound in self._current_sounds.items():
-                    channel = self.channels.get(track_id)
-                    if channel and sound:
-                        channel.set_volume(self.volumes.get(track_id, 0.8))
-                        channel.play(sound)
-                
-                self.is_playing = True
+        was_active = self.is_playing or self._is_paused
+        
+        # 裁剪音频耗时较长，在锁外完成
+        sounds = self._create_all_sounds_from_position(position_ms) if was_active else None
+        
+        with self._lock.hold("set_position"):
+            if sounds is not None:
+                self._start_channels(sounds, position_ms)
             else:
+                for channel in self.channels.values():
+                    if channel:
+                        channel.stop()
+                self._play_offset_ms = position_ms
                 self._paused_position_ms = position_ms
                 self._is_paused = True
                 self.is_playing = False
@@ -433,13 +472,7 @@ class PygameMixerEngine:
         if not self.is_playing or self._is_paused:
             return False
         
-        any_playing = False
-        for channel in self.channels.values():
-            if channel and channel.get_busy():
-                any_playing = True
-                break
-        
-        if not any_playing and self.is_playing:
+        if not self.is_busy() and self.is_playing:
             current_pos = self.get_position()
             if current_pos >= self.duration_ms - 100:
                 return True
@@ -447,13 +480,13 @@ class PygameMixerEngine:
         return False
     
     def set_volume(self, track_id: int, volume: float):
-        with self._lock:
+        with self._lock.hold("set_volume"):
             self.volumes[track_id] = max(0.0, min(1.0, volume))
             if track_id in self.channels:
                 self.channels[track_id].set_volume(self.volumes[track_id])
     
     def unload_track(self, track_id: int):
-        with self._lock:
+        with self._lock.hold("unload_track"):
             if track_id in self.channels:
                 self.channels[track_id].stop()
                 del self.channels[track_id]
@@ -469,8 +502,8 @@ class PygameMixerEngine:
                 del self._current_sounds[track_id]
     
     def clear_all(self):
-        with self._lock:
-            self.stop_all()
+        with self._lock.hold("clear_all"):
+            self._stop_all_locked()
             self.sounds.clear()
             self.channels.clear()
             self.volumes.clear()
@@ -485,10 +518,17 @@ class PygameMixerEngine:
         return self.duration_ms
     
     def is_busy(self) -> bool:
-        for channel in self.channels.values():
+        for channel in list(self.channels.values()):
             if channel and channel.get_busy():
                 return True
         return False
+    
+    def get_lock_stats(self) -> Dict[str, Dict[str, float]]:
+        """获取各方法的锁竞争统计 (获取次数/竞争次数/等待耗时)"""
+        return self._lock.get_stats()
+    
+    def reset_lock_stats(self):
+        self._lock.reset_stats()
 
 
 _mixer_engine: Optional[PygameMixerEngine] = None
@@ -500,6 +540,97 @@ def get_mixer_engine() -> PygameMixerEngine:
     return _mixer_engine
 
 
+# ============================================================
+# 多音轨并行加载器
+# ============================================================
+
+class StemLoader(QObject):
+    """
+    多音轨并行加载器
+    
+    - 在线程池中并行解码所有音轨，不阻塞 UI
+    - 解码结果通过信号回到 GUI 线程后再装入引擎
+    - 切歌时通过批次号丢弃过期的加载结果
+    """
+    
+    # 内部信号: (批次号, track_id, DecodedTrack 或 None)
+    _decoded = pyqtSignal(int, int, object)
+    
+    stem_loaded = pyqtSignal(int, object)  # 单个音轨加载完成 (track_id, DecodedTrack 或 None)
+    progress = pyqtSignal(int, int)  # 加载进度 (已完成, 总数)
+    all_loaded = pyqtSignal(int, int)  # 全部完成 (成功数, 总数)
+    
+    def __init__(self, max_workers: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        if max_workers is None:
+            max_workers = max(2, min(8, os.cpu_count() or 2))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="StemLoader")
+        self._generation = 0
+        self._total = 0
+        self._done = 0
+        self._succeeded = 0
+        self._decoded.connect(self._on_decoded)
+        
+    def load(self, tracks: List[Tuple[int, str]]) -> int:
+        """
+        开始并行加载一组音轨
+        
+        Args:
+            tracks: [(track_id, 文件路径), ...]
+            
+        Returns:
+            本次加载的批次号
+        """
+        self._generation += 1
+        generation = self._generation
+        self._total = len(tracks)
+        self._done = 0
+        self._succeeded = 0
+        
+        if not tracks:
+            self.all_loaded.emit(0, 0)
+            return generation
+        
+        engine = get_mixer_engine()
+        # 在 GUI 线程按音源采样率打开输出设备，避免多个工作线程同时初始化
+        engine.prepare_output(tracks[0][1])
+        
+        for track_id, file_path in tracks:
+            self._executor.submit(self._decode, generation, track_id, file_path)
+        return generation
+        
+    def cancel(self):
+        """丢弃当前批次尚未返回的结果"""
+        self._generation += 1
+        self._total = 0
+        
+    def is_loading(self) -> bool:
+        return self._done < self._total
+        
+    def _decode(self, generation: int, track_id: int, file_path: str):
+        """在工作线程中执行"""
+        if generation != self._generation:
+            return
+        decoded = get_mixer_engine().decode_track(file_path)
+        self._decoded.emit(generation, track_id, decoded)
+        
+    def _on_decoded(self, generation: int, track_id: int, decoded):
+        """在 GUI 线程中执行"""
+        if generation != self._generation:
+            return
+        self._done += 1
+        if decoded is not None:
+            self._succeeded += 1
+        self.stem_loaded.emit(track_id, decoded)
+        self.progress.emit(self._done, self._total)
+        if self._done >= self._total:
+            self.all_loaded.emit(self._succeeded, self._total)
+            
+    def shutdown(self):
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+
 # ============================================================
 # 音轨控制组件
 # ============================================================
@@ -603,21 +734,39 @@ class TrackControl(QFrame):
         layout.addWidget(self.volume_label)
         
     def setup_player(self):
-        print(f"[TrackControl] setup_player开始: {self.track_name}, 使用pygame: {self._use_pygame}")
+        if self._use_pygame and self._is_ready:
+            return
+        log_debug("TrackControl", f"setup_player开始: {self.track_name}, 使用pygame: {self._use_pygame}")
         if self._use_pygame:
             engine = get_mixer_engine()
             if engine.load_track(self.track_id, self.track_path):
                 self._is_ready = True
                 volume = 0 if self.is_muted else self.saved_volume / 100.0
                 engine.set_volume(self.track_id, volume)
-                print(f"[TrackControl] pygame加载成功: {self.track_name}")
+                log_debug("TrackControl", f"pygame加载成功: {self.track_name}")
             else:
                 print(f"[TrackControl] pygame加载失败，回退到QMediaPlayer: {self.track_name}")
                 self._use_pygame = False
                 self._setup_qmediaplayer()
         else:
             self._setup_qmediaplayer()
-        print(f"[TrackControl] setup_player完成: {self.track_name}, ready={self._is_ready}")
+        log_debug("TrackControl", f"setup_player完成: {self.track_name}, ready={self._is_ready}")
+    
+    def apply_decoded(self, decoded: Optional[DecodedTrack]):
+        """装入后台解码完成的音频 (在 GUI 线程调用)"""
+        if not self._use_pygame:
+            return
+        if decoded is not None:
+            engine = get_mixer_engine()
+            engine.install_track(self.track_id, decoded)
+            self._is_ready = True
+            volume = 0 if self.is_muted else self.saved_volume / 100.0
+            engine.set_volume(self.track_id, volume)
+            log_debug("TrackControl", f"后台加载成功: {self.track_name}")
+        else:
+            print(f"[TrackControl] 后台加载失败，回退到QMediaPlayer: {self.track_name}")
+            self._use_pygame = False
+            self._setup_qmediaplayer()
     
     def _setup_qmediaplayer(self):
         if self.player:
@@ -642,7 +791,7 @@ class TrackControl(QFrame):
                 self.player.setSource(QUrl(self.track_path))
             else:
                 self.player.setSource(QUrl.fromLocalFile(self.track_path))
-            print(f"[TrackControl] QMediaPlayer设置源: {self.track_name}")
+            log_debug("TrackControl", f"QMediaPlayer设置源: {self.track_name}")
         except Exception as e:
             print(f"[TrackControl] QMediaPlayer初始化失败: {e}")
             self.loadFinished.emit(False)
@@ -662,12 +811,12 @@ class TrackControl(QFrame):
             QMediaPlayer.MediaStatus.EndOfMedia: "EndOfMedia",
             QMediaPlayer.MediaStatus.InvalidMedia: "InvalidMedia",
         }
-        print(f"[TrackControl] 媒体状态变化 ({self.track_name}): {status_names.get(status, status)}")
+        log_debug("TrackControl", f"媒体状态变化 ({self.track_name}): {status_names.get(status, status)}")
         
         if status == QMediaPlayer.MediaStatus.LoadedMedia:
             self._is_ready = True
             if self._pending_play:
-                print(f"[TrackControl] 媒体已加载，开始播放: {self.track_name}")
+                log_debug("TrackControl", f"媒体已加载，开始播放: {self.track_name}")
                 self.player.play()
                 self._pending_play = False
             self.loadFinished.emit(True)
@@ -675,7 +824,7 @@ class TrackControl(QFrame):
             # 在线音乐缓冲完成，也可以播放
             if self._pending_play and not self._is_ready:
                 self._is_ready = True
-                print(f"[TrackControl] 缓冲完成，开始播放: {self.track_name}")
+                log_debug("TrackControl", f"缓冲完成，开始播放: {self.track_name}")
                 self.player.play()
                 self._pending_play = False
         elif status == QMediaPlayer.MediaStatus.InvalidMedia:
@@ -715,9 +864,9 @@ class TrackControl(QFrame):
             engine = get_mixer_engine()
             if engine.is_playing or engine.sounds:
                 engine.play_all()
-                print(f"[TrackControl] pygame播放: {self.track_name}")
+                log_debug("TrackControl", f"pygame播放: {self.track_name}")
             else:
-                print(f"[TrackControl] pygame未加载音频，尝试加载: {self.track_name}")
+                log_debug("TrackControl", f"pygame未加载音频，尝试加载: {self.track_name}")
                 if engine.load_track(self.track_id, self.track_path):
                     engine.play_all()
                 else:
@@ -728,10 +877,10 @@ class TrackControl(QFrame):
         elif self.player:
             if self._is_ready:
                 self.player.play()
-                print(f"[TrackControl] QMediaPlayer播放: {self.track_name}")
+                log_debug("TrackControl", f"QMediaPlayer播放: {self.track_name}")
             else:
                 self._pending_play = True
-                print(f"[TrackControl] QMediaPlayer未就绪，等待加载: {self.track_name}")
+                log_debug("TrackControl", f"QMediaPlayer未就绪，等待加载: {self.track_name}")
             
     def pause(self):
         if self._use_pygame:
@@ -807,15 +956,72 @@ class SyncedTrackManager:
         
         self._on_end_callback: Optional[Callable] = None
         
+        self._loader = StemLoader()
+        self._loader.stem_loaded.connect(self._on_stem_loaded)
+        self._loader.progress.connect(self._on_load_progress)
+        self._loader.all_loaded.connect(self._on_all_loaded)
+        self._on_load_progress_callback: Optional[Callable] = None
+        self._on_load_finished_callback: Optional[Callable] = None
+        self._last_loaded_track: Optional[TrackControl] = None
+        
     def set_end_callback(self, callback: Callable):
         self._on_end_callback = callback
         
     def add_track(self, track: TrackControl):
         self.tracks.append(track)
         
+    def load_all_async(self, on_progress: Optional[Callable] = None,
+                       on_finished: Optional[Callable] = None):
+        """
+        后台并行加载所有音轨
+        
+        Args:
+            on_progress: 进度回调 (track, 已完成, 总数)
+            on_finished: 全部完成回调 (成功数, 总数)
+        """
+        self._on_load_progress_callback = on_progress
+        self._on_load_finished_callback = on_finished
+        
+        pending = []
+        for track in self.tracks:
+            if track._use_pygame and not track.is_ready():
+                pending.append((track.track_id, track.track_path))
+            elif not track._use_pygame:
+                # QMediaPlayer 本身是异步加载的
+                track.setup_player()
+        self._loader.load(pending)
+        
+    def is_loading(self) -> bool:
+        return self._loader.is_loading()
+        
+    def _find_track(self, track_id: int) -> Optional[TrackControl]:
+        for track in self.tracks:
+            if track.track_id == track_id:
+                return track
+        return None
+        
+    def _on_stem_loaded(self, track_id: int, decoded):
+        self._last_loaded_track = self._find_track(track_id)
+        if self._last_loaded_track:
+            self._last_loaded_track.apply_decoded(decoded)
+            
+    def _on_load_progress(self, done: int, total: int):
+        if self._on_load_progress_callback:
+            self._on_load_progress_callback(self._last_loaded_track, done, total)
+            
+    def _on_all_loaded(self, succeeded: int, total: int):
+        callback = self._on_load_finished_callback
+        self._on_load_progress_callback = None
+        self._on_load_finished_callback = None
+        if callback:
+            callback(succeeded, total)
+        
     def clear(self):
         self._sync_timer.stop()
         self._end_check_timer.stop()
+        self._loader.cancel()
+        self._on_load_progress_callback = None
+        self._on_load_finished_callback = None
         TrackControl._track_counter = 0
         
         # 检查实际的音轨使用的引擎
@@ -946,7 +1152,7 @@ class SyncedTrackManager:
                     ended = True
         
         if ended:
-            print("[SyncManager] 检测到播放结束")
+            log_debug("SyncManager", "检测到播放结束")
             self._end_check_timer.stop()
             if self._on_end_callback:
                 self._on_end_callback()
@@ -958,6 +1164,10 @@ class SyncedTrackManager:
         
     def stop_sync_monitoring(self):
         self._sync_timer.stop()
+        
+    def shutdown(self):
+        """关闭后台加载线程池"""
+        self._loader.shutdown()
 
 
 # ============================================================